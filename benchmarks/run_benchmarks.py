@@ -0,0 +1,161 @@
+"""
+Micro-benchmarks for parsing and rendering.
+
+Times, on synthetic data of each requested size:
+  - get_holiday_data            (CSV parse + date conversion + cleaning)
+  - clean_string over columns   (holiday text columns, employee Email column)
+  - generate_modern_holiday_email_html for 1, 3 and 12-month horizons
+  - write_modern_holiday_email_html streaming the same horizons into a file
+
+Results are written to JSON. When a baseline JSON exists, each benchmark's
+median is compared with it and regressions beyond --threshold are reported
+(exit code 1), so the suite can gate changes to email_generator.
+
+Usage:
+    python benchmarks/run_benchmarks.py                          # 1k and 10k rows
+    python benchmarks/run_benchmarks.py --sizes 1000,100000,1000000
+    python benchmarks/run_benchmarks.py --save-baseline          # store results as the new baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import pandas as pd  # noqa: E402
+
+import email_generator  # noqa: E402
+from synthetic_data import generate_employees_csv, generate_holidays_csv  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, 'results', 'latest.json')
+HORIZONS = (1, 3, 12)
+# Inside the synthetic data's year range, so every horizon has holidays to render
+REFERENCE_DATE = datetime(2015, 6, 15)
+
+
+def time_call(func, repeat):
+    """Runs func `repeat` times and returns timing statistics in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min': round(min(timings), 6),
+        'median': round(statistics.median(timings), 6),
+        'max': round(max(timings), 6),
+        'repeat': repeat,
+    }
+
+
+def run_suite(sizes, repeat, data_dir):
+    results = {}
+    for size in sizes:
+        holidays_path = os.path.join(data_dir, f"holidays_{size}.csv")
+        employees_path = os.path.join(data_dir, f"employees_{size}.csv")
+        if not os.path.exists(holidays_path):
+            generate_holidays_csv(holidays_path, size)
+        if not os.path.exists(employees_path):
+            generate_employees_csv(employees_path, size)
+
+        print(f"Benchmarking {size} rows...")
+        results[f"get_holiday_data/{size}"] = time_call(
+            lambda: email_generator.get_holiday_data(holidays_path), repeat)
+
+        raw_holidays = pd.read_csv(holidays_path)
+        results[f"clean_string/holiday_columns/{size}"] = time_call(
+            lambda: [raw_holidays[col].apply(email_generator.clean_string)
+                     for col in ('HolidayName', 'Shore', 'Locations')], repeat)
+
+        raw_employees = pd.read_csv(employees_path)
+        results[f"clean_string/email_column/{size}"] = time_call(
+            lambda: raw_employees['Email'].apply(email_generator.clean_string), repeat)
+
+        holidays_df = email_generator.get_holiday_data(holidays_path)
+        for months in HORIZONS:
+            results[f"render/{months}_months/{size}"] = time_call(
+                lambda: email_generator.generate_modern_holiday_email_html(
+                    holidays_df, months=months, reference_date=REFERENCE_DATE), repeat)
+            with open(os.devnull, 'w', encoding='utf-8') as sink:
+                results[f"render_stream/{months}_months/{size}"] = time_call(
+                    lambda: email_generator.write_modern_holiday_email_html(
+                        sink, holidays_df, months=months, reference_date=REFERENCE_DATE), repeat)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints current vs. baseline medians. Returns the names of regressed benchmarks."""
+    regressions = []
+    print(f"\n{'benchmark':<44} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<44} {'-':>10} {stats['median']:>10.4f} {'new':>8}")
+            continue
+        change = (stats['median'] - base['median']) / base['median'] if base['median'] else 0.0
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<44} {base['median']:>10.4f} {stats['median']:>10.4f} {change:>+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark holiday parsing and email rendering.")
+    parser.add_argument('--sizes', default='1000,10000',
+                        help="Comma-separated row counts for the synthetic files (e.g. 1000,100000,1000000)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'holiday_tool_bench_data'),
+                        help="Where synthetic CSVs are generated (and reused between runs)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Results JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative slowdown of the median that counts as a regression (default 0.10 = 10%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = run_suite(sizes, args.repeat, args.data_dir)
+    payload = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    write_json(args.output, payload)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        write_json(args.baseline, payload)
+        print(f"Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
@@ -0,0 +1,102 @@
+"""
+Synthetic data generators for the Holiday Reminder Tool benchmarks.
+
+Writes holidays.csv / Employees.csv files in the same format as the real ones,
+at any size, so parsing and rendering can be timed at 1k to 1M rows.
+
+Usage:
+    python benchmarks/synthetic_data.py holidays out/holidays_100k.csv --rows 100000
+    python benchmarks/synthetic_data.py employees out/employees_100k.csv --rows 100000
+"""
+
+import argparse
+import csv
+import os
+import random
+from datetime import date, timedelta
+
+CITIES = [
+    'Bangalore', 'Pune', 'Mumbai', 'Chennai', 'Hyderabad', 'Kolkata', 'Ahmedabad', 'Coimbatore',
+    'Mangalore', 'Bhubaneswar', 'Noida', 'Gurgaon', 'Kochi', 'Indore', 'Jaipur', 'Nagpur',
+    'New York', 'Boston', 'Chicago', 'Dallas', 'Austin', 'Seattle', 'San Jose', 'Atlanta',
+    'Toronto', 'London', 'Dublin', 'Frankfurt', 'Warsaw', 'Singapore', 'Sydney', 'Manila',
+]
+GENERIC_LOCATIONS = ['All Offshore locations', 'All Onshore locations', 'All Near, On & Offshore locations']
+HOLIDAY_NAMES = [
+    'New Year', 'Pongal / Makar Sankranti', 'Republic Day', 'Holi', 'Ramzan (Id-ul-Fitr)', 'Good Friday',
+    'Memorial Day', 'Independence Day', 'Labor Day', 'Ganesh Chaturthi', 'Gandhi Jayanti', 'Dussehra',
+    'Diwali', 'Thanksgiving', 'Christmas Day', 'Company Holiday', 'Onam', 'Bakrid / Eid al-Adha',
+]
+SHORES = ['Onshore', 'Offshore', 'Both']
+
+
+def _messy(text, rng):
+    """Occasionally adds the stray whitespace / non-breaking spaces that clean_string exists for."""
+    roll = rng.random()
+    if roll < 0.05:
+        return f" {text}\xa0"
+    if roll < 0.10:
+        return f"{text}  "
+    return text
+
+
+def generate_holidays_csv(path, rows, start_year=2000, years=30, seed=42):
+    """Writes a holidays CSV with rows spread over `years` years and many locations."""
+    rng = random.Random(seed)
+    first_day = date(start_year, 1, 1)
+    span_days = (date(start_year + years, 1, 1) - first_day).days
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'HolidayName', 'Shore', 'Locations'])
+        for _ in range(rows):
+            day = first_day + timedelta(days=rng.randrange(span_days))
+            if rng.random() < 0.15:
+                locations = rng.choice(GENERIC_LOCATIONS)
+            else:
+                locations = ', '.join(rng.sample(CITIES, rng.randint(1, 6)))
+            writer.writerow([
+                f"{day.month}/{day.day}/{day.year}",
+                _messy(rng.choice(HOLIDAY_NAMES), rng),
+                _messy(rng.choice(SHORES), rng),
+                _messy(locations, rng),
+            ])
+    return path
+
+
+def generate_employees_csv(path, rows, duplicate_rate=0.05, invalid_rate=0.02, seed=42):
+    """Writes an employees CSV with a share of duplicate and invalid email addresses."""
+    rng = random.Random(seed)
+    invalid_emails = ['notanemail', '', 'user@@example.com', 'missing-domain@', 'spaces in@example.com', 'x@y']
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    emitted = []
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Employee ID', 'Employee Name', 'Email', 'Locations'])
+        for i in range(rows):
+            roll = rng.random()
+            if roll < invalid_rate:
+                email = rng.choice(invalid_emails)
+            elif roll < invalid_rate + duplicate_rate and emitted:
+                email = rng.choice(emitted)
+            else:
+                email = f"employee{i}@example.com"
+                emitted.append(email)
+            location = rng.choice(CITIES + ['Onshore', 'Offshore'])
+            writer.writerow([100000 + i, f"Employee {i}", _messy(email, rng), location])
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic holidays.csv / Employees.csv files.")
+    parser.add_argument('kind', choices=['holidays', 'employees'])
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.kind == 'holidays':
+        generate_holidays_csv(args.path, args.rows, seed=args.seed)
+    else:
+        generate_employees_csv(args.path, args.rows, seed=args.seed)
+    print(f"Wrote {args.rows} {args.kind} rows to {args.path}")
@@ -0,0 +1,295 @@
+"""
+Bulk draft export for the Holiday Reminder Tool.
+
+Writes ready-addressed email drafts for the whole roster, for teams that send
+through their own email client instead of SMTP:
+  - --group-by recipient : one draft per recipient (To: that recipient)
+  - --group-by location  : one draft per Locations value (To: everyone there)
+as .eml files in an output directory (--format eml) or as one mbox file
+(--format mbox). Drafts carry "X-Unsent: 1", so Outlook opens them in compose mode.
+
+The email body is rendered and MIME-encoded once per location. The encoded
+message is split around the To header, so a draft is just prefix + address +
+suffix; personalized drafts (--personalize) only re-encode the body with the
+recipient's name in the greeting. The roster is read in chunks, and
+.eml files are written by a pool of writer threads, BATCH_SIZE files per task.
+
+Usage:
+    python bulk_export.py --output drafts
+    python bulk_export.py --output drafts --group-by location
+    python bulk_export.py --output drafts.mbox --format mbox [--config other.ini] [--personalize]
+"""
+
+import argparse
+import base64
+import collections
+import configparser
+import html
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email import quoprimime
+from email.utils import formataddr
+
+import data_sources
+import digest_renderers
+import email_generator
+import log_setup
+import main_tool
+import run_metrics
+import tool_config
+import transports
+
+ROSTER_CHUNK_ROWS = 50000
+_TO_TOKEN = 'bulk-export-to@invalid'
+_TEXT_TOKEN = 'XBULKEXPORTTEXTX'
+_HTML_TOKEN = 'XBULKEXPORTHTMLX'
+_NAME_TOKEN = 'XBULKEXPORTNAMEX'
+_MBOX_FROM_LINE = re.compile(r'^From ', re.MULTILINE)
+
+
+class DraftTemplates:
+    """
+    The encoded draft for each location, split around the To address and the two body
+    parts. The body is rendered and encoded once per location with a placeholder for the
+    greeting name; a personalized draft only substitutes the name and re-encodes the
+    two parts, without rendering or building a MIME message again.
+    """
+
+    def __init__(self, holidays_df, settings, mbox=False):
+        self.holidays_df = holidays_df
+        self.settings = settings
+        self.mbox = mbox
+        self.compact = settings.get('COMPACT_HTML', False)
+        self.subject = f"Upcoming Holiday Reminder! - {settings['COMPANY_NAME_SUBJECT_SUFFIX']}"
+        self._skeletons = {}  # location -> draft pieces (see _skeleton)
+        self._drafts = {}     # location -> (prefix, suffix) with the default greeting
+
+    def _skeleton(self, location, metrics):
+        if location not in self._skeletons:
+            metrics.inc('render_variants')
+            with metrics.timer('render'):
+                digest = email_generator.build_holiday_digest(
+                    self.holidays_df,
+                    company_name_footer=self.settings['COMPANY_NAME_FOOTER'],
+                    signature_name=self.settings['SIGNATURE_NAME'],
+                    recipient_name=_NAME_TOKEN,
+                    location=location,
+                    working_days=self.settings.get('WORKING_DAYS_SECTION', False),
+                    business_days_ahead=self.settings.get('BUSINESS_DAYS_AHEAD', 10))
+                body_html = email_generator.clean_string(digest_renderers.render_body_html(digest, compact=self.compact))
+                body_text = digest_renderers.render_text(digest)
+            with metrics.timer('mime_build'):
+                # Same headers and structure as a real draft, with tokens in place of the two parts
+                message_text, _ = digest_renderers.build_message(
+                    self.settings['SENDER_EMAIL'], _TO_TOKEN, self.subject, _HTML_TOKEN,
+                    compact=self.compact, text_content=_TEXT_TOKEN)
+                message_text = 'X-Unsent: 1\n' + message_text
+                if self.mbox:
+                    message_text = _MBOX_FROM_LINE.sub('>From ', message_text)
+                html_encoding = 'quoted-printable' if self.compact else 'base64'
+                head, rest = message_text.split(_TO_TOKEN)
+                between, rest = rest.split(_encoded_token(_TEXT_TOKEN, 'base64'))
+                before_html, tail = rest.split(_encoded_token(_HTML_TOKEN, html_encoding))
+            self._skeletons[location] = (head, between, before_html, tail, body_text, body_html, html_encoding)
+        return self._skeletons[location]
+
+    def get(self, recipient_name, location, metrics):
+        """Returns (prefix, suffix) bytes; a draft is prefix + encoded To address + suffix."""
+        if recipient_name is None and location in self._drafts:
+            return self._drafts[location]
+        head, between, before_html, tail, body_text, body_html, html_encoding = self._skeleton(location, metrics)
+        greeting_name = email_generator.HolidayDigest([], recipient_name=recipient_name).greeting_name
+        encoded_html = _encode_body(body_html.replace(_NAME_TOKEN, html.escape(greeting_name)), html_encoding)
+        if self.mbox and html_encoding != 'base64':
+            encoded_html = _MBOX_FROM_LINE.sub('>From ', encoded_html)
+        suffix = (between + _encode_body(body_text.replace(_NAME_TOKEN, greeting_name), 'base64')
+                  + before_html + encoded_html + tail)
+        draft = (head.encode('utf-8'), suffix.encode('utf-8'))
+        if recipient_name is None:
+            self._drafts[location] = draft
+        return draft
+
+
+def _encoded_token(token, encoding):
+    """How an ASCII token appears in a part body with the given transfer encoding."""
+    if encoding == 'base64':
+        return base64.b64encode(token.encode('ascii')).decode('ascii') + '\n'
+    return token
+
+
+def _encode_body(text, encoding):
+    """Encodes a UTF-8 part body the way the email package does (76-character lines)."""
+    if encoding == 'base64':
+        return base64.encodebytes(text.encode('utf-8')).decode('ascii')
+    return quoprimime.body_encode(text.encode('utf-8').decode('latin-1'))
+
+
+def iter_roster(employees_file, metrics, chunk_rows=ROSTER_CHUNK_ROWS):
+    """Yields (email, name, location) for each valid address, reading the roster in chunks."""
+    for chunk in data_sources.iter_employees(employees_file, chunk_rows=chunk_rows):
+        if 'Email' not in chunk.columns:
+            raise KeyError(f"Required column 'Email' not found in {employees_file}. Please check your CSV headers.")
+        metrics.inc('roster_rows', len(chunk))
+        names = chunk['Employee Name'] if 'Employee Name' in chunk.columns else [None] * len(chunk)
+        locations = chunk['Locations'] if 'Locations' in chunk.columns else [None] * len(chunk)
+        for email, name, location in zip(chunk['Email'], names, locations):
+            cleaned_email = email_generator.clean_string(email)
+            if not main_tool.is_valid_email(cleaned_email):
+                metrics.inc('recipients_invalid')
+                logging.warning(f"Invalid or empty email format: '{email}'. Skipping.")
+                continue
+            yield cleaned_email, main_tool.clean_optional(name), main_tool.clean_optional(location)
+
+
+def format_address(email, name=None):
+    return formataddr((name, email)) if name else email
+
+
+def iter_drafts(roster, templates, group_by, metrics, personalize=False):
+    """
+    Yields (file_stem, draft_bytes) for each recipient, or for each location group.
+    Recipient drafts are personalized (name and location) only with personalize=True;
+    a location group's draft always lists that location's holidays.
+    """
+    if group_by == 'recipient':
+        for email, name, location in roster:
+            if personalize:
+                prefix, suffix = templates.get(name, location, metrics)
+            else:
+                prefix, suffix = templates.get(None, None, metrics)
+            yield email, prefix + format_address(email, name).encode('utf-8') + suffix
+        return
+
+    groups = collections.OrderedDict()
+    for email, name, location in roster:
+        groups.setdefault(location, []).append(format_address(email, name))
+    for location, addresses in groups.items():
+        prefix, suffix = templates.get(None, location, metrics)
+        # One address per folded header line keeps every line well under the SMTP limit
+        yield location or 'all', prefix + ',\n '.join(addresses).encode('utf-8') + suffix
+
+
+def _write_eml_batch(output_dir, batch):
+    for file_name, draft in batch:
+        transports.write_bytes_atomic(os.path.join(output_dir, file_name), draft)
+    return len(batch)
+
+
+def write_eml_drafts(drafts, output_dir, metrics, workers=None, batch_size=500):
+    """Writes each draft to its own .eml file using a pool of writer threads. Returns the number written."""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    written = 0
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for sequence, (file_stem, draft) in enumerate(drafts, start=1):
+            metrics.inc('draft_bytes', len(draft))
+            batch.append((f"{sequence:06d}-{transports.file_safe(file_stem)}.eml", draft))
+            if len(batch) >= batch_size:
+                pending.append(executor.submit(_write_eml_batch, output_dir, batch))
+                batch = []
+                # Bound the drafts held in memory while the writers catch up
+                while len(pending) > workers * 2:
+                    written += pending.popleft().result()
+        if batch:
+            pending.append(executor.submit(_write_eml_batch, output_dir, batch))
+        while pending:
+            written += pending.popleft().result()
+    return written
+
+
+def write_mbox_drafts(drafts, output_path, metrics, sender):
+    """Writes all drafts into one mbox file (replaced atomically when complete). Returns the number written."""
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    from_line = f"From {sender} {time.asctime()}\n".encode('utf-8')
+    written = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.mbox')
+    try:
+        with os.fdopen(fd, 'wb', buffering=transports.WRITE_BUFFER_BYTES) as f:
+            for _, draft in drafts:
+                metrics.inc('draft_bytes', len(draft))
+                f.write(from_line)
+                f.write(draft)
+                f.write(b'\n' if draft.endswith(b'\n') else b'\n\n')
+                written += 1
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+
+def export_drafts(settings, output_path, group_by='recipient', output_format='eml', personalize=None, workers=None):
+    """
+    Exports ready-addressed drafts for the roster in settings['EMPLOYEES_FILE'].
+    personalize defaults to settings['PERSONALIZE_EMAILS']. Returns the run summary (see run_metrics.py).
+    """
+    metrics = run_metrics.RunMetrics(job='bulk_export', profile=settings['PROFILE_NAME'])
+    if personalize is None:
+        personalize = settings.get('PERSONALIZE_EMAILS', False)
+    try:
+        start_date, end_date = email_generator.settings_horizon_range(settings)
+        holidays_df = email_generator.get_holiday_data(settings['HOLIDAYS_FILE'], metrics=metrics,
+                                                       start_date=start_date, end_date=end_date)
+        if holidays_df.empty:
+            print("No holiday data found or file is empty. No drafts exported.")
+            logging.warning("No holiday data found or file is empty. No drafts exported.")
+            return metrics.summary()
+
+        templates = DraftTemplates(holidays_df, settings, mbox=output_format == 'mbox')
+        drafts = iter_drafts(iter_roster(settings['EMPLOYEES_FILE'], metrics), templates, group_by, metrics,
+                             personalize=personalize)
+        with metrics.timer('export'):
+            if output_format == 'mbox':
+                written = write_mbox_drafts(drafts, output_path, metrics, settings['SENDER_EMAIL'])
+            else:
+                written = write_eml_drafts(drafts, output_path, metrics, workers=workers,
+                                           batch_size=max(1, settings.get('BATCH_SIZE', 100)))
+        metrics.inc('drafts_written', written)
+        print(f"Exported {written} draft(s) to '{output_path}'.")
+        logging.info(f"Exported {written} draft(s) ({group_by}, {output_format}) to '{output_path}'.")
+    finally:
+        summary = metrics.write(settings.get('METRICS_DIR'),
+                                keep_runs=settings.get('KEEP_RUN_SUMMARIES', run_metrics.KEEP_RUN_SUMMARIES))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export ready-addressed holiday reminder drafts for the whole roster.")
+    parser.add_argument('--output', required=True, help="Output directory (eml) or mbox file (mbox)")
+    parser.add_argument('--group-by', choices=['recipient', 'location'], default='recipient',
+                        help="One draft per recipient, or one per Locations value addressed to everyone there")
+    parser.add_argument('--format', choices=['eml', 'mbox'], default='eml', help="One .eml file per draft, or one mbox file")
+    parser.add_argument('--config', default='config.ini', help="Config profile to read (default: config.ini)")
+    parser.add_argument('--personalize', action='store_true', default=None,
+                        help="Personalize greeting and holidays (default: PERSONALIZE_EMAILS in the config)")
+    parser.add_argument('--workers', type=int, help="Writer threads for .eml output (default: 4 per CPU, at most 32)")
+    args = parser.parse_args()
+
+    try:
+        settings = tool_config.load_settings(args.config)
+    except (configparser.Error, FileNotFoundError, ValueError) as e:
+        print(f"Configuration Error: {e}")
+        sys.exit(1)
+    log_setup.configure_logging('holiday_tool.log', max_bytes=settings['LOG_MAX_BYTES'],
+                                backup_count=settings['LOG_BACKUP_COUNT'],
+                                success_sample_every=settings['LOG_SUCCESS_SAMPLE_EVERY'])
+
+    try:
+        summary = export_drafts(settings, args.output, group_by=args.group_by, output_format=args.format,
+                                personalize=args.personalize, workers=args.workers)
+    except (FileNotFoundError, KeyError, OSError) as e:
+        print(f"Error: Could not export drafts: {e}")
+        logging.error(f"Could not export drafts: {e}")
+        sys.exit(1)
+    counters = summary['counters']
+    print(f"{counters.get('drafts_written', 0)} draft(s), {counters.get('recipients_invalid', 0)} invalid address(es), "
+          f"{counters.get('render_variants', 0)} body variant(s) in {summary['duration_seconds']:.2f}s.")
@@ -0,0 +1,225 @@
+"""
+Working-day arithmetic per location, built on the holiday calendar.
+
+A city's holidays are the rows filter_holidays_for_location keeps for it (see
+holiday_locations.py: the rows naming it, plus the 'All ...' rows of its shore).
+'Onshore' and 'Offshore' count only the holidays all of that shore's staff
+share (its 'All ...' rows), not those of single cities such as Diwali in Pune.
+Each distinct set of holiday dates is compiled once into a numpy.busdaycalendar, and locations with the same set share it, so thousands
+of locations usually come down to a handful of calendars. Queries are grouped
+by calendar and answered with one numpy.busday_count / busday_offset call per
+group instead of walking the days in Python.
+
+    calculator = BusinessDayCalculator(holidays_df)
+    calculator.working_days_left(['Pune', 'Chennai'], months=2)   # DataFrame: location x month
+    calculator.date_after(['Pune', 'Chennai'], 10)                # Series: 10 working days from today
+    calculator.count(locations, begin_dates, end_dates)           # element-wise, any number of queries
+
+Only holidays in holidays_df are known, so the data must reach past the last
+date asked about: email_generator.horizon_range(business_days_ahead=...) loads
+up to lookahead_end, which leaves LOOKAHEAD_MARGIN_DAYS for the holidays on the way.
+
+Usage:
+    python business_days.py [--config config.ini] [--location Pune ...] [--days 10] [--months 2]
+"""
+
+import argparse
+import threading
+import weakref
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import holiday_locations
+
+DEFAULT_WEEKMASK = 'Mon Tue Wed Thu Fri'
+SHORE_LOCATIONS = ('Onshore', 'Offshore')
+# Calendar days of holidays date_after may skip beyond the weekday-only date (see lookahead_end)
+LOOKAHEAD_MARGIN_DAYS = 31
+
+
+class BusinessDayCalculator:
+    """Working days per location for one holiday DataFrame (treated as read-only)."""
+
+    def __init__(self, holidays_df, weekmask=DEFAULT_WEEKMASK):
+        self.weekmask = weekmask
+        self._dates = holidays_df['Date'].values.astype('datetime64[D]')
+        # Lowercased once; numpy's vectorized find matches them against each location
+        self._shores = holiday_locations.lowered(holidays_df['Shore'])
+        self._locations = holiday_locations.lowered(holidays_df['Locations'])
+        self._named = holiday_locations.named_locations_of(holidays_df)
+        self._calendar_keys = {}  # normalized location -> key into _calendars
+        self._calendars = {}      # holiday dates as bytes -> numpy.busdaycalendar
+        self._lock = threading.Lock()
+
+    def _holiday_mask(self, location):
+        """The holiday rows of location, as a boolean array (only shore-wide rows for a shore)."""
+        mask = holiday_locations.location_mask(self._shores, self._locations, location, self._named)
+        if holiday_locations.normalize(location) in holiday_locations.SHORES:
+            mask &= holiday_locations.shore_wide(self._locations)
+        return mask
+
+    def calendar_key(self, location):
+        """Locations with equal keys have the same holidays (and share one compiled calendar)."""
+        location = location.strip().lower() if isinstance(location, str) else ''
+        key = self._calendar_keys.get(location)
+        if key is None:
+            holidays = np.unique(self._dates[self._holiday_mask(location)])
+            key = holidays.tobytes()
+            with self._lock:
+                if key not in self._calendars:
+                    self._calendars[key] = np.busdaycalendar(weekmask=self.weekmask, holidays=holidays)
+                self._calendar_keys[location] = key
+        return key
+
+    def calendar_for(self, location):
+        """The compiled numpy.busdaycalendar for a location."""
+        return self._calendars[self.calendar_key(location)]
+
+    @property
+    def calendar_count(self):
+        return len(self._calendars)
+
+    def _by_calendar(self, locations):
+        """Yields (calendar, index array) for each group of locations that share a calendar."""
+        names = [location if isinstance(location, str) else '' for location in locations]
+        unique_locations, inverse = np.unique(np.array(names, dtype=str), return_inverse=True)
+        keys = [self.calendar_key(location) for location in unique_locations]
+        key_ids = {key: number for number, key in enumerate(dict.fromkeys(keys))}
+        group_of_row = np.array([key_ids[key] for key in keys])[inverse]
+        for key, number in key_ids.items():
+            yield self._calendars[key], np.flatnonzero(group_of_row == number)
+
+    def count(self, locations, begin_dates, end_dates):
+        """
+        Working days in [begin, end) for each (location, begin, end), element-wise
+        (a single date is used for every location). Returns an int array.
+        """
+        locations = np.atleast_1d(np.asarray(locations, dtype=object))
+        begin_dates = np.broadcast_to(_to_days(begin_dates), locations.shape)
+        end_dates = np.broadcast_to(_to_days(end_dates), locations.shape)
+        counts = np.zeros(len(locations), dtype=np.int64)
+        for busdaycal, rows in self._by_calendar(locations):
+            counts[rows] = np.busday_count(begin_dates[rows], end_dates[rows], busdaycal=busdaycal)
+        return counts
+
+    def offset(self, locations, dates, days):
+        """
+        The date days working days after each date (rolled forward to a working day
+        first), element-wise per location. Returns a datetime64[D] array.
+        """
+        locations = np.atleast_1d(np.asarray(locations, dtype=object))
+        dates = np.broadcast_to(_to_days(dates), locations.shape)
+        days = np.broadcast_to(np.asarray(days, dtype=np.int64), locations.shape)
+        results = np.empty(len(locations), dtype='datetime64[D]')
+        for busdaycal, rows in self._by_calendar(locations):
+            results[rows] = np.busday_offset(dates[rows], days[rows], roll='forward', busdaycal=busdaycal)
+        return results
+
+    def working_days_left(self, locations, months=2, reference_date=None):
+        """
+        DataFrame (one row per location, one column per month name) with the working days
+        left in the current month from reference_date (default today, included) and the
+        working days in each of the following months - 1 months.
+        """
+        locations = list(locations)
+        from_day = _to_days(reference_date or datetime.now())
+        month_starts = _month_starts(from_day, months)
+        columns = {}
+        for begin, end in zip(month_starts[:-1], month_starts[1:]):
+            columns[pd.Timestamp(begin).strftime('%B %Y')] = self.count(locations, max(begin, from_day), end)
+        return pd.DataFrame(columns, index=pd.Index(locations, name='Location'))
+
+    def date_after(self, locations, days, reference_date=None):
+        """Series with the date days working days after reference_date (default today) per location."""
+        locations = list(locations)
+        results = self.offset(locations, _to_days(reference_date or datetime.now()), days)
+        return pd.Series(pd.to_datetime(results), index=pd.Index(locations, name='Location'),
+                         name=f"{days} working days")
+
+
+class WorkingDaysSummary:
+    """The working-days section of a digest: one row per location or shore."""
+
+    def __init__(self, month_names, rows, days_ahead, from_date):
+        self.month_names = month_names  # the digest's months, current month first
+        self.rows = rows                # (label, [working days per month], date days_ahead working days on)
+        self.days_ahead = days_ahead
+        self.from_date = from_date
+
+
+# The calculator of the most recently used DataFrame, so the digests of many
+# locations built from one DataFrame share its compiled calendars
+_last_calculator = (None, None)
+_last_calculator_lock = threading.Lock()
+
+
+def calculator_for(holidays_df):
+    """A BusinessDayCalculator for holidays_df, reused while the same DataFrame is passed in."""
+    global _last_calculator
+    with _last_calculator_lock:
+        holidays_ref, calculator = _last_calculator
+        if holidays_ref is None or holidays_ref() is not holidays_df:
+            calculator = BusinessDayCalculator(holidays_df)
+            _last_calculator = (weakref.ref(holidays_df), calculator)
+        return calculator
+
+
+def working_days_summary(holidays_df, location=None, months=2, days_ahead=10, reference_date=None):
+    """
+    Working days left per month and the date days_ahead working days from reference_date,
+    for location, or for the Onshore and Offshore calendars when no location is given.
+    """
+    calculator = calculator_for(holidays_df)
+    reference_date = reference_date or datetime.now()
+    labels = [location] if location else list(SHORE_LOCATIONS)
+    table = calculator.working_days_left(labels, months=months, reference_date=reference_date)
+    dates = calculator.date_after(labels, days_ahead, reference_date=reference_date)
+    rows = [(label, [int(days) for days in table.loc[label]], dates[label].to_pydatetime())
+            for label in labels]
+    return WorkingDaysSummary(list(table.columns), rows, days_ahead, reference_date)
+
+
+def lookahead_end(days_ahead, reference_date=None):
+    """
+    A date holiday data must reach for date_after(days_ahead) from reference_date (default today):
+    the date days_ahead weekdays on, plus LOOKAHEAD_MARGIN_DAYS for holidays in between.
+    """
+    weekdays_on = np.busday_offset(_to_days(reference_date or datetime.now()), days_ahead,
+                                   roll='forward', weekmask=DEFAULT_WEEKMASK)
+    return (weekdays_on + LOOKAHEAD_MARGIN_DAYS).astype(datetime)
+
+
+def _to_days(dates):
+    if isinstance(dates, datetime):
+        return np.datetime64(dates.date(), 'D')
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def _month_starts(from_day, months):
+    """The first day of from_day's month and of each of the following months (months + 1 dates)."""
+    first = from_day.astype('datetime64[M]')
+    return list((first + np.arange(months + 1)).astype('datetime64[D]'))
+
+
+if __name__ == "__main__":
+    import email_generator
+    import tool_config
+
+    parser = argparse.ArgumentParser(description="Working days left per month and N working days ahead, per location.")
+    parser.add_argument('--config', default='config.ini', help="Config profile (for HOLIDAYS_FILE)")
+    parser.add_argument('--location', action='append', help="Location (repeatable; default: Onshore and Offshore)")
+    parser.add_argument('--days', type=int, default=10, help="Working days ahead (default 10)")
+    parser.add_argument('--months', type=int, default=2, help="Months to count (default 2)")
+    args = parser.parse_args()
+
+    settings = tool_config.load_settings(args.config)
+    holidays_df = email_generator.get_holiday_data(settings['HOLIDAYS_FILE'])
+    if holidays_df.empty:
+        raise SystemExit("No holiday data found or file is empty.")
+    calculator = BusinessDayCalculator(holidays_df)
+    locations = args.location or list(SHORE_LOCATIONS)
+    table = calculator.working_days_left(locations, months=args.months)
+    table[f"{args.days} working days on"] = calculator.date_after(locations, args.days).dt.strftime('%a %d %b %Y')
+    print(table.to_string())
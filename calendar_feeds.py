@@ -0,0 +1,248 @@
+"""
+Subscribable iCalendar (.ics) feeds built from the holiday file.
+
+export_feeds writes one RFC 5545 feed per audience into a folder:
+  - all.ics, onshore.ics, offshore.ics
+  - location-<name>.ics for every location named in the Locations column
+    (and any extra locations passed in)
+A feed holds the rows filter_holidays_for_location keeps, so it lists the same
+holidays as that location's email, including the 'All ...' rows of its shore
+(see holiday_locations.py). Event UIDs come from digest_renderers.holiday_uid
+(date, name, shore and locations), so a calendar client updates a subscribed
+event in place instead of duplicating it.
+
+Regeneration is incremental: each feed's rows are hashed and the hashes are
+kept in feeds.json next to the feeds. A feed is only rewritten when its hash
+changes (or its file is missing), through a temp file + rename, so a web server
+or sync job never picks up half a file. Feeds of locations that no longer
+appear are removed.
+
+Usage:
+    python calendar_feeds.py --output feeds [--config config.ini] [--location Pune ...] [--watch]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import digest_renderers
+import email_generator
+import holiday_locations
+import transports
+
+MANIFEST_FILE = 'feeds.json'
+# Every name feed_file_name can produce; nothing else listed in feeds.json is ever removed
+FEED_FILE_PATTERN = re.compile(r'(all|onshore|offshore|location-[a-z0-9-]*)\.ics')
+# Bump when the feed layout changes, so every feed is rewritten once
+FEED_FORMAT_VERSION = 1
+WATCH_INTERVAL_SECONDS = 2.0
+
+
+class FeedRows:
+    """The holiday rows of one export, with each row's key and VEVENT lines worked out once."""
+
+    def __init__(self, holidays_df):
+        df = holidays_df.drop_duplicates(subset=['Date', 'HolidayName', 'Shore', 'Locations'])
+        self.df = df.sort_values(['Date', 'HolidayName'], kind='stable').reset_index(drop=True)
+        self.entries = [email_generator.HolidayEntry(*row) for row in zip(
+            self.df['Date'], self.df['HolidayName'], self.df['Shore'], self.df['Locations'])]
+        self.keys = [f"{entry.date.strftime('%Y-%m-%d')}|{entry.name}|{entry.shore}|{entry.locations}"
+                     for entry in self.entries]
+        self._shores = holiday_locations.lowered(self.df['Shore'])
+        self._locations = holiday_locations.lowered(self.df['Locations'])
+        self._named = holiday_locations.named_locations_of(self.df)
+        self._event_lines = {}
+
+    def rows_for(self, location):
+        """Row positions of the holidays for location (all rows when location is None)."""
+        mask = holiday_locations.location_mask(self._shores, self._locations, location, self._named)
+        return np.flatnonzero(mask).tolist()
+
+    def feed_hash(self, calendar_name, rows):
+        digest = hashlib.sha256(f"{FEED_FORMAT_VERSION}|{calendar_name}".encode('utf-8'))
+        for row in rows:
+            digest.update(b'\n' + self.keys[row].encode('utf-8'))
+        return digest.hexdigest()
+
+    def document(self, calendar_name, rows, dtstamp):
+        event_lines = []
+        for row in rows:
+            if row not in self._event_lines:
+                self._event_lines[row] = digest_renderers.ics_event_lines(self.entries[row], dtstamp)
+            event_lines += self._event_lines[row]
+        return digest_renderers.ics_document(event_lines, calendar_name)
+
+
+def feed_locations(holidays_df, extra_locations=None):
+    """
+    Distinct location names from the Locations column (rows for 'All ...' locations name
+    no single location), plus extra_locations. Names differing only in case are one location.
+    """
+    names = {}
+    for value in holidays_df['Locations'].dropna().astype(str):
+        if value.strip().lower().startswith('all'):
+            continue
+        for name in value.split(','):
+            names.setdefault(name.strip().lower(), name.strip())
+    for name in extra_locations or []:
+        names.setdefault(name.strip().lower(), name.strip())
+    names.pop('', None)
+    return sorted(names.values(), key=str.lower)
+
+
+def feed_file_name(location):
+    if not location:
+        return 'all.ics'
+    if location.lower() in ('onshore', 'offshore'):
+        return f"{location.lower()}.ics"
+    return f"location-{re.sub(r'[^a-z0-9]+', '-', location.lower()).strip('-')}.ics"
+
+
+def feed_definitions(holidays_df, extra_locations=None, calendar_name='Holidays'):
+    """(file name, calendar name, location) for every feed; location None is the All feed."""
+    feeds = [(feed_file_name(None), f"{calendar_name} - All", None)]
+    for location in ['Onshore', 'Offshore'] + feed_locations(holidays_df, extra_locations):
+        file_name = feed_file_name(location)
+        if file_name not in {feed[0] for feed in feeds}:
+            feeds.append((file_name, f"{calendar_name} - {location}", location))
+    return feeds
+
+
+def read_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f).get('feeds', {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def export_feeds(holidays_df, output_dir, extra_locations=None, calendar_name='Holidays'):
+    """
+    Writes the feeds whose holiday rows changed since the last export into output_dir and
+    removes feeds that are no longer produced. Returns {'written': [...], 'unchanged': n,
+    'removed': [...]} with feed file names.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    previous = read_manifest(output_dir)
+    rows = FeedRows(holidays_df)
+    dtstamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    manifest, written, unchanged = {}, [], 0
+
+    for file_name, feed_name, location in feed_definitions(rows.df, extra_locations, calendar_name):
+        feed_rows = rows.rows_for(location)
+        feed_hash = rows.feed_hash(feed_name, feed_rows)
+        path = os.path.join(output_dir, file_name)
+        entry = previous.get(file_name)
+        if entry and entry.get('hash') == feed_hash and os.path.exists(path):
+            manifest[file_name] = entry
+            unchanged += 1
+            continue
+        transports.write_bytes_atomic(path, rows.document(feed_name, feed_rows, dtstamp).encode('utf-8'))
+        manifest[file_name] = {'calendar': feed_name, 'location': location, 'events': len(feed_rows),
+                               'hash': feed_hash, 'updated': dtstamp}
+        written.append(file_name)
+
+    removed = sorted(name for name in set(previous) - set(manifest) if _is_feed_file(output_dir, name))
+    for file_name in removed:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(output_dir, file_name))
+
+    if written or removed:
+        manifest_json = json.dumps({'version': FEED_FORMAT_VERSION, 'feeds': manifest}, indent=2, sort_keys=True)
+        transports.write_bytes_atomic(os.path.join(output_dir, MANIFEST_FILE), (manifest_json + '\n').encode('utf-8'))
+    logging.info(f"Calendar feeds in '{output_dir}': {len(written)} written, {unchanged} unchanged, "
+                 f"{len(removed)} removed.")
+    return {'written': written, 'unchanged': unchanged, 'removed': removed}
+
+
+def export_feeds_from_file(holidays_file, output_dir, extra_locations=None, calendar_name='Holidays'):
+    """export_feeds for the whole holiday file; returns None (nothing written) when it has no rows."""
+    holidays_df = email_generator.get_holiday_data(holidays_file)
+    if holidays_df.empty:
+        logging.warning(f"No holiday data in '{holidays_file}'. Calendar feeds not updated.")
+        return None
+    return export_feeds(holidays_df, output_dir, extra_locations=extra_locations, calendar_name=calendar_name)
+
+
+def watch_feeds(holidays_file, output_dir, extra_locations=None, calendar_name='Holidays',
+                interval=WATCH_INTERVAL_SECONDS):
+    """Re-exports the feeds whenever the holiday file changes (polled every interval seconds) until Ctrl+C."""
+    import data_sources
+
+    path = data_sources.source_path(holidays_file)
+    fingerprint = None
+    try:
+        while True:
+            current = data_sources.file_fingerprint(path)
+            if current is not None and current != fingerprint:
+                fingerprint = current
+                try:
+                    summary = export_feeds_from_file(holidays_file, output_dir, extra_locations, calendar_name)
+                except OSError as e:
+                    print(f"Warning: Could not update calendar feeds: {e}")
+                    logging.warning(f"Could not update calendar feeds in '{output_dir}': {e}")
+                else:
+                    if summary:
+                        print(summary_line(summary, output_dir))
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def summary_line(summary, output_dir):
+    """One line describing an export_feeds result, for the console."""
+    return (f"Calendar feeds in '{output_dir}': {len(summary['written'])} written, "
+            f"{summary['unchanged']} unchanged, {len(summary['removed'])} removed.")
+
+
+def _is_feed_file(output_dir, file_name):
+    """True if a name from feeds.json is a feed file directly inside output_dir (not '../x' or a symlink out)."""
+    if not isinstance(file_name, str) or not FEED_FILE_PATTERN.fullmatch(file_name):
+        logging.warning(f"Ignoring '{file_name}' listed in {MANIFEST_FILE}: not a feed file name.")
+        return False
+    directory = os.path.realpath(output_dir)
+    return os.path.dirname(os.path.realpath(os.path.join(directory, file_name))) == directory
+
+
+if __name__ == "__main__":
+    import configparser
+    import sys
+
+    import tool_config
+
+    parser = argparse.ArgumentParser(description="Export iCalendar feeds (All, Onshore, Offshore, per location).")
+    parser.add_argument('--output', required=True, help="Folder for the .ics feeds and feeds.json")
+    parser.add_argument('--config', default='config.ini', help="Config profile (for HOLIDAYS_FILE)")
+    parser.add_argument('--location', action='append', help="Extra location feed (repeatable)")
+    parser.add_argument('--calendar-name', default='Holidays', help="Calendar name prefix (default: Holidays)")
+    parser.add_argument('--watch', action='store_true', help="Keep running and update the feeds when the holiday file changes")
+    args = parser.parse_args()
+
+    try:
+        settings = tool_config.load_settings(args.config)
+    except (configparser.Error, FileNotFoundError, ValueError) as e:
+        print(f"Configuration Error: {e}")
+        sys.exit(1)
+
+    if args.watch:
+        print(f"Watching {settings['HOLIDAYS_FILE']} (Ctrl+C to stop)")
+        watch_feeds(settings['HOLIDAYS_FILE'], args.output, args.location, args.calendar_name)
+        sys.exit(0)
+    try:
+        summary = export_feeds_from_file(settings['HOLIDAYS_FILE'], args.output, args.location, args.calendar_name)
+    except OSError as e:
+        print(f"Error: Could not write calendar feeds: {e}")
+        logging.error(f"Could not write calendar feeds to '{args.output}': {e}")
+        sys.exit(1)
+    if summary is None:
+        print("No holiday data found or file is empty. No feeds written.")
+        sys.exit(1)
+    print(summary_line(summary, args.output))
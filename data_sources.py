@@ -0,0 +1,281 @@
+"""
+Input sources for holiday and employee data.
+
+HOLIDAYS_FILE and EMPLOYEES_FILE may point at:
+  - a CSV file (.csv), optionally gzip-compressed (.csv.gz)
+  - a Parquet file (.parquet, .pq); needs the optional pyarrow package
+  - a SQLite database (.db, .sqlite, .sqlite3); the table is given after '#'
+    (e.g. hr.sqlite#holidays), by default 'holidays' or 'employees'
+The columns are the same as in the CSV files. Holiday dates are MM/DD/YYYY text
+in CSV files, ISO 'YYYY-MM-DD' text in SQLite and date/timestamp columns in Parquet.
+
+Date-range filters are applied as early as each format allows:
+  - SQLite  : a WHERE clause, so only matching rows leave the database
+  - Parquet : row groups whose Date statistics fall outside the range are never read
+  - CSV     : the file is read in chunks and only rows in the range are kept
+Only the columns the tool uses are read. When a date range leaves rows out, the
+distinct (Shore, Locations) pairs of the whole source are kept in
+df.attrs[SHORE_LOCATIONS_ATTR], so a city's shore can still be worked out
+(see holiday_locations.py).
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+HOLIDAY_COLUMNS = ['Date', 'HolidayName', 'Shore', 'Locations']
+EMPLOYEE_COLUMNS = ['Email', 'Employee Name', 'Locations']
+CSV_CHUNK_ROWS = 100000
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+SHORE_LOCATIONS_ATTR = 'shore_locations'
+
+
+def split_source(spec):
+    """Splits 'path#table' into (path, table); table is None when not given."""
+    path, _, table = str(spec).partition('#')
+    return path, table or None
+
+
+def source_path(spec):
+    """The file behind a source spec (for existence checks and change detection)."""
+    return split_source(spec)[0]
+
+
+def file_fingerprint(path):
+    """(mtime_ns, size) of a file, or None when it cannot be read; changes when the file does."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DataSource:
+    """Base class: reads holiday rows (with filters) and employee rows from one file."""
+
+    kind = 'source'
+
+    def __init__(self, spec, default_table=None):
+        self.spec = spec
+        self.path, table = split_source(spec)
+        self.table = table or default_table
+
+    def read_holidays(self, start_date=None, end_date=None):
+        """
+        Returns a DataFrame with HOLIDAY_COLUMNS. 'Date' is datetime64 (NaT where a date
+        could not be parsed); with start_date/end_date only rows with start_date <= Date < end_date
+        are returned, plus, where the reader sees them, rows with unparseable dates (so they can be reported);
+        df.attrs[SHORE_LOCATIONS_ATTR] then lists the (Shore, Locations) pairs of every row in the source.
+        """
+        raise NotImplementedError
+
+    def iter_employees(self, columns=EMPLOYEE_COLUMNS, chunk_rows=CSV_CHUNK_ROWS):
+        """Yields DataFrames of employee rows with those of columns that exist in the source."""
+        raise NotImplementedError
+
+    def read_employees(self, columns=EMPLOYEE_COLUMNS):
+        chunks = list(self.iter_employees(columns))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(columns))
+
+    def _check_exists(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"File '{self.path}' not found.")
+
+
+class CSVSource(DataSource):
+    """A CSV file, plain or compressed (compression is inferred from the extension)."""
+
+    kind = 'csv'
+
+    def read_holidays(self, start_date=None, end_date=None):
+        kept, shore_locations = [], set()
+        for chunk in pd.read_csv(self.path, usecols=lambda column: column in HOLIDAY_COLUMNS,
+                                 chunksize=CSV_CHUNK_ROWS, dtype=str):
+            if 'Date' in chunk.columns and (start_date or end_date):
+                shore_locations.update(_shore_location_pairs(chunk))
+            if 'Date' in chunk.columns:
+                chunk['Date'] = pd.to_datetime(chunk['Date'], format='%m/%d/%Y', errors='coerce')
+                chunk = chunk[_in_range(chunk['Date'], start_date, end_date)]
+            kept.append(chunk)
+        df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=HOLIDAY_COLUMNS)
+        if shore_locations:
+            df.attrs[SHORE_LOCATIONS_ATTR] = list(shore_locations)
+        return df
+
+    def iter_employees(self, columns=EMPLOYEE_COLUMNS, chunk_rows=CSV_CHUNK_ROWS):
+        wanted = set(columns)
+        yield from pd.read_csv(self.path, usecols=lambda column: column in wanted, chunksize=chunk_rows)
+
+
+class ParquetSource(DataSource):
+    """A Parquet file (read with pyarrow). Date-range filters skip whole row groups by their statistics."""
+
+    kind = 'parquet'
+
+    def _parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(f"Reading '{self.path}' needs the pyarrow package. Install it with: pip install pyarrow")
+        self._check_exists()
+        return pq
+
+    def read_holidays(self, start_date=None, end_date=None):
+        pq = self._parquet()
+        import pyarrow as pa
+
+        schema = pq.read_schema(self.path)
+        columns = [name for name in HOLIDAY_COLUMNS if name in schema.names]
+        filters = None
+        if 'Date' in schema.names and (start_date or end_date):
+            date_type = schema.field('Date').type
+            if pa.types.is_date(date_type) or pa.types.is_timestamp(date_type):
+                as_value = _as_date if pa.types.is_date(date_type) else _as_timestamp(date_type)
+                filters = []
+                if start_date:
+                    filters.append(('Date', '>=', as_value(start_date)))
+                if end_date:
+                    filters.append(('Date', '<', as_value(end_date)))
+        df = pq.read_table(self.path, columns=columns, filters=filters).to_pandas()
+        if 'Date' in df.columns:
+            df['Date'] = _to_datetime(df['Date'])
+            if filters is None:
+                df = df[_in_range(df['Date'], start_date, end_date)].reset_index(drop=True)
+        if (start_date or end_date) and 'Shore' in columns and 'Locations' in columns:
+            everything = pq.read_table(self.path, columns=['Shore', 'Locations']).to_pandas()
+            df.attrs[SHORE_LOCATIONS_ATTR] = list(_shore_location_pairs(everything))
+        return df
+
+    def iter_employees(self, columns=EMPLOYEE_COLUMNS, chunk_rows=CSV_CHUNK_ROWS):
+        pq = self._parquet()
+        parquet_file = pq.ParquetFile(self.path)
+        present = [name for name in columns if name in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=present):
+            yield batch.to_pandas()
+
+
+class SQLiteSource(DataSource):
+    """A table in a SQLite database, opened read-only. Filters become a WHERE clause."""
+
+    kind = 'sqlite'
+
+    def _connect(self):
+        self._check_exists()
+        return sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True)
+
+    def _columns(self, connection):
+        rows = connection.execute(f"PRAGMA table_info({_quote(self.table)})").fetchall()
+        if not rows:
+            raise KeyError(f"Table '{self.table}' not found in {self.path}.")
+        return [row[1] for row in rows]
+
+    def _has_rowid(self, connection):
+        try:
+            connection.execute(f"SELECT rowid FROM {_quote(self.table)} LIMIT 0")
+            return True
+        except sqlite3.OperationalError:  # a view or a WITHOUT ROWID table
+            return False
+
+    def read_holidays(self, start_date=None, end_date=None):
+        connection = self._connect()
+        try:
+            columns = [name for name in HOLIDAY_COLUMNS if name in self._columns(connection)]
+            where, parameters = [], []
+            if 'Date' in columns:
+                # ISO dates compare correctly as text, and an index on Date is used for the range
+                if start_date:
+                    where.append(f"{_quote('Date')} >= ?")
+                    parameters.append(_as_date(start_date).isoformat())
+                if end_date:
+                    where.append(f"{_quote('Date')} < ?")
+                    parameters.append(_as_date(end_date).isoformat())
+            query = f"SELECT {', '.join(_quote(name) for name in columns)} FROM {_quote(self.table)}"
+            if where:
+                query += " WHERE " + " AND ".join(where)
+            if self._has_rowid(connection):
+                query += " ORDER BY rowid"  # table order, as in a CSV file (an index scan would return date order)
+            df = pd.read_sql_query(query, connection, params=parameters)
+            if where and 'Shore' in columns and 'Locations' in columns:
+                df.attrs[SHORE_LOCATIONS_ATTR] = connection.execute(
+                    f"SELECT DISTINCT {_quote('Shore')}, {_quote('Locations')} FROM {_quote(self.table)}").fetchall()
+        finally:
+            connection.close()
+        if 'Date' in df.columns:
+            df['Date'] = pd.to_datetime(df['Date'].astype(str).str.slice(0, 10), format='%Y-%m-%d', errors='coerce')
+        return df
+
+    def iter_employees(self, columns=EMPLOYEE_COLUMNS, chunk_rows=CSV_CHUNK_ROWS):
+        connection = self._connect()
+        try:
+            present = [name for name in columns if name in self._columns(connection)]
+            query = f"SELECT {', '.join(_quote(name) for name in present)} FROM {_quote(self.table)}"
+            yield from pd.read_sql_query(query, connection, chunksize=chunk_rows)
+        finally:
+            connection.close()
+
+
+def open_source(spec, default_table=None):
+    """Returns the DataSource for a HOLIDAYS_FILE/EMPLOYEES_FILE value, chosen by file extension."""
+    path = source_path(spec).lower()
+    if path.endswith(SQLITE_EXTENSIONS):
+        return SQLiteSource(spec, default_table)
+    if path.endswith(PARQUET_EXTENSIONS):
+        return ParquetSource(spec, default_table)
+    return CSVSource(spec, default_table)
+
+
+def read_holidays(spec, start_date=None, end_date=None):
+    return open_source(spec, 'holidays').read_holidays(start_date, end_date)
+
+
+def read_employees(spec, columns=EMPLOYEE_COLUMNS):
+    return open_source(spec, 'employees').read_employees(columns)
+
+
+def iter_employees(spec, columns=EMPLOYEE_COLUMNS, chunk_rows=CSV_CHUNK_ROWS):
+    return open_source(spec, 'employees').iter_employees(columns, chunk_rows)
+
+
+# --- Helpers ---
+def _in_range(dates, start_date, end_date):
+    """Rows with start_date <= date < end_date, plus rows without a valid date."""
+    mask = pd.Series(True, index=dates.index)
+    if start_date:
+        mask &= dates >= pd.Timestamp(start_date)
+    if end_date:
+        mask &= dates < pd.Timestamp(end_date)
+    return mask | dates.isna()
+
+
+def _shore_location_pairs(df):
+    if 'Shore' not in df.columns or 'Locations' not in df.columns:
+        return set()
+    return set(zip(df['Shore'], df['Locations']))
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _as_timestamp(timestamp_type):
+    def convert(value):
+        timestamp = pd.Timestamp(value)
+        if timestamp_type.tz is not None:
+            timestamp = timestamp.tz_localize(timestamp_type.tz)
+        return timestamp.to_pydatetime()
+    return convert
+
+
+def _to_datetime(values):
+    dates = pd.to_datetime(values, errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates
+
+
+def _quote(identifier):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
@@ -0,0 +1,150 @@
+"""
+Change-driven delivery (DELTA_MODE in the [DELIVERY] section of config.ini).
+
+For every profile and recipient, a SQLite file (DELTA_STATE_FILE) keeps the
+content hash of the digest last delivered to them (see
+HolidayDigest.content_hash). With DELTA_MODE on, a run hashes each recipient's
+digest before rendering anything and emails only the recipients whose hash
+differs: their holidays changed, the month rolled over (the months shown are
+part of the hash), or they have never received one. A hash is recorded only
+after a successful send, so failed recipients are tried again on the next run.
+
+Usage (inspect or reset the state):
+    python delivery_state.py --state delivery_state.db [--profile config] [--forget]
+"""
+
+import argparse
+import contextlib
+import sqlite3
+import time
+
+import email_generator
+
+
+class DeliveryStateStore:
+    """Last delivered digest hash per (profile, recipient), kept in a SQLite file."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS delivered_digests (
+                    profile TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    digest_hash TEXT NOT NULL,
+                    delivered_at REAL NOT NULL,
+                    PRIMARY KEY (profile, recipient)
+                )
+            """)
+
+    def _connect(self):
+        # isolation_level=None: transactions are managed explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def hashes(self, profile):
+        """Returns {recipient: digest_hash} for a profile."""
+        with contextlib.closing(self._connect()) as conn:
+            return dict(conn.execute(
+                "SELECT recipient, digest_hash FROM delivered_digests WHERE profile = ?", (profile,)
+            ).fetchall())
+
+    def record(self, profile, delivered):
+        """Stores the hash of each (recipient, digest_hash) that was delivered, in one transaction."""
+        if not delivered:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO delivered_digests (profile, recipient, digest_hash, delivered_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(profile, recipient, digest_hash, now) for recipient, digest_hash in delivered]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def forget(self, profile=None):
+        """Drops the stored hashes (of one profile, or all), so the next run sends to everyone."""
+        with contextlib.closing(self._connect()) as conn:
+            if profile is None:
+                return conn.execute("DELETE FROM delivered_digests").rowcount
+            return conn.execute("DELETE FROM delivered_digests WHERE profile = ?", (profile,)).rowcount
+
+    def summary(self):
+        """Returns {profile: (recipients, last delivery time)}."""
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT profile, COUNT(*), MAX(delivered_at) FROM delivered_digests GROUP BY profile ORDER BY profile"
+            ).fetchall()
+        return {profile: (count, last) for profile, count, last in rows}
+
+
+def recipient_key(email):
+    return email.strip().lower()
+
+
+def variant_hashes(holidays_df, variants, company_name_footer, signature_name, working_days=False,
+                   business_days_ahead=10):
+    """
+    Returns {(recipient_name, location): digest hash} for each variant.
+    The digest of each location is built once; names only change its greeting.
+    """
+    location_digests = {}
+    hashes = {}
+    for recipient_name, location in variants:
+        if location not in location_digests:
+            location_digests[location] = email_generator.build_holiday_digest(
+                holidays_df, company_name_footer=company_name_footer, signature_name=signature_name,
+                location=location, working_days=working_days, business_days_ahead=business_days_ahead)
+        hashes[(recipient_name, location)] = location_digests[location].for_recipient(recipient_name).content_hash()
+    return hashes
+
+
+def changed_recipients(store, settings, holidays_df, recipients, metrics):
+    """
+    Splits off the recipients whose digest is unchanged since their last delivery.
+    recipients are (email, name, location) tuples. Returns (changed recipients, {email: digest hash}).
+    """
+    personalize = settings.get('PERSONALIZE_EMAILS', False)
+
+    def variant(name, location):
+        return (name, location) if personalize else (None, None)
+
+    with metrics.timer('delta_check'):
+        hashes = variant_hashes(holidays_df, {variant(name, location) for _, name, location in recipients},
+                                settings['COMPANY_NAME_FOOTER'], settings['SIGNATURE_NAME'],
+                                working_days=settings.get('WORKING_DAYS_SECTION', False),
+                                business_days_ahead=settings.get('BUSINESS_DAYS_AHEAD', 10))
+        delivered = store.hashes(settings['PROFILE_NAME'])
+        changed, recipient_hashes = [], {}
+        for email, name, location in recipients:
+            digest_hash = hashes[variant(name, location)]
+            if delivered.get(recipient_key(email)) == digest_hash:
+                continue
+            changed.append((email, name, location))
+            recipient_hashes[email] = digest_hash
+    metrics.inc('recipients_unchanged', len(recipients) - len(changed))
+    return changed, recipient_hashes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or reset the delta-mode delivery state.")
+    parser.add_argument('--state', default='delivery_state.db', help="DELTA_STATE_FILE to open")
+    parser.add_argument('--profile', help="Only this profile (config file name without .ini)")
+    parser.add_argument('--forget', action='store_true', help="Drop the stored hashes so the next run sends to everyone")
+    args = parser.parse_args()
+
+    store = DeliveryStateStore(args.state)
+    if args.forget:
+        removed = store.forget(args.profile)
+        print(f"Forgot {removed} delivered digest(s){f' for profile {args.profile}' if args.profile else ''}.")
+    else:
+        for profile, (count, last) in store.summary().items():
+            if args.profile and profile != args.profile:
+                continue
+            print(f"{profile}: {count} recipient(s), last delivery {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last))}")
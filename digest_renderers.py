@@ -0,0 +1,206 @@
+"""
+Output formats for a holiday digest (see email_generator.build_holiday_digest).
+
+The digest (months, holidays split by shore, calendar highlights) is computed
+once; each renderer here only serializes it:
+  - html : the full HTML email document
+  - body : only the content of <body> (Outlook's HTMLBody, .eml drafts)
+  - text : a plain-text version of the email
+  - eml  : an email draft with plain-text and HTML alternatives
+  - ics  : an iCalendar file with one all-day event per holiday
+Use render(digest, 'text', ...) or the render_* functions directly.
+
+build_message() is the one place MIME messages are put together, both for
+sending (main_tool) and for drafts.
+"""
+
+import hashlib
+from datetime import timedelta, timezone
+from email import charset as email_charset
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import email_generator
+
+# Longest line allowed in an SMTP message (RFC 5321), excluding CRLF
+SMTP_MAX_LINE_LENGTH = 998
+ICS_PRODID = '-//Holiday Reminder Tool//Holiday Calendar//EN'
+
+
+# --- HTML ---
+def render_html(digest, compact=False):
+    return ''.join(email_generator.iter_digest_html(digest, compact=compact))
+
+
+def render_body_html(digest, compact=False):
+    """The content of the email's <body> (what Outlook's HTMLBody and .eml drafts need)."""
+    return ''.join(email_generator.iter_digest_html(digest, compact=compact, body_only=True))
+
+
+# --- Plain text ---
+def render_text(digest):
+    month_names = [month.name for month in digest.months]
+    months_text = ', '.join(month_names[:-1]) + ' and ' + month_names[-1] if len(month_names) > 1 else month_names[0]
+    lines = [f"Hi {digest.greeting_name},", "", f"Here are the upcoming holidays for {months_text}:", ""]
+    for month in digest.months:
+        lines.append(month.name)
+        lines.append('=' * len(month.name))
+        for shore_type, entries in (('Onshore', month.onshore), ('Offshore', month.offshore)):
+            lines.append(f"{shore_type}:")
+            if not entries:
+                lines.append(f"  No {shore_type} Holidays")
+            for entry in entries:
+                lines.append(f"  - {entry.date.strftime('%b %d')}: {entry.name} ({entry.locations})")
+        lines.append("")
+    if digest.working_days is not None:
+        summary = digest.working_days
+        lines.append("Working days left to plan with:")
+        for label, month_days, date_after in summary.rows:
+            counts = ', '.join(f"{days} in {name}" for days, name in zip(month_days, summary.month_names))
+            lines.append(f"  - {label}: {counts}; {summary.days_ahead} working days from today is {date_after.strftime('%a, %b %d')}")
+        lines.append("")
+    lines += [
+        "Wishing you restful and joyful holidays!",
+        "Let's plan deliverables accordingly without affecting Holidays!",
+        "",
+        "Best regards,",
+        f"{digest.signature_name}",
+        "",
+        "--",
+        "This is an automated reminder. Please do not reply to this email.",
+        f"\u00a9 {digest.generated_at.year} {digest.company_name_footer}",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+# --- MIME / .eml ---
+def choose_transfer_encoding(html_content, allow_8bit):
+    """
+    Transfer encoding for a compact HTML body: 8bit (no encoding overhead) when the
+    server accepts 8BITMIME and no line is too long for SMTP, otherwise quoted-printable
+    (which only escapes non-ASCII characters, unlike base64's flat +33%).
+    """
+    if allow_8bit and max(map(len, html_content.splitlines() or [''])) <= SMTP_MAX_LINE_LENGTH:
+        return '8bit'
+    return 'quoted-printable'
+
+
+def build_message(sender_email, to_email, subject, html_content, compact=False, allow_8bit=False, text_content=None):
+    """
+    Builds the email. Returns (message, mail_options): message is a str, or bytes when
+    the body is sent as 8bit (which then needs the BODY=8BITMIME mail option).
+    By default the HTML is base64-encoded; compact=True picks choose_transfer_encoding().
+    text_content, when given, is attached as the plain-text alternative.
+    """
+    msg = MIMEMultipart('alternative')
+    msg['From'] = sender_email
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    if text_content is not None:
+        msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+
+    final_html_content = email_generator.clean_string(html_content) # Clean the final HTML just in case
+    if not compact:
+        msg.attach(MIMEText(final_html_content, 'html', 'utf-8'))
+        return msg.as_string(), ()
+
+    body_charset = email_charset.Charset('utf-8')
+    if choose_transfer_encoding(final_html_content, allow_8bit) == '8bit':
+        body_charset.body_encoding = None
+        msg.attach(MIMEText(final_html_content, 'html', body_charset))
+        return msg.as_bytes(), ('BODY=8BITMIME',)
+    body_charset.body_encoding = email_charset.QP
+    msg.attach(MIMEText(final_html_content, 'html', body_charset))
+    return msg.as_string(), ()
+
+
+def render_eml(digest, subject, sender='', to='', compact=False, body_html=None):
+    """
+    An .eml draft (str) with plain-text and HTML alternatives. The HTML part is the body
+    content only, which email clients open as an editable draft. Pass body_html if it
+    has already been rendered for this digest.
+    """
+    if body_html is None:
+        body_html = render_body_html(digest, compact=compact)
+    message, _ = build_message(sender, to, subject, body_html, compact=compact, text_content=render_text(digest))
+    return message
+
+
+# --- iCalendar ---
+def holiday_uid(entry):
+    """A UID that stays the same for the same holiday across runs and files."""
+    key = f"{entry.date.strftime('%Y-%m-%d')}|{entry.name}|{entry.shore}|{entry.locations}"
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]}@holiday-reminder-tool"
+
+
+def _ics_escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_fold(line):
+    """Folds a content line at 75 octets (RFC 5545), without splitting UTF-8 characters."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74  # continuation lines start with a space
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def ics_event_lines(entry, dtstamp):
+    """The VEVENT lines for one holiday (an all-day event)."""
+    day = entry.date.strftime('%Y%m%d')
+    next_day = (entry.date + timedelta(days=1)).strftime('%Y%m%d')
+    return [
+        'BEGIN:VEVENT',
+        f'UID:{holiday_uid(entry)}',
+        f'DTSTAMP:{dtstamp}',
+        f'DTSTART;VALUE=DATE:{day}',
+        f'DTEND;VALUE=DATE:{next_day}',
+        f'SUMMARY:{_ics_escape(entry.name)}',
+        f'DESCRIPTION:{_ics_escape(f"{entry.shore} - {entry.locations}")}',
+        f'CATEGORIES:{_ics_escape(entry.shore)}',
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT',
+    ]
+
+
+def ics_document(event_lines, calendar_name):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{ICS_PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+             f'X-WR-CALNAME:{_ics_escape(calendar_name)}']
+    lines += event_lines
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_ics_fold(line) for line in lines) + '\r\n'
+
+
+def render_ics(digest, calendar_name='Holidays'):
+    """An iCalendar file with one all-day event per holiday in the digest."""
+    dtstamp = digest.generated_at.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    event_lines = []
+    for month in digest.months:
+        for entry in month.holidays:
+            event_lines += ics_event_lines(entry, dtstamp)
+    return ics_document(event_lines, calendar_name)
+
+
+RENDERERS = {
+    'html': render_html,
+    'body': render_body_html,
+    'text': render_text,
+    'eml': render_eml,
+    'ics': render_ics,
+}
+
+
+def render(digest, output_format, **options):
+    """Renders the digest in one of the RENDERERS formats ('html', 'body', 'text', 'eml', 'ics')."""
+    if output_format not in RENDERERS:
+        raise ValueError(f"Unsupported output format: {output_format}. Must be one of: {', '.join(RENDERERS)}.")
+    return RENDERERS[output_format](digest, **options)
@@ -5,17 +5,35 @@ import sys
 import os
 import webbrowser
 import tempfile
-import re
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
-# Import our existing email generator
-import email_generator
+# pandas and the email generator are imported only when the email is rendered in this
+# process; with a resident helper running (resident_helper.py) they are never needed here
+import preview_server
+import profiling
+import resident_helper
+import run_metrics
+
+# How often an open preview checks the holiday file for changes
+PREVIEW_WATCH_MS = 1000
+
+
+def _with_run_metrics(action):
+    """Collects per-phase timings for one button action and writes them to the metrics directory."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self._metrics = run_metrics.RunMetrics(job='holiday_email_app', profile=action)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._metrics.write(self.metrics_dir, keep_runs=self.keep_run_summaries)
+                self._metrics = run_metrics.NULL_METRICS
+        return wrapper
+    return decorator
 
 class HolidayEmailApp:
-    # Compile regex pattern once at class level for better performance
-    _BODY_PATTERN = re.compile(r'<body>(.*?)</body>', re.DOTALL)
-    
     def __init__(self, root):
         self.root = root
         self.root.title("Holiday Reminder Email Generator")
@@ -27,11 +45,19 @@ class HolidayEmailApp:
         style.theme_use('clam')  # Use a more modern theme
         
         # Load configuration
+        self._metrics = run_metrics.NULL_METRICS
         self.load_config()
         
-        # Cache for generated email
+        # Cache for generated email (the digest is computed once; each output is rendered from it)
         self._cached_email_html = None
+        self._cached_email_body = None
+        self._digest = None
         self._holidays_df = None
+        self._data_fingerprint = None  # of the holiday file the cached data was read from
+        self._helper_etag = None       # set while the cached email comes from the resident helper
+        self._preview_server = None    # started by the first preview
+        self._helper_poll = None       # Future of the running "has the email changed?" request to the helper
+        self._helper_poller = None     # its thread, so a slow helper never blocks the window
         
         # Create UI
         self.create_widgets()
@@ -48,6 +74,8 @@ class HolidayEmailApp:
             
             config.read(config_file_path)
             
+            self.config_path = os.path.abspath(config_file_path)
+            self.helper_port = config.getint('HELPER', 'PORT', fallback=resident_helper.DEFAULT_HELPER_PORT)
             self.holidays_file = config.get('FILE_PATHS', 'HOLIDAYS_FILE')
             self.employees_file = config.get('FILE_PATHS', 'EMPLOYEES_FILE')
             self.company_name_subject_suffix = config.get('EMAIL_CONTENT', 'COMPANY_NAME_SUBJECT_SUFFIX', 
@@ -56,6 +84,13 @@ class HolidayEmailApp:
                                                   fallback="Your Company Name")
             self.signature_name = config.get('EMAIL_CONTENT', 'SIGNATURE_NAME', 
                                             fallback="HR Department")
+            self.working_days = config.getboolean('EMAIL_CONTENT', 'WORKING_DAYS_SECTION', fallback=False)
+            self.business_days_ahead = config.getint('EMAIL_CONTENT', 'BUSINESS_DAYS_AHEAD', fallback=10)
+            self.metrics_dir = config.get('METRICS', 'METRICS_DIR', fallback='metrics')
+            self.keep_run_summaries = config.getint('METRICS', 'KEEP_RUN_SUMMARIES', fallback=200)
+            if config.getboolean('PROFILING', 'ENABLED', fallback=False) or '--profile' in sys.argv[1:]:
+                profiling.enable(config.get('PROFILING', 'PROFILES_DIR', fallback='profiles'),
+                                 keep=config.getint('PROFILING', 'KEEP_PROFILES', fallback=20))
             
         except Exception as e:
             messagebox.showerror("Configuration Error", f"Error loading config.ini: {e}")
@@ -160,53 +195,136 @@ class HolidayEmailApp:
                              bd=2)
         exit_btn.grid(row=2, column=0, columnspan=2, sticky='ew', pady=5, padx=5)
         
-    def generate_email_content(self, force_refresh=False):
-        """Generate the email HTML content with caching for better performance"""
+    def generate_email_content(self, force_refresh=False, show_errors=True):
+        """
+        Generate the email HTML content with caching for better performance.
+        With show_errors=False, problems are shown in the status line instead of a dialog.
+        """
+        report_error = messagebox.showerror if show_errors else (
+            lambda title, message: self.status_label.config(text=message.splitlines()[0], foreground="red"))
         try:
             # Return cached content if available and not forcing refresh
             if self._cached_email_html and not force_refresh:
+                self._metrics.inc('render_cache_hits')
                 return self._cached_email_html
             
+            # A resident helper already has the data loaded and the email rendered
+            with self._metrics.timer('render'):
+                reply = resident_helper.render('html', self.config_path, port=self.helper_port)
+            if reply is not None:
+                if not reply.get('ok'):
+                    report_error("Error", reply.get('error', "The resident helper could not render the email."))
+                    return None
+                self._metrics.inc('helper_renders')
+                return self._use_helper_reply(reply)
+            self._helper_etag = None
+            return self._render_in_process(force_refresh, report_error)
+            
+        except Exception as e:
+            report_error("Error", f"Failed to generate email content: {e}")
+            return None
+    
+    def _use_helper_reply(self, reply):
+        """Caches the email of a render reply from the resident helper and returns its HTML"""
+        self._cached_email_html = reply['content']
+        self._cached_email_body = None
+        self._digest = None
+        self._helper_etag = reply['etag']
+        return self._cached_email_html
+    
+    def _render_in_process(self, force_refresh, report_error):
+        """Reads the holiday file and renders the email here (no resident helper running)"""
+        import data_sources
+        import digest_renderers
+        import email_generator
+        try:
             # Load holiday data (cache it)
             if self._holidays_df is None or force_refresh:
-                self._holidays_df = email_generator.get_holiday_data(self.holidays_file)
+                start_date, end_date = email_generator.horizon_range(
+                    business_days_ahead=self.business_days_ahead if self.working_days else 0)
+                self._data_fingerprint = data_sources.file_fingerprint(data_sources.source_path(self.holidays_file))
+                self._holidays_df = email_generator.get_holiday_data(self.holidays_file, metrics=self._metrics,
+                                                                     start_date=start_date, end_date=end_date)
                 
                 if self._holidays_df.empty:
-                    messagebox.showerror("Error", "No holiday data found or file is empty.")
+                    report_error("Error", "No holiday data found or file is empty.")
                     return None
             
-            # Generate email HTML
-            email_html = email_generator.generate_modern_holiday_email_html(
-                self._holidays_df,
-                company_name_footer=self.company_name_footer,
-                signature_name=self.signature_name
-            )
+            # Build the digest and render the email HTML from it
+            with self._metrics.timer('render'):
+                self._digest = email_generator.build_holiday_digest(
+                    self._holidays_df,
+                    company_name_footer=self.company_name_footer,
+                    signature_name=self.signature_name,
+                    working_days=self.working_days,
+                    business_days_ahead=self.business_days_ahead
+                )
+                email_html = digest_renderers.render_html(self._digest)
             
             # Cache the result
             self._cached_email_html = email_html
+            self._cached_email_body = None
             return email_html
             
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate email content: {e}")
+            report_error("Error", f"Failed to generate email content: {e}")
+            return None
+    
+    def generate_email_body(self):
+        """The email's <body> content (for Outlook and .eml drafts), rendered from the cached digest"""
+        if not self.generate_email_content():
+            return None
+        if self._cached_email_body is None:
+            self._cached_email_body = self._helper_output('body')
+        if self._cached_email_body is None:
+            import digest_renderers
+            digest = self._local_digest()
+            if digest is None:
+                return None
+            with self._metrics.timer('render'):
+                self._cached_email_body = digest_renderers.render_body_html(digest)
+        return self._cached_email_body
+    
+    def _draft_eml(self, email_body):
+        """An .eml draft (text + HTML alternatives) with empty From/To for the user to fill in"""
+        message_text = self._helper_output('eml')
+        if message_text is not None:
+            return message_text
+        import digest_renderers
+        with self._metrics.timer('mime_build'):
+            return digest_renderers.render_eml(
+                self._local_digest(),
+                f"Upcoming Holiday Reminder! - {self.company_name_subject_suffix}",
+                body_html=email_body
+            )
+    
+    def _helper_output(self, output_format):
+        """Another output of the email the resident helper rendered, or None to render it here"""
+        if self._helper_etag is None:
+            return None
+        with self._metrics.timer('render'):
+            reply = resident_helper.render(output_format, self.config_path, port=self.helper_port)
+        if reply is None or not reply.get('ok'):
             return None
+        return reply['content']
     
+    def _local_digest(self):
+        """The digest, built in this process if the email came from the resident helper"""
+        if self._digest is None:
+            self._render_in_process(False, messagebox.showerror)
+        return self._digest
+    
+    @_with_run_metrics('open_in_email_client')
     def open_in_email_client(self):
         """Generate email and open in default email client"""
         self.status_label.config(text="Generating email content...", foreground="blue")
         self.root.update()
         
-        email_html = self.generate_email_content()
-        if not email_html:
+        email_body = self.generate_email_body()
+        if not email_body:
             self.status_label.config(text="Failed to generate email", foreground="red")
             return
         
-        # Extract body content using compiled pattern
-        body_match = self._BODY_PATTERN.search(email_html)
-        if body_match:
-            email_body = body_match.group(1).strip()
-        else:
-            email_body = email_html
-        
         # Try Outlook COM automation (Windows only)
         if sys.platform == 'win32':
             try:
@@ -261,19 +379,11 @@ class HolidayEmailApp:
             temp_dir = tempfile.gettempdir()
             eml_path = os.path.join(temp_dir, "holiday_reminder.eml")
             
-            from email.mime.multipart import MIMEMultipart
-            from email.mime.text import MIMEText
+            message_text = self._draft_eml(email_body)
             
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"Upcoming Holiday Reminder! - {self.company_name_subject_suffix}"
-            msg['From'] = ''
-            msg['To'] = ''
-            
-            html_part = MIMEText(email_body, 'html', 'utf-8')
-            msg.attach(html_part)
-            
-            with open(eml_path, 'w', encoding='utf-8') as f:
-                f.write(msg.as_string())
+            with self._metrics.timer('file_write'):
+                with open(eml_path, 'w', encoding='utf-8') as f:
+                    f.write(message_text)
             
             os.startfile(eml_path)
             
@@ -288,6 +398,7 @@ class HolidayEmailApp:
                                f"Could not open email:\n{e}\n\n"
                                "Use 'Save Files' button instead.")
     
+    @_with_run_metrics('preview_in_browser')
     def preview_in_browser(self):
         """Generate and preview email in browser"""
         self.status_label.config(text="Generating preview...", foreground="blue")
@@ -299,21 +410,71 @@ class HolidayEmailApp:
             return
         
         try:
-            # Save to temp file and open in browser
-            temp_dir = tempfile.gettempdir()
-            preview_path = os.path.join(temp_dir, "holiday_email_preview.html")
-            
-            with open(preview_path, 'w', encoding='utf-8') as f:
-                f.write(email_html)
-            
-            webbrowser.open('file://' + preview_path)
+            # Served from memory by a local preview server; an open preview page reloads itself
+            if self._preview_server is None:
+                self._preview_server = preview_server.PreviewServer().start()
+                self.root.after(PREVIEW_WATCH_MS, self._watch_preview_data)
+            self._preview_server.publish(email_html)
             
-            self.status_label.config(text="✓ Preview opened in browser!", foreground="green")
+            if self._preview_server.viewers:
+                self.status_label.config(text="✓ Preview is open in your browser (it updates by itself)", foreground="green")
+            else:
+                webbrowser.open(self._preview_server.url)
+                self.status_label.config(text="✓ Preview opened in browser!", foreground="green")
             
         except Exception as e:
             self.status_label.config(text="Failed to open preview", foreground="red")
             messagebox.showerror("Error", f"Failed to open preview: {e}")
     
+    def _watch_preview_data(self):
+        """Checks the holiday file once per PREVIEW_WATCH_MS while the preview server runs"""
+        if self._preview_server is None:
+            return
+        if self._helper_poll is not None:
+            if self._helper_poll.done():
+                self._apply_helper_poll(self._helper_poll.result())
+                self._helper_poll = None
+        elif self._helper_etag is not None:
+            # The resident helper watches the files; ask it (off the UI thread, as re-reading a
+            # changed file takes a while) whether the email changed
+            if self._helper_poller is None:
+                self._helper_poller = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preview-poll')
+            self._helper_poll = self._helper_poller.submit(
+                resident_helper.render, 'html', self.config_path, port=self.helper_port, etag=self._helper_etag)
+        else:
+            import data_sources
+            fingerprint = data_sources.file_fingerprint(data_sources.source_path(self.holidays_file))
+            if fingerprint != self._data_fingerprint:
+                self._refresh_preview()
+        self.root.after(PREVIEW_WATCH_MS, self._watch_preview_data)
+    
+    def _apply_helper_poll(self, reply):
+        """Publishes the email a poll of the resident helper returned, if it changed"""
+        if reply is None:
+            self._refresh_preview()  # the helper stopped; render here from now on
+        elif not reply.get('ok'):
+            self.status_label.config(text=reply.get('error', "The resident helper could not render the email."),
+                                     foreground="red")
+        elif not reply.get('not_modified') and self._preview_server.publish(self._use_helper_reply(reply)):
+            self.status_label.config(text="✓ Preview updated (holiday file changed)", foreground="green")
+    
+    @_with_run_metrics('refresh_preview')
+    def _refresh_preview(self):
+        """Re-reads the changed holiday file and pushes the new email to the open preview"""
+        email_html = self.generate_email_content(force_refresh=True, show_errors=False)
+        if email_html and self._preview_server.publish(email_html):
+            self.status_label.config(text="✓ Preview updated (holiday file changed)", foreground="green")
+    
+    def close_preview(self):
+        if self._preview_server is not None:
+            self._preview_server.stop()
+            self._preview_server = None
+        if self._helper_poller is not None:
+            self._helper_poller.shutdown(wait=False)
+            self._helper_poller = None
+            self._helper_poll = None
+    
+    @_with_run_metrics('save_files')
     def save_files(self):
         """Save email files to current directory"""
         self.status_label.config(text="Saving files...", foreground="blue")
@@ -325,31 +486,19 @@ class HolidayEmailApp:
             return
         
         try:
-            # Extract body content using compiled pattern
-            body_match = self._BODY_PATTERN.search(email_html)
-            if body_match:
-                email_body = body_match.group(1).strip()
-            else:
-                email_body = email_html
+            email_body = self.generate_email_body()
             
             # Save HTML preview
-            with open("holiday_email_preview.html", 'w', encoding='utf-8') as f:
-                f.write(email_html)
+            with self._metrics.timer('file_write'):
+                with open("holiday_email_preview.html", 'w', encoding='utf-8') as f:
+                    f.write(email_html)
             
             # Save .eml file
-            from email.mime.multipart import MIMEMultipart
-            from email.mime.text import MIMEText
-            
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"Upcoming Holiday Reminder! - {self.company_name_subject_suffix}"
-            msg['From'] = ''
-            msg['To'] = ''
-            
-            html_part = MIMEText(email_body, 'html', 'utf-8')
-            msg.attach(html_part)
+            message_text = self._draft_eml(email_body)
             
-            with open("holiday_reminder_draft.eml", 'w', encoding='utf-8') as f:
-                f.write(msg.as_string())
+            with self._metrics.timer('file_write'):
+                with open("holiday_reminder_draft.eml", 'w', encoding='utf-8') as f:
+                    f.write(message_text)
             
             self.status_label.config(text="✓ Files saved successfully!", foreground="green")
             messagebox.showinfo("Success", 
@@ -364,9 +513,15 @@ class HolidayEmailApp:
 
 
 def main():
+    if '--resident' in sys.argv[1:]:
+        # Run as the resident helper (no window); later launches of the app render through it
+        sys.exit(resident_helper.serve('config.ini'))
     root = tk.Tk()
     app = HolidayEmailApp(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        app.close_preview()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,20 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import calendar
+import hashlib
+import html
 import os
+import re
+import threading
+from collections import OrderedDict
 import unicodedata # <--- NEW: For robust string cleaning
 
+import business_days
+import data_sources
+import holiday_locations
+import profiling
+import run_metrics
+
 # --- Helper function for robust string cleaning ---
 def clean_string(text):
     if isinstance(text, str):
@@ -16,10 +27,20 @@ def clean_string(text):
             return text.replace('\xa0', ' ').encode('ascii', 'ignore').decode('utf-8').strip()
     return text
 
-def get_holiday_data(holiday_file='holidays.csv'):
-    """Reads holiday data from a CSV file with 'Shore' and 'Locations' columns."""
+@profiling.profiled('get_holiday_data')
+def get_holiday_data(holiday_file='holidays.csv', metrics=None, start_date=None, end_date=None):
+    """
+    Reads holiday data with 'Shore' and 'Locations' columns from a CSV, gzip CSV,
+    Parquet or SQLite source (see data_sources.py).
+    start_date/end_date keep only holidays with start_date <= Date < end_date (see horizon_range);
+    the range is pushed down into the reader.
+    metrics (run_metrics.RunMetrics) optionally records the parse and clean timings.
+    """
+    metrics = metrics or run_metrics.NULL_METRICS
     try:
-        df = pd.read_csv(holiday_file)
+        with metrics.timer('csv_parse'):
+            df = data_sources.read_holidays(holiday_file, start_date=start_date, end_date=end_date)
+        shore_locations = df.attrs.pop(data_sources.SHORE_LOCATIONS_ATTR, None)
         
         # Ensure required columns exist
         required_columns = ['Date', 'HolidayName', 'Shore', 'Locations']
@@ -29,14 +50,6 @@ def get_holiday_data(holiday_file='holidays.csv'):
                 # logging.error(f"Required column '{col}' not found in {holiday_file}.") # Assuming logging is set up in main
                 return pd.DataFrame()
 
-        # Convert 'Date' column with specific format, coercing errors
-        try:
-            df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%Y', errors='coerce')
-        except Exception as e: # Catch any unexpected error during conversion
-            print(f"Error converting 'Date' column in '{holiday_file}'. Ensure dates are in MM/DD/YYYY format. Details: {e}")
-            # logging.error(f"Error converting 'Date' column in '{holiday_file}': {e}")
-            return pd.DataFrame()
-
         # Drop rows where date conversion failed (NaT)
         original_row_count = len(df)
         df.dropna(subset=['Date'], inplace=True)
@@ -46,10 +59,18 @@ def get_holiday_data(holiday_file='holidays.csv'):
 
 
         # Apply cleaning to relevant text columns immediately after reading
-        for col in ['HolidayName', 'Shore', 'Locations']:
-            if col in df.columns: # Check if column exists before applying
-                 df[col] = df[col].apply(clean_string)
-
+        with metrics.timer('clean'):
+            for col in ['HolidayName', 'Shore', 'Locations']:
+                if col in df.columns: # Check if column exists before applying
+                     df[col] = df[col].apply(clean_string)
+            # The shore of each city comes from the whole file, even when only a date range was read
+            if shore_locations is None:
+                shores, locations = df['Shore'], df['Locations']
+            else:
+                shores = [clean_string(shore) for shore, _ in shore_locations]
+                locations = [clean_string(row_locations) for _, row_locations in shore_locations]
+            df.attrs[holiday_locations.NAMED_LOCATIONS_ATTR] = holiday_locations.named_locations(shores, locations)
+        metrics.inc('holiday_rows', len(df))
         return df
     except FileNotFoundError:
         print(f"Error: Holiday file '{holiday_file}' not found. Please ensure it's in the same directory.")
@@ -61,246 +82,114 @@ def get_holiday_data(holiday_file='holidays.csv'):
         return pd.DataFrame()
 
 
-def generate_modern_holiday_email_html(holidays_df, company_name_footer="Your Company", signature_name="HR Team"):
+def horizon_range(months=2, reference_date=None, business_days_ahead=0):
     """
-    Generates a modern, good-looking HTML content for the holiday reminder email,
-    including 2x2 table and colored calendars, based on new holiday data structure.
-    Accepts company_name_footer and signature_name for customization.
+    (start_date, end_date) covering every holiday build_holiday_digest can show for these
+    arguments: the first day of the current month up to the first day after the last month.
+    With business_days_ahead (the working-days section), end_date also reaches past the date
+    that many working days on (see business_days.lookahead_end), to a first of the month.
     """
-    current_date = datetime.now()
-    # For consistent testing output as per your screenshot, you can uncomment the line below:
-    # current_date = datetime(2025, 5, 24) # Ensure this is May for the dummy data to show up as "current"
-
-    current_month_name = current_date.strftime('%B %Y')
-    next_month_date = (current_date.replace(day=1) + timedelta(days=32)).replace(day=1)
-    next_month_name = next_month_date.strftime('%B %Y')
-
-    current_month_holidays_all = holidays_df[
-        (holidays_df['Date'].dt.month == current_date.month) &
-        (holidays_df['Date'].dt.year == current_date.year)
-    ].sort_values(by='Date')
-
-    next_month_holidays_all = holidays_df[
-        (holidays_df['Date'].dt.month == next_month_date.month) &
-        (holidays_df['Date'].dt.year == next_month_date.year)
-    ].sort_values(by='Date')
-
-    def get_filtered_holidays_for_table(month_df, shore_type):
-        """Optimized: Use itertuples() instead of iterrows() for better performance"""
-        if shore_type == 'Onshore':
-            filtered = month_df[
-                (month_df['Shore'] == 'Onshore') | (month_df['Shore'] == 'Both')
-            ]
-            if filtered.empty:
-                return '<li style="font-size: 14px; color: #777777;">No Onshore Holidays</li>'
-            return ''.join([
-                f'<li style="margin-bottom: 8px; font-size: 14px; color: #555555;"><strong>{row.Date.strftime("%b %d")}</strong>: {row.HolidayName} '
-                f'<span style="color: #888888;">({row.Locations})</span></li>'
-                for row in filtered.itertuples()
-            ])
-        else:  # Offshore
-            filtered = month_df[
-                (month_df['Shore'] == 'Offshore') | (month_df['Shore'] == 'Both')
-            ]
-            if filtered.empty:
-                return '<li style="font-size: 14px; color: #777777;">No Offshore Holidays</li>'
-            return ''.join([
-                f'<li style="margin-bottom: 8px; font-size: 14px; color: #555555;"><strong>{row.Date.strftime("%b %d")}</strong>: {row.HolidayName} '
-                f'<span style="color: #888888;">({row.Locations})</span></li>'
-                for row in filtered.itertuples()
-            ])
-
-    table_html = f"""
-    <p style="font-size: 16px; color: #333333; margin-bottom: 20px; text-align: left;">Hi Team,</p>
-    <p style="font-size: 16px; color: #333333; margin-bottom: 30px; text-align: left;">Here are the upcoming holidays for <strong style="color: #007bff;">{current_month_name}</strong> and <strong style="color: #007bff;">{next_month_name}</strong>:</p>
+    current_date = reference_date or datetime.now()
+    start_date = datetime(current_date.year, current_date.month, 1)
+    end_date = start_date
+    for _ in range(months):
+        end_date = (end_date + timedelta(days=32)).replace(day=1)
+    if business_days_ahead:
+        lookahead_end = business_days.lookahead_end(business_days_ahead, current_date)
+        while end_date.date() <= lookahead_end:
+            end_date = (end_date + timedelta(days=32)).replace(day=1)
+    return start_date, end_date
 
-    <div style="width: 100%; text-align: center;">
-    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block; width: auto; min-width: 600px; max-width: 90%; margin: 0 auto 30px auto; border-radius: 8px; overflow: hidden; background-color: #ffffff; box-shadow: 0 4px 8px rgba(0,0,0,0.05);">
-        <tr>
-            <th colspan="2" style="background-color:#e9ecef; padding: 15px; font-size: 18px; color: #333333; text-align: center; border-bottom: 1px solid #dee2e6;">{current_month_name} Holidays</th>
-            <th colspan="2" style="background-color:#e9ecef; padding: 15px; font-size: 18px; color: #333333; text-align: center; border-bottom: 1px solid #dee2e6;">{next_month_name} Holidays</th>
-        </tr>
-        <tr>
-            <td style="vertical-align: top; padding: 20px; border-right: 1px solid #dee2e6; border-bottom: 1px solid #dee2e6; width: 25%;">
-                <h4 style="margin-top:0; color: #007bff; font-size: 16px; text-align: center;">Onshore</h4>
-                <ul style="list-style-type:none; padding:0; margin:0;">
-                    {get_filtered_holidays_for_table(current_month_holidays_all, 'Onshore')}
-                </ul>
-            </td>
-            <td style="vertical-align: top; padding: 20px; border-bottom: 1px solid #dee2e6; width: 25%;">
-                <h4 style="margin-top:0; color: #28a745; font-size: 16px; text-align: center;">Offshore</h4>
-                <ul style="list-style-type:none; padding:0; margin:0;">
-                    {get_filtered_holidays_for_table(current_month_holidays_all, 'Offshore')}
-                </ul>
-            </td>
-            <td style="vertical-align: top; padding: 20px; border-right: 1px solid #dee2e6; border-bottom: 1px solid #dee2e6; width: 25%;">
-                <h4 style="margin-top:0; color: #007bff; font-size: 16px; text-align: center;">Onshore</h4>
-                <ul style="list-style-type:none; padding:0; margin:0;">
-                    {get_filtered_holidays_for_table(next_month_holidays_all, 'Onshore')}
-                </ul>
-            </td>
-            <td style="vertical-align: top; padding: 20px; border-bottom: 1px solid #dee2e6; width: 25%;">
-                <h4 style="margin-top:0; color: #28a745; font-size: 16px; text-align: center;">Offshore</h4>
-                <ul style="list-style-type:none; padding:0; margin:0;">
-                    {get_filtered_holidays_for_table(next_month_holidays_all, 'Offshore')}
-                </ul>
-            </td>
-        </tr>
-    </table>
-    </div>
-    """
 
-    calendar_html = f"""
-    <p style="font-size: 16px; color: #333333; margin-top: 40px; text-align: left;">A quick look at your holiday calendars:</p>
-    <div style="width: 100%; text-align: center;">
-    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block; width: auto; min-width: 600px; max-width: 90%; margin: 0 auto 30px auto; border-radius: 8px; overflow: hidden; background-color: #ffffff; box-shadow: 0 4px 8px rgba(0,0,0,0.05);">
-        <tr>
-            <th colspan="2" style="background-color:#e9ecef; padding: 15px; font-size: 18px; color: #333333; text-align: center; border-bottom: 1px solid #dee2e6;">{current_month_name}</th>
-            <th colspan="2" style="background-color:#e9ecef; padding: 15px; font-size: 18px; color: #333333; text-align: center; border-bottom: 1px solid #dee2e6;">{next_month_name}</th>
-        </tr>
-        <tr>
+def settings_horizon_range(settings):
+    """horizon_range for a run with these settings (WORKING_DAYS_SECTION, BUSINESS_DAYS_AHEAD)."""
+    if settings.get('WORKING_DAYS_SECTION', False):
+        return horizon_range(business_days_ahead=settings.get('BUSINESS_DAYS_AHEAD', 10))
+    return horizon_range()
+
+
+class HolidayDataCache:
+    """
+    Caches parsed holiday DataFrames by absolute file path (and date range).
+    Entries are re-read only when the file's modification time or size changes,
+    so several callers pointing at the same file share one parsed copy.
+    Only the max_entries most recently used entries are kept (the date range moves
+    with every run, so older ranges are dropped instead of piling up).
+    The cached DataFrames are shared: treat them as read-only.
     """
-    
-    # Generate calendar content for both months
-    for month_date, month_holidays_df in [(current_date, current_month_holidays_all), (next_month_date, next_month_holidays_all)]:
-        year = month_date.year
-        month = month_date.month
-
-        onshore_dates = set(month_holidays_df[
-            (month_holidays_df['Shore'] == 'Onshore') |
-            (month_holidays_df['Shore'] == 'Both')
-        ]['Date'].dt.day.tolist())
-
-        offshore_dates = set(month_holidays_df[
-            (month_holidays_df['Shore'] == 'Offshore') |
-            (month_holidays_df['Shore'] == 'Both')
-        ]['Date'].dt.day.tolist())
-
-        both_dates = onshore_dates.intersection(offshore_dates)
-        only_onshore = onshore_dates - both_dates
-        only_offshore = offshore_dates - both_dates
-
-        cal = calendar.HTMLCalendar(calendar.SUNDAY)
-        month_cal_html = cal.formatmonth(year, month)
-
-        # Optimize: Clean up calendar HTML in single pass
-        replacements = {
-            'border="0"': '',
-            'cellpadding="0"': '',
-            'cellspacing="0"': '',
-            'class="month"': ''
-        }
-        for old, new in replacements.items():
-            month_cal_html = month_cal_html.replace(old, new)
-
-        # Optimize: Highlight holiday dates (only process days that exist in the month)
-        import calendar as cal_module
-        max_day = cal_module.monthrange(year, month)[1]
-        
-        for day in range(1, max_day + 1):
-            day_str_exact = f'>{day}<'
-            day_str_with_attr = f'">{day}<'
-
-            color = None
-            if day in both_dates:
-                color = '#90EE90'
-            elif day in only_onshore:
-                color = '#FFD700'
-            elif day in only_offshore:
-                color = '#ADD8E6'
-            
-            if color:
-                replace_with = f'><span style="background-color: {color}; color: #333; font-weight: bold; padding: 4px 6px; border-radius: 4px; display: inline-block;">{day}</span><'
-                month_cal_html = month_cal_html.replace(day_str_exact, replace_with, 1)
-                month_cal_html = month_cal_html.replace(day_str_with_attr, f'"{replace_with}', 1)
-        
-        month_cal_html = month_cal_html.replace(
-            f'<th colspan="7" class="month">{month_date.strftime("%B %Y")}</th>',
-            f'<th colspan="7" style="text-align:center; font-size: 16px; padding:10px 0; background-color: #f0f0f0; color: #333;">{month_date.strftime("%B %Y")}</th>'
-        )
 
-        month_cal_html = month_cal_html.replace(
-            '<table',
-            '<table style="width:100%; border-collapse: collapse; font-size: 15px; text-align: center; border: 0;"'
-        ).replace(
-            '<th>',
-            '<th style="background-color: #f8f9fa; padding: 10px; color: #555555; text-align: center; border-bottom: 1px solid #e0e0e0; border-top: 1px solid #e0e0e0; font-size: 14px; font-weight: bold;"'
-        ).replace(
-            '<td>',
-            '<td style="padding: 10px; border: 1px solid #e0e0e0; text-align: center; vertical-align: middle; height: 40px; font-size: 14px;"'
-        )
+    def __init__(self, max_entries=16):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()  # (abs_path, table, start_date, end_date) -> (mtime_ns, size, DataFrame)
+        self._lock = threading.Lock()
 
-        # Determine background color based on month
-        bg_color = "#f8f9fa" if month_date == current_date else "#e9ecef"
-        
-        calendar_html += f"""
-            <td colspan="2" style="vertical-align: top; padding: 20px; border-bottom: 1px solid #dee2e6;">
-                <div style="background-color: {bg_color}; border-radius: 6px; padding: 20px;">
-                    {month_cal_html}
-                </div>
-            </td>
-        """
-    
-    calendar_html += """
-        </tr>
-    </table>
-    </div>
+    def get(self, holiday_file='holidays.csv', metrics=None, start_date=None, end_date=None):
+        path, table = data_sources.split_source(holiday_file)
+        abs_path = os.path.abspath(path)
+        key = (abs_path, table, start_date, end_date)
+        try:
+            stat = os.stat(abs_path)
+            fingerprint = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            fingerprint = None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and fingerprint is not None and entry[:2] == fingerprint:
+                if metrics is not None:
+                    metrics.inc('holiday_cache_hits')
+                self._entries.move_to_end(key)
+                return entry[2]
+
+            df = get_holiday_data(holiday_file, metrics=metrics, start_date=start_date, end_date=end_date)
+            if fingerprint is not None and not df.empty:
+                self._entries[key] = (fingerprint[0], fingerprint[1], df)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.pop(key, None)
+            return df
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def filter_holidays_for_location(holidays_df, location):
     """
-    calendar_html += """
-    <div style="margin-top: 30px; text-align: center;">
-        <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block; margin: 0 auto;">
-            <tr>
-                <td style="padding: 8px 5px; text-align: center;">
-                    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block;">
-                        <tr>
-                            <td bgcolor="#ADD8E6" width="40" height="20" style="border: 1px solid #87CEEB; background-color: #ADD8E6;">&nbsp;</td>
-                        </tr>
-                    </table>
-                </td>
-                <td style="padding: 8px 10px 8px 5px; text-align: left;">
-                    <span style="font-size: 14px; color: #555555; font-weight: 500;">Offshore</span>
-                </td>
-                <td style="padding: 8px 5px; text-align: center;">
-                    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block;">
-                        <tr>
-                            <td bgcolor="#FFD700" width="40" height="20" style="border: 1px solid #DAA520; background-color: #FFD700;">&nbsp;</td>
-                        </tr>
-                    </table>
-                </td>
-                <td style="padding: 8px 10px 8px 5px; text-align: left;">
-                    <span style="font-size: 14px; color: #555555; font-weight: 500;">Onshore</span>
-                </td>
-                <td style="padding: 8px 5px; text-align: center;">
-                    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block;">
-                        <tr>
-                            <td bgcolor="#90EE90" width="40" height="20" style="border: 1px solid #7CCD7C; background-color: #90EE90;">&nbsp;</td>
-                        </tr>
-                    </table>
-                </td>
-                <td style="padding: 8px 10px 8px 5px; text-align: left;">
-                    <span style="font-size: 14px; color: #555555; font-weight: 500;">Both</span>
-                </td>
-            </tr>
-        </table>
-    </div>
+    Keeps the holidays that apply to one location (see holiday_locations.py).
+    'Onshore'/'Offshore' filter by shore; any other value matches the Locations text,
+    plus the rows for 'All ...' locations (e.g. 'All Offshore locations') of that city's shore.
     """
+    if not holiday_locations.normalize(location):
+        return holidays_df
+    mask = holiday_locations.location_mask(
+        holiday_locations.lowered(holidays_df['Shore']), holiday_locations.lowered(holidays_df['Locations']),
+        location, holiday_locations.named_locations_of(holidays_df))
+    return holidays_df[mask]
+
 
-    full_html_content = f"""
+# Document start: doctype and <head> with the shared <style> block
+_DOCUMENT_START = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <style>
-            body {{
+            body {
                 font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
                 line-height: 1.6;
                 color: #333333;
                 background-color: #f4f7f6;
                 margin: 0;
                 padding: 0;
-            }}
-            .email-container {{
+            }
+            .email-container {
                 max-width: 900px;
                 margin: 30px auto;
                 background-color: #ffffff;
@@ -309,60 +198,509 @@ def generate_modern_holiday_email_html(holidays_df, company_name_footer="Your Co
                 box-shadow: 0 8px 16px rgba(0,0,0,0.1);
                 border: 1px solid #e0e0e0;
                 box-sizing: border-box;
-            }}
-            .header {{
+            }
+            .header {
                 text-align: center;
                 padding-bottom: 20px;
                 border-bottom: 1px solid #eeeeee;
                 margin-bottom: 30px;
-            }}
-            .header h1 {{
+            }
+            .header h1 {
                 color: #007bff;
                 font-size: 28px;
                 margin: 0;
                 text-align: center;
-            }}
-            .header img {{ /* Basic style for a logo if you add one */
+            }
+            .header img { /* Basic style for a logo if you add one */
                 max-width: 150px; 
                 margin-bottom: 10px;
-            }}
-            .footer {{
+            }
+            .footer {
                 text-align: center;
                 padding-top: 30px;
                 margin-top: 30px;
                 border-top: 1px solid #eeeeee;
                 font-size: 14px;
                 color: #777777;
-            }}
+            }
             /* Ensure calendar cells don't break words awkwardly */
-            .calendar-table td span {{
+            .calendar-table td span {
                 word-break: normal;
                 white-space: nowrap;
-            }}
+            }
         </style>
     </head>
     <body>
-        <div class="email-container">
+        """
+
+# Start of the <body> content: container and header
+_BODY_START = """<div class="email-container">
             <div class="header" style="text-align: center;">
                 <h1 style="color: #007bff; font-size: 28px; margin: 0; text-align: center;">🎉 Holiday Reminder! 🎉</h1>
             </div>
 
-            {table_html}
-            {calendar_html}
+            """
+
+_DOCUMENT_END = """
+    </body>
+    </html>
+    """
+
+# Colour legend shown under the calendars
+_CALENDAR_LEGEND_HTML = """
+    <div style="margin-top: 30px; text-align: center;">
+        <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block; margin: 0 auto;">
+            <tr>
+                <td style="padding: 8px 5px; text-align: center;">
+                    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block;">
+                        <tr>
+                            <td bgcolor="#ADD8E6" width="40" height="20" style="border: 1px solid #87CEEB; background-color: #ADD8E6;">&nbsp;</td>
+                        </tr>
+                    </table>
+                </td>
+                <td style="padding: 8px 10px 8px 5px; text-align: left;">
+                    <span style="font-size: 14px; color: #555555; font-weight: 500;">Offshore</span>
+                </td>
+                <td style="padding: 8px 5px; text-align: center;">
+                    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block;">
+                        <tr>
+                            <td bgcolor="#FFD700" width="40" height="20" style="border: 1px solid #DAA520; background-color: #FFD700;">&nbsp;</td>
+                        </tr>
+                    </table>
+                </td>
+                <td style="padding: 8px 10px 8px 5px; text-align: left;">
+                    <span style="font-size: 14px; color: #555555; font-weight: 500;">Onshore</span>
+                </td>
+                <td style="padding: 8px 5px; text-align: center;">
+                    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block;">
+                        <tr>
+                            <td bgcolor="#90EE90" width="40" height="20" style="border: 1px solid #7CCD7C; background-color: #90EE90;">&nbsp;</td>
+                        </tr>
+                    </table>
+                </td>
+                <td style="padding: 8px 10px 8px 5px; text-align: left;">
+                    <span style="font-size: 14px; color: #555555; font-weight: 500;">Both</span>
+                </td>
+            </tr>
+        </table>
+    </div>
+    """
+
+# Inline styles shared by many elements (inline, because Outlook and Gmail ignore most <style> rules)
+_LIST_STYLE = "list-style-type:none; padding:0; margin:0;"
+_LIST_ITEM_STYLE = "margin-bottom: 8px; font-size: 14px; color: #555555;"
+_EMPTY_LIST_ITEM_STYLE = "font-size: 14px; color: #777777;"
+_MONTH_HEADER_STYLE = "background-color:#e9ecef; padding: 15px; font-size: 18px; color: #333333; text-align: center; border-bottom: 1px solid #dee2e6;"
+_CALENDAR_TITLE_STYLE = "text-align:center; font-size: 16px; padding:10px 0; background-color: #f0f0f0; color: #333;"
+_CALENDAR_TABLE_STYLE = "width:100%; border-collapse: collapse; font-size: 15px; text-align: center; border: 0;"
+_CALENDAR_WEEKDAY_STYLE = "background-color: #f8f9fa; padding: 10px; color: #555555; text-align: center; border-bottom: 1px solid #e0e0e0; border-top: 1px solid #e0e0e0; font-size: 14px; font-weight: bold;"
+_CALENDAR_DAY_STYLE = "padding: 10px; border: 1px solid #e0e0e0; text-align: center; vertical-align: middle; height: 40px; font-size: 14px;"
+_HOLIDAY_DAY_STYLE = "color: #333; font-weight: bold; padding: 4px 6px; border-radius: 4px; display: inline-block;"
+_WORKING_DAYS_TABLE_STYLE = "display: inline-block; margin: 0 auto 10px auto; border-collapse: collapse; border-radius: 8px; overflow: hidden; background-color: #ffffff; box-shadow: 0 4px 8px rgba(0,0,0,0.05);"
+_WORKING_DAYS_HEADER_STYLE = "background-color:#e9ecef; padding: 10px 15px; font-size: 14px; color: #333333; text-align: center; border-bottom: 1px solid #dee2e6;"
+_WORKING_DAYS_CELL_STYLE = "padding: 10px 15px; font-size: 14px; color: #555555; text-align: center; border-bottom: 1px solid #e0e0e0;"
+
+# Opening of each two-month table (the holiday lists and the calendars use the same frame)
+_ROW_TABLE_START = """
+    <div style="width: 100%; text-align: center;">
+    <table border="0" cellpadding="0" cellspacing="0" style="display: inline-block; width: auto; min-width: 600px; max-width: 90%; margin: 0 auto 30px auto; border-radius: 8px; overflow: hidden; background-color: #ffffff; box-shadow: 0 4px 8px rgba(0,0,0,0.05);">
+        <tr>
+"""
+
+
+# --- Holiday digest: the data behind one email, computed once and shared by every output format ---
+class HolidayEntry:
+    """One holiday row."""
+
+    def __init__(self, date, name, shore, locations):
+        self.date = date
+        self.name = name
+        self.shore = shore
+        self.locations = locations
+
+
+class HolidayMonth:
+    """One month of the digest: its holidays, split by shore, and the calendar days to highlight."""
+
+    def __init__(self, month_date, holidays):
+        self.date = month_date
+        self.name = month_date.strftime('%B %Y')
+        self.holidays = holidays  # HolidayEntry list, sorted by date
+        self.onshore = [h for h in holidays if h.shore in ('Onshore', 'Both')]
+        self.offshore = [h for h in holidays if h.shore in ('Offshore', 'Both')]
+        onshore_days = {h.date.day for h in self.onshore}
+        offshore_days = {h.date.day for h in self.offshore}
+        self.both_days = onshore_days & offshore_days
+        self.onshore_only_days = onshore_days - self.both_days
+        self.offshore_only_days = offshore_days - self.both_days
+
+
+class HolidayDigest:
+    """
+    Everything the holiday reminder shows, independent of the output format: the months
+    in the horizon with their holidays and highlight sets, plus greeting and footer text.
+    Build it with build_holiday_digest(); render it with iter_digest_html() here or with
+    the renderers in digest_renderers.py (plain text, .eml, ICS...).
+    """
+
+    def __init__(self, months, company_name_footer="Your Company", signature_name="HR Team",
+                 recipient_name=None, location=None, generated_at=None, working_days=None):
+        self.months = months  # HolidayMonth list, current month first
+        self.company_name_footer = company_name_footer
+        self.signature_name = signature_name
+        self.recipient_name = recipient_name
+        self.location = location
+        self.generated_at = generated_at or datetime.now()
+        self.working_days = working_days  # business_days.WorkingDaysSummary, or None for no such section
+
+    @property
+    def greeting_name(self):
+        return self.recipient_name or "Team"
+
+    @property
+    def month_rows(self):
+        """Months laid out two per row (the original 2x2 layout for the default two months)."""
+        return [self.months[i:i + 2] for i in range(0, len(self.months), 2)]
+
+    def for_recipient(self, recipient_name):
+        """The same digest with another greeting name (nothing is recomputed)."""
+        return HolidayDigest(self.months, company_name_footer=self.company_name_footer,
+                             signature_name=self.signature_name, recipient_name=recipient_name,
+                             location=self.location, generated_at=self.generated_at,
+                             working_days=self.working_days)
+
+    def content_hash(self):
+        """
+        A hash of everything the email shows (months, holidays, greeting, signature, footer),
+        but not the time it was generated: two digests with the same hash make the same email.
+        """
+        content = hashlib.sha256()
+        for field in (self.company_name_footer, self.signature_name, self.greeting_name, self.location):
+            content.update(f"{field}\x1f".encode('utf-8'))
+        for month in self.months:
+            content.update(f"\x1e{month.name}".encode('utf-8'))
+            for entry in month.holidays:
+                content.update(f"\x1d{entry.date:%Y-%m-%d}\x1f{entry.name}\x1f{entry.shore}\x1f{entry.locations}".encode('utf-8'))
+        if self.working_days is not None:
+            for label, month_days, date_after in self.working_days.rows:
+                content.update(f"\x1c{label}\x1f{month_days}\x1f{self.working_days.days_ahead}\x1f{date_after:%Y-%m-%d}".encode('utf-8'))
+        return content.hexdigest()
+
+
+def build_holiday_digest(holidays_df, company_name_footer="Your Company", signature_name="HR Team",
+                         recipient_name=None, location=None, months=2, reference_date=None,
+                         working_days=False, business_days_ahead=10):
+    """
+    Computes the HolidayDigest for one email: the current month plus months - 1 following
+    months (reference_date, default now, fixes the current month), with holidays limited
+    to location when given.
+    working_days=True adds the working days left in each month and the date
+    business_days_ahead working days on, for location (or for Onshore and Offshore).
+    """
+    working_days_summary = None
+    if working_days:
+        working_days_summary = business_days.working_days_summary(
+            holidays_df, location=location, months=months, days_ahead=business_days_ahead,
+            reference_date=reference_date)
+    if location:
+        holidays_df = filter_holidays_for_location(holidays_df, location)
+
+    current_date = reference_date or datetime.now()
+    # For consistent testing output as per your screenshot, pass a fixed reference_date, e.g.:
+    # reference_date=datetime(2025, 5, 24) # Ensure this is May for the dummy data to show up as "current"
+
+    # The current month followed by the next (months - 1) months
+    month_dates = [current_date]
+    for _ in range(months - 1):
+        month_dates.append((month_dates[-1].replace(day=1) + timedelta(days=32)).replace(day=1))
+
+    # Compute the year/month of every row once, then slice out each month
+    holiday_years = holidays_df['Date'].dt.year
+    holiday_months = holidays_df['Date'].dt.month
+    digest_months = []
+    for month_date in month_dates:
+        month_df = holidays_df[(holiday_months == month_date.month) & (holiday_years == month_date.year)].sort_values(by='Date')
+        entries = [HolidayEntry(*row) for row in zip(month_df['Date'], month_df['HolidayName'],
+                                                     month_df['Shore'], month_df['Locations'])]
+        digest_months.append(HolidayMonth(month_date, entries))
+
+    return HolidayDigest(digest_months, company_name_footer=company_name_footer, signature_name=signature_name,
+                         recipient_name=recipient_name, location=location, working_days=working_days_summary)
+
+
+# --- HTML rendering ---
+def _holiday_list_items(entries, shore_type):
+    """<li> items for one month's Onshore or Offshore holidays."""
+    if not entries:
+        return f'<li style="{_EMPTY_LIST_ITEM_STYLE}">No {shore_type} Holidays</li>'
+    return ''.join([
+        f'<li style="{_LIST_ITEM_STYLE}"><strong>{entry.date.strftime("%b %d")}</strong>: {entry.name} '
+        f'<span style="color: #888888;">({entry.locations})</span></li>'
+        for entry in entries
+    ])
+
+
+def _month_calendar_html(month):
+    """One month's calendar table with the holiday dates highlighted."""
+    year = month.date.year
+    month_number = month.date.month
+
+    cal = calendar.HTMLCalendar(calendar.SUNDAY)
+    month_cal_html = cal.formatmonth(year, month_number)
+
+    # Optimize: Clean up calendar HTML in single pass
+    replacements = {
+        'border="0"': '',
+        'cellpadding="0"': '',
+        'cellspacing="0"': '',
+        'class="month"': ''
+    }
+    for old, new in replacements.items():
+        month_cal_html = month_cal_html.replace(old, new)
+
+    # Optimize: Highlight holiday dates (only process days that exist in the month)
+    max_day = calendar.monthrange(year, month_number)[1]
+
+    for day in range(1, max_day + 1):
+        day_str_exact = f'>{day}<'
+        day_str_with_attr = f'">{day}<'
+
+        color = None
+        if day in month.both_days:
+            color = '#90EE90'
+        elif day in month.onshore_only_days:
+            color = '#FFD700'
+        elif day in month.offshore_only_days:
+            color = '#ADD8E6'
+
+        if color:
+            replace_with = f'><span style="background-color: {color}; {_HOLIDAY_DAY_STYLE}">{day}</span><'
+            month_cal_html = month_cal_html.replace(day_str_exact, replace_with, 1)
+            month_cal_html = month_cal_html.replace(day_str_with_attr, f'"{replace_with}', 1)
+
+    month_cal_html = month_cal_html.replace(
+        f'<th colspan="7" class="month">{month.name}</th>',
+        f'<th colspan="7" style="{_CALENDAR_TITLE_STYLE}">{month.name}</th>'
+    )
+
+    return month_cal_html.replace(
+        '<table',
+        f'<table style="{_CALENDAR_TABLE_STYLE}"'
+    ).replace(
+        '<th>',
+        f'<th style="{_CALENDAR_WEEKDAY_STYLE}"'
+    ).replace(
+        '<td>',
+        f'<td style="{_CALENDAR_DAY_STYLE}"'
+    )
+
+
+def iter_modern_holiday_email_html(holidays_df, company_name_footer="Your Company", signature_name="HR Team",
+                                   recipient_name=None, location=None, months=2, reference_date=None, compact=False,
+                                   working_days=False, business_days_ahead=10):
+    """
+    Yields the holiday reminder email HTML in document order, one section at a time
+    (head, greeting, each table cell, each calendar, legend, footer), so the whole
+    document never has to be built up by concatenation. Takes the same arguments as
+    generate_modern_holiday_email_html; ''.join() of the chunks is its exact output.
+    """
+    digest = build_holiday_digest(holidays_df, company_name_footer=company_name_footer, signature_name=signature_name,
+                                  recipient_name=recipient_name, location=location, months=months,
+                                  reference_date=reference_date, working_days=working_days,
+                                  business_days_ahead=business_days_ahead)
+    return iter_digest_html(digest, compact=compact)
+
+
+def iter_digest_html(digest, compact=False, body_only=False):
+    """
+    Yields the HTML for a HolidayDigest in chunks. body_only=True yields only the content
+    of <body> (for Outlook's HTMLBody and .eml drafts); compact=True minifies each chunk.
+    """
+    chunks = _iter_body_chunks(digest) if body_only else _iter_document_chunks(digest)
+    if compact:
+        return (minify_html(chunk) for chunk in chunks)
+    return chunks
+
+
+def _iter_document_chunks(digest):
+    yield _DOCUMENT_START
+    yield from _iter_body_chunks(digest)
+    yield _DOCUMENT_END
+
+
+def _iter_body_chunks(digest):
+    highlighted_month_names = [f'<strong style="color: #007bff;">{month.name}</strong>' for month in digest.months]
+    if len(highlighted_month_names) > 1:
+        months_text = ', '.join(highlighted_month_names[:-1]) + ' and ' + highlighted_month_names[-1]
+    else:
+        months_text = highlighted_month_names[0]
+
+    yield _BODY_START
+    yield f"""
+    <p style="font-size: 16px; color: #333333; margin-bottom: 20px; text-align: left;">Hi {html.escape(digest.greeting_name)},</p>
+    <p style="font-size: 16px; color: #333333; margin-bottom: 30px; text-align: left;">Here are the upcoming holidays for {months_text}:</p>
+"""
+
+    # --- Holiday lists ---
+    for row in digest.month_rows:
+        cell_width = '25%' if len(row) == 2 else '50%'
+        yield _ROW_TABLE_START
+        for month in row:
+            yield f"""            <th colspan="2" style="{_MONTH_HEADER_STYLE}">{month.name} Holidays</th>
+"""
+        yield """        </tr>
+        <tr>
+"""
+        for month in row:
+            yield f"""            <td style="vertical-align: top; padding: 20px; border-right: 1px solid #dee2e6; border-bottom: 1px solid #dee2e6; width: {cell_width};">
+                <h4 style="margin-top:0; color: #007bff; font-size: 16px; text-align: center;">Onshore</h4>
+                <ul style="{_LIST_STYLE}">
+                    {_holiday_list_items(month.onshore, 'Onshore')}
+                </ul>
+            </td>
+            <td style="vertical-align: top; padding: 20px; border-bottom: 1px solid #dee2e6; width: {cell_width};">
+                <h4 style="margin-top:0; color: #28a745; font-size: 16px; text-align: center;">Offshore</h4>
+                <ul style="{_LIST_STYLE}">
+                    {_holiday_list_items(month.offshore, 'Offshore')}
+                </ul>
+            </td>
+"""
+        yield """        </tr>
+    </table>
+    </div>
+    """
+
+    # --- Calendars ---
+    yield """
+            
+    <p style="font-size: 16px; color: #333333; margin-top: 40px; text-align: left;">A quick look at your holiday calendars:</p>"""
+    for row in digest.month_rows:
+        yield _ROW_TABLE_START
+        for month in row:
+            yield f"""            <th colspan="2" style="{_MONTH_HEADER_STYLE}">{month.name}</th>
+"""
+        yield """        </tr>
+        <tr>
+    """
+        for month in row:
+            # Determine background color based on month
+            bg_color = "#f8f9fa" if month is digest.months[0] else "#e9ecef"
+            yield f"""
+            <td colspan="2" style="vertical-align: top; padding: 20px; border-bottom: 1px solid #dee2e6;">
+                <div style="background-color: {bg_color}; border-radius: 6px; padding: 20px;">
+                    {_month_calendar_html(month)}
+                </div>
+            </td>
+        """
+        yield """
+        </tr>
+    </table>
+    </div>
+    """
+    yield _CALENDAR_LEGEND_HTML
+
+    # --- Working days (optional) ---
+    if digest.working_days is not None:
+        yield _working_days_html(digest.working_days)
+
+    yield f"""
 
             <p style="font-size: 16px; color: #333333; margin-top: 40px;">Wishing you restful and joyful holidays! <br>
             Let's plan deliverables accordingly without affecting Holidays!</p>
-            <p style="font-size: 16px; color: #333333;">Best regards,<br/><strong style="color: #007bff;">{signature_name}</strong></p>
+            <p style="font-size: 16px; color: #333333;">Best regards,<br/><strong style="color: #007bff;">{digest.signature_name}</strong></p>
 
             <div class="footer">
                 <p>This is an automated reminder. Please do not reply to this email.</p>
-                <p>&copy; {datetime.now().year} {company_name_footer}</p>
+                <p>&copy; {digest.generated_at.year} {digest.company_name_footer}</p>
             </div>
-        </div>
-    </body>
-    </html>
+        </div>"""
+
+
+def _working_days_html(summary):
+    """The table of working days left per month and the date N working days on."""
+    first_month = summary.month_names[0]
+    if summary.from_date.day > 1:
+        first_month = f"Rest of {first_month}"
+    headers = ['Working days', first_month] + summary.month_names[1:] + [f"{summary.days_ahead} working days from today"]
+    header_cells = ''.join(f'<th style="{_WORKING_DAYS_HEADER_STYLE}">{header}</th>' for header in headers)
+    rows = []
+    for label, month_days, date_after in summary.rows:
+        cells = [f'<strong>{html.escape(label)}</strong>'] + [str(days) for days in month_days] + [date_after.strftime('%a, %b %d')]
+        rows.append('<tr>' + ''.join(f'<td style="{_WORKING_DAYS_CELL_STYLE}">{cell}</td>' for cell in cells) + '</tr>')
+    row_html = '\n            '.join(rows)
+    return f"""
+    <p style="font-size: 16px; color: #333333; margin-top: 40px; text-align: left;">Working days left to plan with:</p>
+    <div style="width: 100%; text-align: center;">
+    <table border="0" cellpadding="0" cellspacing="0" style="{_WORKING_DAYS_TABLE_STYLE}">
+            <tr>{header_cells}</tr>
+            {row_html}
+    </table>
+    </div>
+    """
+
+
+# --- Compact output ---
+_STYLE_BLOCK = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+_STYLE_ATTRIBUTE = re.compile(r'style="([^"]*)"')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_SEPARATOR = re.compile(r'\s*([{}:;,])\s*')
+_LINE_BREAK_WITH_INDENT = re.compile(r'\s*\n\s*')
+_SPACE_RUN = re.compile(r'[ \t]{2,}')
+
+
+def _minify_css(css):
+    css = _CSS_SEPARATOR.sub(r'\1', _CSS_COMMENT.sub('', css)).strip()
+    return css.replace(';}', '}').rstrip(';')
+
+
+def minify_html(text):
+    """
+    Shrinks a piece of the generated email without changing how it renders: drops
+    indentation and blank lines, and the spaces (and trailing ;) in CSS declarations.
+    Line breaks between tags are kept as a single newline, so lines stay well under
+    the 998-character SMTP limit and the HTML can be sent with 8bit transfer encoding.
+    """
+    text = _STYLE_BLOCK.sub(lambda match: f"<style>{_minify_css(match.group(1))}</style>", text)
+    text = _STYLE_ATTRIBUTE.sub(lambda match: f'style="{_minify_css(match.group(1))}"', text)
+    text = _LINE_BREAK_WITH_INDENT.sub('\n', text)
+    text = _SPACE_RUN.sub(' ', text)
+    return text.lstrip()
+
+
+def write_modern_holiday_email_html(writer, holidays_df, **render_options):
     """
-    return full_html_content
+    Streams the holiday reminder email HTML into writer (anything with a write(str)
+    method: an open text file, io.StringIO, a socket file...) and returns the number
+    of characters written. Takes the same keyword arguments as generate_modern_holiday_email_html.
+    """
+    written = 0
+    for chunk in iter_modern_holiday_email_html(holidays_df, **render_options):
+        writer.write(chunk)
+        written += len(chunk)
+    return written
+
+
+@profiling.profiled('generate_modern_holiday_email_html')
+def generate_modern_holiday_email_html(holidays_df, company_name_footer="Your Company", signature_name="HR Team",
+                                       recipient_name=None, location=None, months=2, reference_date=None,
+                                       compact=False, working_days=False, business_days_ahead=10):
+    """
+    Generates a modern, good-looking HTML content for the holiday reminder email,
+    including 2x2 table and colored calendars, based on new holiday data structure.
+    Accepts company_name_footer and signature_name for customization.
+    recipient_name personalizes the greeting and location limits the holidays shown.
+    months sets the horizon (current month plus months - 1 following months, two per row);
+    reference_date (default: now) fixes the current month.
+    compact=True strips indentation and the spaces inside style attributes (see minify_html);
+    the email looks the same but is typically about a third smaller.
+    working_days=True adds a table of working days left per month and the date
+    business_days_ahead working days on (see business_days.py).
+    To stream the document into a file or buffer instead, use write_modern_holiday_email_html.
+    """
+    return ''.join(iter_modern_holiday_email_html(
+        holidays_df, company_name_footer=company_name_footer, signature_name=signature_name,
+        recipient_name=recipient_name, location=location, months=months, reference_date=reference_date,
+        compact=compact, working_days=working_days, business_days_ahead=business_days_ahead))
 
 # --- Example Usage (for direct testing of this file) ---
 if __name__ == "__main__":
@@ -389,6 +727,8 @@ if __name__ == "__main__":
         COMPANY_NAME_SUBJECT_SUFFIX = config.get('EMAIL_CONTENT', 'COMPANY_NAME_SUBJECT_SUFFIX', fallback="Upcoming Holiday Reminder!")
         COMPANY_NAME_FOOTER = config.get('EMAIL_CONTENT', 'COMPANY_NAME_FOOTER', fallback="Your Company Name")
         SIGNATURE_NAME = config.get('EMAIL_CONTENT', 'SIGNATURE_NAME', fallback="HR Department")
+        WORKING_DAYS_SECTION = config.getboolean('EMAIL_CONTENT', 'WORKING_DAYS_SECTION', fallback=False)
+        BUSINESS_DAYS_AHEAD = config.getint('EMAIL_CONTENT', 'BUSINESS_DAYS_AHEAD', fallback=10)
         
         print("--- Holiday Email Generator (Preview Mode) ---")
         print(f"Loading holidays from: {HOLIDAYS_FILE}")
@@ -403,6 +743,15 @@ if __name__ == "__main__":
             print("Error: No holiday data found or file is empty.")
             sys.exit(1)
         
+        if '--ics-feeds' in sys.argv[1:]:
+            # Calendar feeds (All, Onshore, Offshore, per location); only feeds whose holidays changed are rewritten
+            import calendar_feeds
+            option_index = sys.argv.index('--ics-feeds')
+            feeds_dir = sys.argv[option_index + 1] if option_index + 1 < len(sys.argv) else 'calendar_feeds'
+            summary = calendar_feeds.export_feeds(holidays_df, feeds_dir)
+            print(calendar_feeds.summary_line(summary, feeds_dir))
+            sys.exit(0)
+        
         print(f"Loaded {len(holidays_df)} holidays from {HOLIDAYS_FILE}")
         print("\nHoliday Data Preview:")
         print(holidays_df.to_string(index=False))
@@ -410,7 +759,7 @@ if __name__ == "__main__":
         
         # Load employee data for preview
         try:
-            employees_df = pd.read_csv(EMPLOYEES_FILE)
+            employees_df = data_sources.read_employees(EMPLOYEES_FILE)
             if 'Email' in employees_df.columns:
                 recipient_count = len(employees_df)
                 print(f"Found {recipient_count} recipient(s) in {EMPLOYEES_FILE}")
@@ -423,44 +772,62 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"Warning: Could not read employee file: {e}")
         
-        # Generate HTML email
+        # Build the digest once; the HTML preview and the .eml draft are both rendered from it
+        import digest_renderers
         print("Generating HTML email preview...")
-        email_html = generate_modern_holiday_email_html(
+        digest = build_holiday_digest(
             holidays_df,
             company_name_footer=COMPANY_NAME_FOOTER,
-            signature_name=SIGNATURE_NAME
+            signature_name=SIGNATURE_NAME,
+            working_days=WORKING_DAYS_SECTION,
+            business_days_ahead=BUSINESS_DAYS_AHEAD
         )
         
+        if '--serve' in sys.argv[1:]:
+            # Live preview served from memory (no files written); the page reloads when the holiday file changes
+            import time
+            import webbrowser
+            import preview_server
+
+            def render_preview():
+                changed_df = get_holiday_data(HOLIDAYS_FILE)
+                if changed_df.empty:
+                    return None
+                return ''.join(iter_digest_html(build_holiday_digest(
+                    changed_df, company_name_footer=COMPANY_NAME_FOOTER, signature_name=SIGNATURE_NAME,
+                    working_days=WORKING_DAYS_SECTION, business_days_ahead=BUSINESS_DAYS_AHEAD)))
+
+            server = preview_server.PreviewServer().start()
+            server.publish(''.join(iter_digest_html(digest)))
+            server.watch(data_sources.source_path(HOLIDAYS_FILE), render_preview)
+            print(f"Live preview at {server.url} (reloads when {HOLIDAYS_FILE} changes, Ctrl+C to stop)")
+            webbrowser.open(server.url)
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.stop()
+            sys.exit(0)
+        
         # Save full HTML to file for browser preview
         output_html_file = "holiday_email_preview.html"
         with open(output_html_file, "w", encoding="utf-8") as f:
-            f.write(email_html)
-        
-        # Extract just the body content
-        import re
-        body_match = re.search(r'<body>(.*?)</body>', email_html, re.DOTALL)
-        if body_match:
-            email_body_only = body_match.group(1).strip()
-        else:
-            email_body_only = email_html
+            f.writelines(iter_digest_html(digest))
         
         # Create .eml file that can be opened directly in email clients
-        from email.mime.multipart import MIMEMultipart
-        from email.mime.text import MIMEText
-        
-        eml_msg = MIMEMultipart('alternative')
-        eml_msg['Subject'] = f"Upcoming Holiday Reminder! - {COMPANY_NAME_SUBJECT_SUFFIX}"
-        eml_msg['From'] = 'holidays@company.com'  # Placeholder
-        eml_msg['To'] = 'recipients@company.com'  # Placeholder
-        
-        # Attach HTML content
-        html_part = MIMEText(email_body_only, 'html', 'utf-8')
-        eml_msg.attach(html_part)
+        eml_text = digest_renderers.render_eml(
+            digest,
+            f"Upcoming Holiday Reminder! - {COMPANY_NAME_SUBJECT_SUFFIX}",
+            sender='holidays@company.com',  # Placeholder
+            to='recipients@company.com'  # Placeholder
+        )
         
         # Save as .eml file
         output_eml_file = "holiday_reminder_draft.eml"
         with open(output_eml_file, "w", encoding="utf-8") as f:
-            f.write(eml_msg.as_string())
+            f.write(eml_text)
         
         print(f"\n✓ Email preview generated successfully!")
         print(f"\n📧 EASIEST METHOD - Open Draft Email:")
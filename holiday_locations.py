@@ -0,0 +1,98 @@
+"""
+Which holidays apply to a location.
+
+  - 'Onshore' / 'Offshore' select rows by their Shore ('Both' rows apply to both).
+  - Any other location is a city, matched against the comma-separated names in
+    Locations as a whole name ('Mumbai' is not 'Navi Mumbai'). Rows for
+    'All ...' locations (e.g. 'All Offshore locations') apply to it only when their
+    Shore is the city's shore or 'Both'.
+A city's shore is the Shore of the rows that name it ('Both' counts as both
+shores), looked up in the whole holiday file: get_holiday_data keeps those rows
+in holidays_df.attrs, so a DataFrame read for a few months still knows that Pune
+is offshore. A city no row names keeps every 'All ...' row.
+
+The email (email_generator.filter_holidays_for_location), the working-day
+calendars, the query service and the calendar feeds all use location_mask.
+shore_wide marks the rows every location of a shore shares, for the Onshore and
+Offshore working-day totals.
+"""
+
+import numpy as np
+
+SHORES = ('onshore', 'offshore')
+# holidays_df.attrs key: the (locations, shore) pairs of the whole file, see named_locations
+NAMED_LOCATIONS_ATTR = 'named_locations'
+
+
+class NamedLocations(tuple):
+    """named_locations pairs. Immutable, so the deep copy pandas makes of attrs on every operation can share it."""
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def normalize(location):
+    return location.strip().lower() if isinstance(location, str) else ''
+
+
+def lowered(values):
+    """The values as a numpy str array, lowercased (missing values become '')."""
+    return np.array([value.lower() if isinstance(value, str) else '' for value in values], dtype=str)
+
+
+def named_locations(shores, locations):
+    """The distinct (locations, shore) pairs, lowercased, of the rows that name their locations (not 'All ...')."""
+    pairs = {(normalize(row_locations), normalize(shore)) for shore, row_locations in zip(shores, locations)}
+    return NamedLocations(sorted(pair for pair in pairs if pair[0] and not pair[0].startswith('all')))
+
+
+def named_locations_of(holidays_df):
+    """named_locations of the whole file holidays_df was read from (of holidays_df itself when not recorded)."""
+    named = holidays_df.attrs.get(NAMED_LOCATIONS_ATTR)
+    if named is None:
+        named = named_locations(holidays_df['Shore'], holidays_df['Locations'])
+    return named
+
+
+def location_names(row_locations):
+    """The lowercased names in a Locations value ('Pune, Navi Mumbai' -> {'pune', 'navi mumbai'})."""
+    return frozenset(name.strip() for name in normalize(row_locations).split(',')) - {''}
+
+
+def location_shores(named, location):
+    """The shores ('onshore'/'offshore') of a location, from named_locations pairs; both when no row names it."""
+    location = normalize(location)
+    if location in SHORES:
+        return frozenset([location])
+    shores = set()
+    for row_locations, shore in named:
+        if location in location_names(row_locations):
+            shores.update(SHORES if shore == 'both' else [shore])
+    return frozenset(shores.intersection(SHORES) or SHORES)
+
+
+def location_mask(shores, locations, location, named=None):
+    """
+    Boolean array: the rows that apply to location (every row when location is empty).
+    shores and locations are the rows' Shore and Locations as lowercased str arrays (see lowered);
+    named is named_locations of the whole file (default: of these rows).
+    """
+    location = normalize(location)
+    if not location:
+        return np.ones(len(shores), dtype=bool)
+    if location in SHORES:
+        return (shores == location) | (shores == 'both')
+    if named is None:
+        named = named_locations(shores, locations)
+    applies_to_all = np.char.startswith(locations, 'all')
+    # Each distinct Locations value is split once
+    distinct, row_values = np.unique(locations, return_inverse=True)
+    names_location = np.array([location in location_names(value) for value in distinct], dtype=bool)
+    names_location = names_location[row_values].reshape(len(locations)) & ~applies_to_all
+    shore_matches = np.isin(shores, list(location_shores(named, location)) + ['both'])
+    return names_location | (applies_to_all & shore_matches)
+
+
+def shore_wide(locations):
+    """Boolean array: the rows for every location of their shore ('All ...' or no Locations)."""
+    return np.char.startswith(locations, 'all') | (locations == '')
@@ -0,0 +1,384 @@
+"""
+Local HTTP/JSON holiday query service.
+
+Lets other tools ask the holiday file questions without parsing it themselves:
+  GET /holidays?location=Pune&from=2026-10-01&to=2026-12-31   holidays in a date range
+  GET /is-holiday?date=2026-10-21&location=Pune                is that date a holiday there?
+  GET /next?location=Pune&count=5[&from=2026-10-01]            the next holidays (from today)
+  GET /status                                                  file, row count and fingerprint
+location follows the same rules as the email (holiday_locations.py): 'Onshore'/'Offshore' match
+the Shore column; a city matches the Locations text, plus the 'All ...' rows of its shore.
+Dates are YYYY-MM-DD; 'to' is inclusive.
+
+The file is parsed once with get_holiday_data into a date index (holidays sorted
+by date, searched with bisect); the rows matching a location query are worked
+out once with one vectorized pass (holiday_locations.location_mask) and remembered. Responses carry an ETag and Last-Modified taken from the file's
+fingerprint (mtime and size), so clients can revalidate with If-None-Match or
+If-Modified-Since and get 304 Not Modified. The file is checked for changes at
+most once per RELOAD_CHECK_SECONDS and re-indexed when it changed; requests keep
+being answered from the previous index until the new one is ready. A version of
+the file that cannot be read is tried once: the previous index is served until
+the file changes again.
+
+Usage:
+    python holiday_service.py [--config config.ini] [--holidays holidays.csv] [--host 127.0.0.1] [--port 8765]
+"""
+
+import argparse
+import bisect
+import collections
+import configparser
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import date, datetime
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import data_sources
+import email_generator
+import holiday_locations
+import tool_config
+
+RELOAD_CHECK_SECONDS = 1.0
+LOCATION_CACHE_SIZE = 4096   # distinct location queries remembered per index
+RESPONSE_CACHE_SIZE = 4096   # serialized responses remembered per index
+MAX_NEXT_COUNT = 366
+
+
+class HolidayIndex:
+    """The holidays of one version of the file, indexed by date and location. Read-only once built."""
+
+    def __init__(self, holidays_df, fingerprint=None):
+        self.fingerprint = fingerprint  # (mtime_ns, size) of the file the rows were read from
+        self.loaded_at = time.time()
+        holidays_df = holidays_df.sort_values('Date', kind='stable')
+        self.entries = []
+        self.entry_json = []   # each holiday serialized once, joined into responses
+        self.ordinals = []     # date.toordinal() of each entry, ascending
+        for row in holidays_df.itertuples(index=False):
+            entry = {
+                'date': row.Date.strftime('%Y-%m-%d'),
+                'name': _text(row.HolidayName),
+                'shore': _text(row.Shore),
+                'locations': _text(row.Locations),
+            }
+            self.entries.append(entry)
+            self.entry_json.append(json.dumps(entry, ensure_ascii=False))
+            self.ordinals.append(row.Date.toordinal())
+        self._shores = holiday_locations.lowered(entry['shore'] for entry in self.entries)
+        self._locations = holiday_locations.lowered(entry['locations'] for entry in self.entries)
+        self._named = holiday_locations.named_locations_of(holidays_df)
+        self._location_rows = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rows_for(self, location):
+        """
+        (positions, ordinals): the ascending entry positions that apply to location and their dates.
+        positions is None when location is empty (every entry applies).
+        """
+        key = location.strip().lower() if isinstance(location, str) else ''
+        if not key:
+            return None, self.ordinals
+        with self._lock:
+            found = self._location_rows.get(key)
+            if found is not None:
+                self._location_rows.move_to_end(key)
+                return found
+        rows = np.flatnonzero(holiday_locations.location_mask(self._shores, self._locations, key, self._named)).tolist()
+        found = (rows, [self.ordinals[position] for position in rows])
+        with self._lock:
+            self._location_rows[key] = found
+            if len(self._location_rows) > LOCATION_CACHE_SIZE:
+                self._location_rows.popitem(last=False)
+        return found
+
+    def between(self, location, start=None, end=None, limit=None):
+        """Entry positions for location with start <= date < end (dates as ordinals; None = open)."""
+        rows, ordinals = self.rows_for(location)
+        low = bisect.bisect_left(ordinals, start) if start is not None else 0
+        high = bisect.bisect_left(ordinals, end) if end is not None else len(ordinals)
+        if limit is not None:
+            high = min(high, low + limit)
+        return range(low, high) if rows is None else rows[low:high]
+
+
+class HolidayQueryService:
+    """Serves HolidayIndex queries over HTTP from a background thread."""
+
+    def __init__(self, holidays_file, host='127.0.0.1', port=8765):
+        self.holidays_file = holidays_file
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+        self._responses = collections.OrderedDict()
+        self._responses_lock = threading.Lock()
+        self.reloads = 0
+        self.index = None
+        self._failed_fingerprint = None  # the version of the file that last failed to load
+        self._load(self._fingerprint())
+        self._server = ThreadingHTTPServer((host, port), _QueryHandler)
+        self._server.daemon_threads = True
+        self._server.service = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    # --- Data ---
+    def _fingerprint(self):
+        try:
+            stat = os.stat(data_sources.source_path(self.holidays_file))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, fingerprint):
+        holidays_df = email_generator.get_holiday_data(self.holidays_file)
+        if 'Date' not in holidays_df.columns:
+            if self.index is None:
+                raise ValueError(f"Could not read holidays from '{self.holidays_file}'.")
+            self._failed_fingerprint = fingerprint
+            print(f"Warning: Could not re-read '{self.holidays_file}'; still serving the previous version.")
+            logging.warning(f"Could not re-read '{self.holidays_file}'; still serving the previous version "
+                            f"until the file changes again.")
+            return
+        self._failed_fingerprint = None
+        if self.index is not None:
+            self.reloads += 1
+        self.index = HolidayIndex(holidays_df, fingerprint)
+        with self._responses_lock:
+            self._responses.clear()
+        logging.info(f"Holiday service indexed {len(self.index)} holiday(s) from '{self.holidays_file}'.")
+
+    def current_index(self):
+        """The index for the file as it is now, re-reading it if it changed since the last check."""
+        now = time.monotonic()
+        if now - self._last_check >= RELOAD_CHECK_SECONDS:
+            with self._reload_lock:
+                if now - self._last_check >= RELOAD_CHECK_SECONDS:
+                    fingerprint = self._fingerprint()
+                    if fingerprint not in (None, self.index.fingerprint, self._failed_fingerprint):
+                        self._load(fingerprint)
+                    self._last_check = time.monotonic()
+        return self.index
+
+    def cached_response(self, index, key, build):
+        """The serialized body for key, built once per index version."""
+        with self._responses_lock:
+            body = self._responses.get(key)
+            if body is not None and self.index is index:
+                return body
+        body = build()
+        with self._responses_lock:
+            if self.index is index:
+                self._responses[key] = body
+                if len(self._responses) > RESPONSE_CACHE_SIZE:
+                    self._responses.popitem(last=False)
+        return body
+
+    # --- Lifecycle ---
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _QueryError(Exception):
+    pass
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so a client can send many queries over one connection
+    server_version = 'HolidayService/1.0'
+    wbufsize = 64 * 1024  # headers and body leave in one write (flushed after each request)
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would cost more than the request itself
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        service = self.server.service
+        url = urlsplit(self.path)
+        handler = ENDPOINTS.get(url.path.rstrip('/') or '/status')
+        if handler is None:
+            return self._send(404, _error_body(f"Unknown path: {url.path}"), head=head)
+        index = service.current_index()
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        today = date.today()
+        try:
+            relative = handler is _next_holidays and 'from' not in query
+            # Answers that depend on today's date must not be revalidated across days
+            etag = _etag(index.fingerprint, today if relative else None)
+            if self._not_modified(etag, index.fingerprint, relative):
+                return self._send(304, b'', etag=etag, fingerprint=index.fingerprint, head=True)
+            key = (url.path, url.query, today if relative else None)
+            body = service.cached_response(index, key, lambda: handler(service, index, query, today))
+        except _QueryError as e:
+            return self._send(400, _error_body(str(e)), head=head)
+        self._send(200, body, etag=etag, fingerprint=index.fingerprint, head=head)
+
+    def _not_modified(self, etag, fingerprint, relative):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and fingerprint and not relative:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(fingerprint[0] // 1_000_000_000) <= since
+        return False
+
+    def _send(self, status, body, etag=None, fingerprint=None, head=False):
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # cache, but revalidate with the ETag
+        if fingerprint:
+            self.send_header('Last-Modified', formatdate(fingerprint[0] / 1_000_000_000, usegmt=True))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+# --- Endpoints (each returns the JSON body as bytes) ---
+def _holidays(service, index, query, today):
+    start = _parse_date(query, 'from')
+    end = _parse_date(query, 'to')
+    rows = index.between(query.get('location'), start and start.toordinal(),
+                         end and end.toordinal() + 1)
+    return _holiday_list(index, rows, {'location': query.get('location')})
+
+
+def _is_holiday(service, index, query, today):
+    day = _parse_date(query, 'date', required=True)
+    rows = index.between(query.get('location'), day.toordinal(), day.toordinal() + 1)
+    return _holiday_list(index, rows, {'date': day.isoformat(), 'location': query.get('location'),
+                                       'is_holiday': len(rows) > 0})
+
+
+def _next_holidays(service, index, query, today):
+    start = _parse_date(query, 'from') or today
+    try:
+        count = int(query.get('count', 5))
+    except ValueError:
+        raise _QueryError("count must be a whole number.")
+    if not 1 <= count <= MAX_NEXT_COUNT:
+        raise _QueryError(f"count must be between 1 and {MAX_NEXT_COUNT}.")
+    rows = index.between(query.get('location'), start.toordinal(), limit=count)
+    return _holiday_list(index, rows, {'location': query.get('location'), 'from': start.isoformat()})
+
+
+def _status(service, index, query, today):
+    mtime_ns, size = index.fingerprint or (None, None)
+    return json.dumps({
+        'holidays_file': service.holidays_file,
+        'holidays': len(index),
+        'file_modified': datetime.fromtimestamp(mtime_ns / 1_000_000_000).isoformat() if mtime_ns else None,
+        'file_size': size,
+        'loaded_at': datetime.fromtimestamp(index.loaded_at).isoformat(timespec='seconds'),
+        'reloads': service.reloads,
+    }).encode('utf-8')
+
+
+ENDPOINTS = {
+    '/holidays': _holidays,
+    '/is-holiday': _is_holiday,
+    '/next': _next_holidays,
+    '/status': _status,
+}
+
+
+# --- Helpers ---
+def _holiday_list(index, rows, fields):
+    head = json.dumps(fields, ensure_ascii=False)[:-1]
+    items = ','.join(index.entry_json[position] for position in rows)
+    return f'{head}, "count": {len(rows)}, "holidays": [{items}]}}'.encode('utf-8')
+
+
+def _parse_date(query, name, required=False):
+    value = query.get(name)
+    if not value:
+        if required:
+            raise _QueryError(f"Missing '{name}' (YYYY-MM-DD).")
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise _QueryError(f"Invalid '{name}': {value}. Use YYYY-MM-DD.")
+
+
+def _etag(fingerprint, day=None):
+    mtime_ns, size = fingerprint or (0, 0)
+    suffix = f"-{day:%Y%m%d}" if day else ''
+    return f'"{mtime_ns:x}-{size:x}{suffix}"'
+
+
+def _error_body(message):
+    return json.dumps({'error': message}).encode('utf-8')
+
+
+def _text(value):
+    return '' if value is None or value != value else str(value)  # NaN -> ''
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve holiday queries as JSON over HTTP.")
+    parser.add_argument('--config', default='config.ini', help="Config profile to read (default: config.ini)")
+    parser.add_argument('--holidays', help="Holiday file to serve (default: HOLIDAYS_FILE in the config)")
+    parser.add_argument('--host', help="Address to listen on (default: SERVICE_HOST in the config, 127.0.0.1)")
+    parser.add_argument('--port', type=int, help="Port to listen on (default: SERVICE_PORT in the config, 8765)")
+    args = parser.parse_args()
+
+    settings = {}
+    try:
+        settings = tool_config.load_settings(args.config)
+    except (configparser.Error, FileNotFoundError, ValueError) as e:
+        if not args.holidays:
+            print(f"Configuration Error: {e}")
+            sys.exit(1)
+
+    try:
+        service = HolidayQueryService(args.holidays or settings['HOLIDAYS_FILE'],
+                                      host=args.host or settings.get('SERVICE_HOST', '127.0.0.1'),
+                                      port=args.port if args.port is not None else settings.get('SERVICE_PORT', 8765))
+    except (ValueError, OSError) as e:
+        print(f"Error: Could not start the holiday service: {e}")
+        logging.error(f"Could not start the holiday service: {e}")
+        sys.exit(1)
+    host, port = service.address
+    print(f"Holiday service on http://{host}:{port}/ serving {len(service.index)} holiday(s) "
+          f"from '{service.holidays_file}' (Ctrl+C to stop)", flush=True)
+    service.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
@@ -0,0 +1,270 @@
+"""
+End-to-end load test for the Holiday Reminder Tool.
+
+Starts the local SMTP sink (smtp_sink.py) in-process or as a subprocess,
+generates a synthetic roster of the requested size, points a throwaway
+config.ini at the sink (STARTTLS + AUTH on) and runs send_holiday_reminders
+against it. Reports messages per second, p50/p99 per-message send latency, and
+how the run dealt with the injected faults (sent, failed, retried, and whether
+the sink's accepted-message count matches what the tool reports as sent).
+
+Everything the run writes (config, roster, log, metrics) goes to a temporary
+working directory, so the real config.ini and holiday_tool.log are untouched.
+
+Usage:
+    python load_test.py --recipients 1000
+    python load_test.py --recipients 5000 --latency DATA=0.01 --fail RCPT=0.01:450 --disconnect DATA=0.002
+    python load_test.py --recipients 1000 --sink subprocess --output load_test.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+import smtp_sink  # noqa: E402
+from synthetic_data import generate_employees_csv  # noqa: E402
+
+SINK_USERNAME = 'loadtest@example.com'
+SINK_PASSWORD = 'loadtest-password'
+
+
+def write_config(work_dir, port, holidays_file, employees_file, personalize, transport='smtp', compact=False):
+    config_path = os.path.join(work_dir, 'config.ini')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        f.write(f"""[EMAIL_SETTINGS]
+SERVICE_PROVIDER = Custom
+SMTP_SERVER = 127.0.0.1
+SMTP_PORT = {port}
+SMTP_STARTTLS = true
+SENDER_EMAIL = {SINK_USERNAME}
+SENDER_PASSWORD = {SINK_PASSWORD}
+
+[DELIVERY]
+TRANSPORT = {transport}
+OUTPUT_PATH = {os.path.join(work_dir, 'outbox')}
+
+[FILE_PATHS]
+HOLIDAYS_FILE = {holidays_file}
+EMPLOYEES_FILE = {employees_file}
+
+[EMAIL_CONTENT]
+COMPANY_NAME_SUBJECT_SUFFIX = Load Test
+COMPANY_NAME_FOOTER = Load Test
+SIGNATURE_NAME = Load Test
+PERSONALIZE_EMAILS = {'true' if personalize else 'false'}
+COMPACT_HTML = {'true' if compact else 'false'}
+
+[METRICS]
+METRICS_DIR = {os.path.join(work_dir, 'metrics')}
+""")
+    return config_path
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_subprocess_sink(args):
+    """Starts smtp_sink.py as a child process and waits until it accepts connections."""
+    port = _free_port()
+    command = [sys.executable, os.path.join(REPO_DIR, 'smtp_sink.py'), '--port', str(port),
+               '--username', SINK_USERNAME, '--password', SINK_PASSWORD]
+    for option in ('latency', 'fail', 'disconnect'):
+        for value in getattr(args, option) or []:
+            command += [f"--{option}", value]
+    if args.seed is not None:
+        command += ['--seed', str(args.seed)]
+    if args.no_8bitmime:
+        command.append('--no-8bitmime')
+    if args.no_pipelining:
+        command.append('--no-pipelining')
+    if args.round_trip:
+        command += ['--round-trip', str(args.round_trip)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()  # "SMTP sink listening on ..." (printed after the certificate is ready)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("SMTP sink subprocess did not start listening.")
+
+
+def stop_subprocess_sink(process):
+    """Interrupts the sink subprocess and returns the stats it prints on shutdown (None if unavailable)."""
+    process.send_signal(signal.SIGINT)
+    try:
+        output, _ = process.communicate(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        output, _ = process.communicate()
+    for line in output.splitlines():
+        if line.startswith('Sink stats: '):
+            return json.loads(line[len('Sink stats: '):])
+    return None
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_load_test(args):
+    work_dir = tempfile.mkdtemp(prefix='holiday_load_test_')
+    employees_file = generate_employees_csv(os.path.join(work_dir, 'employees.csv'), args.recipients,
+                                            duplicate_rate=0.0, invalid_rate=args.invalid_rate,
+                                            seed=args.seed if args.seed is not None else 42)
+    holidays_file = os.path.abspath(args.holidays)
+
+    sink, sink_process, port = None, None, 0
+    if args.transport != 'smtp':
+        pass  # nothing goes over the network
+    elif args.sink == 'subprocess':
+        sink_process, port = start_subprocess_sink(args)
+    else:
+        sink = smtp_sink.SMTPSink(smtp_sink.SinkOptions(
+            latency=smtp_sink.parse_assignments(args.latency, float),
+            failures=smtp_sink.parse_assignments(args.fail, smtp_sink.parse_failure),
+            disconnects=smtp_sink.parse_assignments(args.disconnect, float),
+            username=SINK_USERNAME, password=SINK_PASSWORD, seed=args.seed,
+            eight_bit_mime=not args.no_8bitmime, pipelining=not args.no_pipelining, round_trip=args.round_trip,
+        )).start()
+        port = sink.address[1]
+
+    write_config(work_dir, port, holidays_file, employees_file, args.personalize, args.transport, args.compact)
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)  # main_tool.start() reads ./config.ini and writes ./holiday_tool.log
+    try:
+        import main_tool
+
+        # Time each send_email call made by the run
+        latencies = []
+        original_send_email = main_tool.send_email
+
+        def timed_send_email(*send_args, **send_kwargs):
+            start = time.perf_counter()
+            try:
+                return original_send_email(*send_args, **send_kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        main_tool.send_email = timed_send_email
+        try:
+            start = time.perf_counter()
+            summary = main_tool.send_holiday_reminders()
+            elapsed = time.perf_counter() - start
+        finally:
+            main_tool.send_email = original_send_email
+    finally:
+        os.chdir(previous_dir)
+        sink_stats = None
+        if sink is not None:
+            sink_stats = sink.stats.as_dict()
+            sink.stop()
+        elif sink_process is not None:
+            sink_stats = stop_subprocess_sink(sink_process)
+        if not args.keep_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    counters = summary['counters']
+    report = {
+        'recipients': args.recipients,
+        'transport': args.transport,
+        'sink': args.sink if args.transport == 'smtp' else None,
+        'faults': {'latency': args.latency or [], 'fail': args.fail or [], 'disconnect': args.disconnect or []},
+        'elapsed_seconds': round(elapsed, 3),
+        'messages_per_second': round(counters.get('emails_sent', 0) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            'max': round(max(latencies) * 1000, 3) if latencies else 0.0,
+        },
+        'outcome': {
+            'attempted': len(latencies),
+            'sent': counters.get('emails_sent', 0),
+            'failed': counters.get('emails_failed', 0),
+            'retries': counters.get('smtp_retries', 0),
+            'invalid_addresses': counters.get('recipients_invalid', 0),
+            'smtp_connections_opened': counters.get('smtp_connections_opened', 0),
+            'message_bytes': counters.get('message_bytes', 0),
+            'stale_connections': counters.get('smtp_stale_connections', 0),
+        },
+        'phases': summary['phases'],
+    }
+    if sink_stats is not None:
+        report['sink_stats'] = sink_stats
+        # Every message the tool counted as sent must have reached the sink, and vice versa
+        report['outcome']['sink_accepted'] = sink_stats['messages']
+        report['outcome']['consistent'] = sink_stats['messages'] == report['outcome']['sent']
+    if args.keep_work_dir:
+        report['work_dir'] = work_dir
+    return report
+
+
+def print_report(report):
+    outcome = report['outcome']
+    print("\n=== Load test report ===")
+    print(f"Recipients:        {report['recipients']} (transport: {report['transport']}, sink: {report['sink']})")
+    print(f"Elapsed:           {report['elapsed_seconds']:.2f}s")
+    print(f"Throughput:        {report['messages_per_second']:.1f} msgs/sec")
+    print(f"Send latency:      p50 {report['latency_ms']['p50']:.2f} ms, p99 {report['latency_ms']['p99']:.2f} ms, "
+          f"max {report['latency_ms']['max']:.2f} ms")
+    print(f"Outcome:           {outcome['sent']} sent, {outcome['failed']} failed, {outcome['retries']} retries, "
+          f"{outcome['invalid_addresses']} invalid address(es), {outcome['smtp_connections_opened']} SMTP connection(s)")
+    if 'sink_accepted' in outcome:
+        status = 'OK' if outcome['consistent'] else 'MISMATCH'
+        print(f"Sink accepted:     {outcome['sink_accepted']} message(s) [{status}]")
+        print(f"Injected faults:   {report['sink_stats']['injected_errors']} error(s), "
+              f"{report['sink_stats']['injected_disconnects']} disconnect(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test send_holiday_reminders against a local SMTP sink.")
+    parser.add_argument('--recipients', type=int, default=500, help="Roster size")
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help="Share of invalid addresses in the roster")
+    parser.add_argument('--holidays', default=os.path.join(REPO_DIR, 'holidays.csv'), help="Holidays CSV to render")
+    parser.add_argument('--personalize', action='store_true', help="Run with PERSONALIZE_EMAILS = true")
+    parser.add_argument('--compact', action='store_true', help="Run with COMPACT_HTML = true")
+    parser.add_argument('--transport', choices=['smtp', 'spool', 'maildir', 'mbox', 'null'], default='smtp',
+                        help="Delivery transport; anything but smtp measures the run without the network")
+    parser.add_argument('--sink', choices=['inprocess', 'subprocess'], default='inprocess',
+                        help="Run the SMTP sink in this process or as a child process")
+    parser.add_argument('--latency', action='append', metavar='CMD=SECONDS', help="See smtp_sink.py")
+    parser.add_argument('--fail', action='append', metavar='CMD=PROB[:CODE]', help="See smtp_sink.py")
+    parser.add_argument('--disconnect', action='append', metavar='CMD=PROB', help="See smtp_sink.py")
+    parser.add_argument('--no-8bitmime', action='store_true', help="The sink does not advertise 8BITMIME")
+    parser.add_argument('--no-pipelining', action='store_true', help="The sink does not advertise PIPELINING")
+    parser.add_argument('--round-trip', type=float, default=0, metavar='SECONDS',
+                        help="Simulated network round trip of the sink (see smtp_sink.py)")
+    parser.add_argument('--seed', type=int, help="Seed for the roster and the sink's fault injection")
+    parser.add_argument('--output', help="Also write the report as JSON to this file")
+    parser.add_argument('--keep-work-dir', action='store_true', help="Keep the temporary config, roster, log and metrics")
+    args = parser.parse_args()
+
+    report = run_load_test(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Report written to {args.output}")
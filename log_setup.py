@@ -0,0 +1,115 @@
+"""
+Non-blocking logging for the Holiday Reminder Tool.
+
+Log records are put on an in-memory queue by the calling thread and written
+by a background QueueListener thread, so a slow disk or a redirected stdout
+no longer throttles the send loop. The log file is rotated by size.
+
+Per-recipient success lines can be sampled (keep 1 in N); warnings, errors and
+any record not marked as a recipient success are always logged.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener = None
+_sampler = None
+
+
+class SuccessSampler(logging.Filter):
+    """Keeps every Nth per-recipient success record; everything else passes untouched."""
+
+    def __init__(self, sample_every=1):
+        super().__init__()
+        self.sample_every = max(1, int(sample_every))
+        self.seen = 0
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'recipient_success', False) or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            keep = self.seen % self.sample_every == 0
+            self.seen += 1
+            if not keep:
+                self.suppressed += 1
+        return keep
+
+
+class _ConsoleFilter(logging.Filter):
+    """Only records logged with extra={'console': True} are echoed to stdout."""
+
+    def filter(self, record):
+        return getattr(record, 'console', False)
+
+
+def configure_logging(log_file='holiday_tool.log', level=logging.INFO, max_bytes=5 * 1024 * 1024,
+                      backup_count=5, success_sample_every=1):
+    """
+    Routes the root logger through a queue to a background writer thread.
+    Can be called again (e.g. once config.ini is read) to change rotation or sampling.
+    """
+    global _listener, _sampler
+    previous_listener = _listener
+
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                        encoding='utf-8', delay=True)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+    console_handler.addFilter(_ConsoleFilter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    _sampler = SuccessSampler(success_sample_every)
+    queue_handler.addFilter(_sampler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        if not isinstance(handler, logging.handlers.QueueHandler):
+            handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    # Stop the previous writer only after the new one is receiving records
+    _stop_listener(previous_listener)
+    return _sampler
+
+
+def log_recipient_success(message):
+    """Logs (and echoes to the console) a per-recipient success line, subject to sampling."""
+    logging.info(message, extra={'recipient_success': True, 'console': True})
+
+
+def suppressed_success_lines():
+    """Number of per-recipient success lines dropped by sampling so far."""
+    return _sampler.suppressed if _sampler is not None else 0
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the background writer."""
+    global _listener
+    _stop_listener(_listener)
+    _listener = None
+
+
+def _stop_listener(listener):
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
@@ -1,77 +1,83 @@
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import pandas as pd
 from datetime import datetime, timedelta
 from apscheduler.schedulers.blocking import BlockingScheduler
+import argparse
 import os
 import sys
 import configparser
 import re # <--- NEW: For email validation
 import logging # <--- NEW: For logging
+import threading
 
 # --- Import the email generator module ---
+import data_sources
+import delivery_state
+import digest_renderers
 import email_generator
-
-# --- Basic Logging Configuration ---
-logging.basicConfig(filename='holiday_tool.log',
-                    level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    datefmt='%Y-%m-%d %H:%M:%S')
-logging.info("Holiday Reminder Tool starting up.")
+import log_setup
+import parallel_render
+import profiling
+import run_metrics
+import sharding
+import smtp_pipelining
+import tool_config
+import transports
+from smtp_pool import SMTPConnectionPool
 
 # --- Configuration (READ FROM config.ini) ---
-config = configparser.ConfigParser()
+# Nothing is read at import: start() sets up logging, loads the configuration and the shared
+# run resources (the scheduler calls it, and so does the first send_holiday_reminders()).
+# run_reminders/send_email take their settings explicitly and work without it.
 config_file_path = 'config.ini'
+CONFIG = None      # tool_config.ConfigManager; CONFIG.current is the settings version in use
+RESOURCES = None   # ReminderResources shared by the runs of this process
+SETTINGS = None
+_start_lock = threading.Lock()
 
-try:
-    if not os.path.exists(config_file_path):
-        logging.error(f"Configuration file '{config_file_path}' not found. Please create it.")
-        raise FileNotFoundError(f"Configuration file '{config_file_path}' not found. Please create it as described in Step 1.")
-    config.read(config_file_path)
-
-    # Read common settings
-    SERVICE_PROVIDER = config.get('EMAIL_SETTINGS', 'SERVICE_PROVIDER')
-    SENDER_EMAIL = config.get('EMAIL_SETTINGS', 'SENDER_EMAIL')
-    SENDER_PASSWORD = config.get('EMAIL_SETTINGS', 'SENDER_PASSWORD')
-
-    # Dynamically set SMTP server and port based on service provider
-    if SERVICE_PROVIDER.lower() == 'gmail':
-        SMTP_SERVER = 'smtp.gmail.com'
-        SMTP_PORT = 587
-    elif SERVICE_PROVIDER.lower() == 'outlook':
-        SMTP_SERVER = 'smtp.office365.com'
-        SMTP_PORT = 587
-    else:
-        logging.error(f"Unsupported SERVICE_PROVIDER: {SERVICE_PROVIDER}. Must be 'Gmail' or 'Outlook'.")
-        raise ValueError(f"Unsupported SERVICE_PROVIDER: {SERVICE_PROVIDER}. Must be 'Gmail' or 'Outlook'.")
+# Settings whose change needs more than the next run picking up the new snapshot
+SMTP_KEYS = ('SMTP_SERVER', 'SMTP_PORT', 'SENDER_EMAIL', 'SENDER_PASSWORD', 'SMTP_STARTTLS')
+FILE_KEYS = ('HOLIDAYS_FILE', 'EMPLOYEES_FILE')
+LOGGING_KEYS = ('LOG_MAX_BYTES', 'LOG_BACKUP_COUNT', 'LOG_SUCCESS_SAMPLE_EVERY')
+PROFILING_KEYS = ('PROFILING_ENABLED', 'PROFILES_DIR', 'KEEP_PROFILES')
+
+
+def _publish_settings(settings):
+    """Sets the module-level names (SETTINGS, SENDER_EMAIL, ...) to one config version."""
+    global SETTINGS, SERVICE_PROVIDER, SENDER_EMAIL, SENDER_PASSWORD, SMTP_SERVER, SMTP_PORT
+    global HOLIDAYS_FILE, EMPLOYEES_FILE, COMPANY_NAME_SUBJECT_SUFFIX, COMPANY_NAME_FOOTER, SIGNATURE_NAME
+    SETTINGS = settings
+
+    SERVICE_PROVIDER = SETTINGS['SERVICE_PROVIDER']
+    SENDER_EMAIL = SETTINGS['SENDER_EMAIL']
+    SENDER_PASSWORD = SETTINGS['SENDER_PASSWORD']
+    SMTP_SERVER = SETTINGS['SMTP_SERVER']
+    SMTP_PORT = SETTINGS['SMTP_PORT']
 
-    HOLIDAYS_FILE = config.get('FILE_PATHS', 'HOLIDAYS_FILE')
-    EMPLOYEES_FILE = config.get('FILE_PATHS', 'EMPLOYEES_FILE')
+    HOLIDAYS_FILE = SETTINGS['HOLIDAYS_FILE']
+    EMPLOYEES_FILE = SETTINGS['EMPLOYEES_FILE']
 
     # Read email content settings
-    COMPANY_NAME_SUBJECT_SUFFIX = config.get('EMAIL_CONTENT', 'COMPANY_NAME_SUBJECT_SUFFIX', fallback="Upcoming Holiday Reminder!")
-    COMPANY_NAME_FOOTER = config.get('EMAIL_CONTENT', 'COMPANY_NAME_FOOTER', fallback="Your Company Name")
-    SIGNATURE_NAME = config.get('EMAIL_CONTENT', 'SIGNATURE_NAME', fallback="HR Department")
-
-
-except configparser.Error as e:
-    logging.critical(f"Error reading configuration file: {e}")
-    print(f"Error reading configuration file: {e}")
-    print("Please ensure config.ini is correctly formatted with [EMAIL_SETTINGS], [FILE_PATHS], and [EMAIL_CONTENT] sections.")
-    sys.exit(1)
-except FileNotFoundError as e:
-    logging.critical(f"Configuration file not found: {e}")
-    print(e)
-    sys.exit(1)
-except ValueError as e:
-    logging.critical(f"Configuration Error: {e}")
-    print(f"Configuration Error: {e}")
-    sys.exit(1)
-except Exception as e:
-    logging.critical(f"An unexpected error occurred while loading configuration: {e}")
-    print(f"An unexpected error occurred while loading configuration: {e}")
-    sys.exit(1)
+    COMPANY_NAME_SUBJECT_SUFFIX = SETTINGS['COMPANY_NAME_SUBJECT_SUFFIX']
+    COMPANY_NAME_FOOTER = SETTINGS['COMPANY_NAME_FOOTER']
+    SIGNATURE_NAME = SETTINGS['SIGNATURE_NAME']
+
+
+def _configure_logging(settings):
+    log_setup.configure_logging('holiday_tool.log',
+                                max_bytes=settings['LOG_MAX_BYTES'],
+                                backup_count=settings['LOG_BACKUP_COUNT'],
+                                success_sample_every=settings['LOG_SUCCESS_SAMPLE_EVERY'])
+
+
+_profile_requested = False  # --profile keeps profiling on whatever [PROFILING] says after a reload
+
+
+def _configure_profiling(settings):
+    if settings['PROFILING_ENABLED'] or _profile_requested:
+        profiling.enable(settings['PROFILES_DIR'], keep=settings['KEEP_PROFILES'])
+    else:
+        profiling.disable()
+
 
 def is_valid_email(email):
     """Basic email validation using regex."""
@@ -81,24 +87,52 @@ def is_valid_email(email):
     regex = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
     return re.match(regex, email) is not None
 
-def send_email(to_email, subject, html_content):
-    """Sends an HTML email."""
+def clean_optional(value):
+    """Cleans an optional CSV cell, mapping blanks and NaN to None."""
+    value = email_generator.clean_string(value)
+    return value if isinstance(value, str) and value else None
+
+def send_email(to_email, subject, html_content, settings=None, smtp_pool=None, metrics=None, transport=None):
+    """
+    Sends an HTML email. Returns True if the message was accepted by the server
+    (or handed to the transport).
+    When transport is given (see transports.py), the message is delivered through it.
+    When smtp_pool is given, a pooled (already logged-in) connection is reused
+    instead of opening a new SMTP session for this single message; if that
+    connection drops before the server accepted DATA, the message is retried once on a fresh
+    connection (not after: the server may already have delivered it).
+    """
+    settings = settings or SETTINGS
+    metrics = metrics or run_metrics.NULL_METRICS
+    sender_email = settings['SENDER_EMAIL']
     try:
-        msg = MIMEMultipart('alternative')
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        final_html_content = email_generator.clean_string(html_content) # Clean the final HTML just in case
-        part = MIMEText(final_html_content, 'html', 'utf-8')
-        msg.attach(part)
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.sendmail(SENDER_EMAIL, to_email, msg.as_string())
-        print(f"Email sent successfully to {to_email}")
-        logging.info(f"Email sent successfully to {to_email}")
+        if transport is None and smtp_pool is not None:
+            transport = transports.SMTPTransport(smtp_pool, metrics, pipelining=settings.get('SMTP_PIPELINING', True))
+        compact = settings.get('COMPACT_HTML', False)
+        allow_8bit = compact and transport is not None and transport.supports_8bit()
+        with metrics.timer('mime_build'):
+            message_text, mail_options = digest_renderers.build_message(sender_email, to_email, subject, html_content,
+                                                                        compact=compact, allow_8bit=allow_8bit)
+        metrics.inc('message_bytes', len(message_text))
+
+        if transport is not None:
+            transport.send(sender_email, to_email, message_text, mail_options)
+        else:
+            with metrics.timer('smtp_connect'):
+                server = smtplib.SMTP(settings['SMTP_SERVER'], settings['SMTP_PORT'])
+            with server:
+                with metrics.timer('smtp_connect'):
+                    if settings.get('SMTP_STARTTLS', True):
+                        server.starttls()
+                with metrics.timer('smtp_login'):
+                    if settings['SENDER_PASSWORD']:
+                        server.login(sender_email, settings['SENDER_PASSWORD'])
+                with metrics.timer('smtp_send'):
+                    smtp_pipelining.sendmail(server, sender_email, to_email, message_text,
+                                             pipelining=settings.get('SMTP_PIPELINING', True))
+        metrics.inc('emails_sent')
+        log_setup.log_recipient_success(f"Email sent successfully to {to_email}")
+        return True
     except smtplib.SMTPAuthenticationError as e:
         print(f"Failed to send email to {to_email}. Error: SMTP Authentication failed. Check SENDER_EMAIL and SENDER_PASSWORD (App Password). Details: {e}")
         logging.error(f"SMTP Authentication failed for {to_email}. Check credentials. Details: {e}")
@@ -111,77 +145,367 @@ def send_email(to_email, subject, html_content):
     except Exception as e:
         print(f"Failed to send email to {to_email}. A general error occurred: {e}")
         logging.error(f"General error sending email to {to_email}. Details: {e}")
+    metrics.inc('emails_failed')
+    return False
 
 
-def send_holiday_reminders():
+def report_compact_savings(holidays_df, settings, metrics, recipient_count, allow_8bit):
     """
-    Main function to orchestrate reading data, generating email, and sending.
+    Logs how much smaller a compact message is than the standard one (base64 HTML),
+    measured on the non-personalized email, and records the estimate in the run metrics.
     """
-    current_run_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    print(f"--- Running Holiday Reminder at {current_run_time} ---")
-    logging.info(f"--- Running Holiday Reminder scheduled job at {current_run_time} ---")
+    digest = email_generator.build_holiday_digest(
+        holidays_df,
+        company_name_footer=settings['COMPANY_NAME_FOOTER'],
+        signature_name=settings['SIGNATURE_NAME'],
+        working_days=settings.get('WORKING_DAYS_SECTION', False),
+        business_days_ahead=settings.get('BUSINESS_DAYS_AHEAD', 10))
+    sizes = {}
+    for compact in (False, True):
+        html_content = digest_renderers.render_html(digest, compact=compact)
+        message, _ = digest_renderers.build_message(settings['SENDER_EMAIL'], settings['SENDER_EMAIL'], 'Size check',
+                                                    html_content, compact=compact, allow_8bit=allow_8bit)
+        sizes[compact] = len(message)
+    saved = sizes[False] - sizes[True]
+    encoding = digest_renderers.choose_transfer_encoding(html_content, allow_8bit)
+    metrics.inc('compact_bytes_saved_estimate', saved * recipient_count)
+    print(f"Compact HTML ({encoding}): {sizes[False]:,} -> {sizes[True]:,} bytes per email "
+          f"({saved / sizes[False]:.0%} smaller, ~{saved * recipient_count / 1024:,.0f} KiB saved for {recipient_count} recipient(s)).")
+    logging.info(f"Compact HTML ({encoding}): {sizes[False]} -> {sizes[True]} bytes per email "
+                 f"({saved / sizes[False]:.0%} smaller, ~{saved * recipient_count} bytes saved for {recipient_count} recipient(s)).")
+
+
+@profiling.profiled('run_reminders')
+def run_reminders(settings, holiday_cache=None, smtp_pool=None, shard_id=None, shard_count=None, shard_progress=None):
+    """
+    Reads data, generates the email and sends it for one config profile.
+    holiday_cache (email_generator.HolidayDataCache) and smtp_pool (smtp_pool.SMTPConnectionPool)
+    let several profiles share parsed holiday data and SMTP logins; when smtp_pool is None
+    a pool is opened for this run only, so all recipients share one login.
+    With shard_id/shard_count only the recipients whose email hashes to that shard are sent to;
+    shard_progress (sharding.ShardProgress) skips the ones a previous attempt already sent to
+    and records each new delivery.
+    Per-phase timings and counters are written to settings['METRICS_DIR'] at the end of the run,
+    and returned as the run summary; counters['run_aborted'] is set when the holiday or employee
+    data could not be read, so nothing was sent.
+    """
+    metrics = run_metrics.RunMetrics(profile=settings['PROFILE_NAME'])
+    for counter in ('emails_sent', 'emails_failed', 'smtp_retries'):
+        metrics.inc(counter, 0)  # always present, so run summaries diff cleanly
+    if 'CONFIG_LOAD_SECONDS' in settings:
+        metrics.observe('config_load', settings['CONFIG_LOAD_SECONDS'])
+    suppressed_before = log_setup.suppressed_success_lines()
+    try:
+        _run_reminders(settings, metrics, holiday_cache, smtp_pool, shard_id, shard_count, shard_progress)
+    finally:
+        summary = metrics.write(settings.get('METRICS_DIR'),
+                                keep_runs=settings.get('KEEP_RUN_SUMMARIES', run_metrics.KEEP_RUN_SUMMARIES))
+        counters = summary['counters']
+        suppressed = log_setup.suppressed_success_lines() - suppressed_before
+        logging.info(f"Run summary [{settings['PROFILE_NAME']}]: {counters.get('emails_sent', 0)} sent, "
+                     f"{counters.get('emails_failed', 0)} failed, {counters.get('recipients_invalid', 0)} invalid "
+                     f"address(es), {counters.get('smtp_retries', 0)} retries in {summary['duration_seconds']:.2f}s "
+                     f"({suppressed} success line(s) sampled out).")
+    return summary
 
-    # 1. Get holiday data
-    holidays_df = email_generator.get_holiday_data(HOLIDAYS_FILE)
+
+def _run_reminders(settings, metrics, holiday_cache, smtp_pool, shard_id, shard_count, shard_progress):
+    holidays_file = settings['HOLIDAYS_FILE']
+    employees_file = settings['EMPLOYEES_FILE']
+
+    # 1. Get holiday data (only the months the email shows, and the working-days look-ahead)
+    start_date, end_date = email_generator.settings_horizon_range(settings)
+    if holiday_cache is not None:
+        holidays_df = holiday_cache.get(holidays_file, metrics=metrics, start_date=start_date, end_date=end_date)
+    else:
+        holidays_df = email_generator.get_holiday_data(holidays_file, metrics=metrics,
+                                                       start_date=start_date, end_date=end_date)
     if holidays_df.empty:
         print("No holiday data found or file is empty. Skipping email generation.")
         logging.warning("No holiday data found or file is empty. Skipping email generation.")
+        metrics.inc('run_aborted')
         return
 
-    # 2. Generate email HTML content
-    email_html_content = email_generator.generate_modern_holiday_email_html(
-        holidays_df,
-        company_name_footer=COMPANY_NAME_FOOTER,
-        signature_name=SIGNATURE_NAME
-    )
-
-    # 3. Get employee emails
+    # 2. Get employee emails
     try:
-        employees_df = pd.read_csv(EMPLOYEES_FILE)
+        with metrics.timer('csv_parse'):
+            employees_df = data_sources.read_employees(employees_file)
         if 'Email' not in employees_df.columns:
-            logging.error(f"Required column 'Email' not found in {EMPLOYEES_FILE}.")
-            raise KeyError(f"Required column 'Email' not found in {EMPLOYEES_FILE}. Please check your CSV headers.")
+            logging.error(f"Required column 'Email' not found in {employees_file}.")
+            raise KeyError(f"Required column 'Email' not found in {employees_file}. Please check your CSV headers.")
+        metrics.inc('roster_rows', len(employees_df))
         
         # Clean and validate emails
-        valid_recipient_emails = []
-        for email in employees_df['Email']:
-            cleaned_email = email_generator.clean_string(email)
-            if is_valid_email(cleaned_email):
-                valid_recipient_emails.append(cleaned_email)
-            else:
-                print(f"Invalid or empty email format: '{email}'. Skipping.")
-                logging.warning(f"Invalid or empty email format: '{email}'. Skipping.")
+        names = employees_df['Employee Name'] if 'Employee Name' in employees_df.columns else [None] * len(employees_df)
+        locations = employees_df['Locations'] if 'Locations' in employees_df.columns else [None] * len(employees_df)
+        with metrics.timer('clean'):
+            cleaned_rows = [(email, email_generator.clean_string(email), clean_optional(name), clean_optional(location))
+                            for email, name, location in zip(employees_df['Email'], names, locations)]
+        valid_recipients = []
+        with metrics.timer('validate'):
+            for email, cleaned_email, name, location in cleaned_rows:
+                if is_valid_email(cleaned_email):
+                    valid_recipients.append((cleaned_email, name, location))
+                else:
+                    metrics.inc('recipients_invalid')
+                    print(f"Invalid or empty email format: '{email}'. Skipping.")
+                    logging.warning(f"Invalid or empty email format: '{email}'. Skipping.")
         
-        recipient_emails = valid_recipient_emails
+        recipients = valid_recipients
+        if shard_count:
+            recipients = [r for r in recipients if sharding.in_shard(r[0], shard_id, shard_count)]
+            print(f"Shard {shard_id}/{shard_count}: {len(recipients)} of {len(valid_recipients)} recipient(s).")
+            logging.info(f"Shard {shard_id}/{shard_count}: {len(recipients)} of {len(valid_recipients)} recipient(s).")
+        if shard_progress is not None and shard_progress.sent:
+            unsent = [r for r in recipients if not shard_progress.already_sent(r[0])]
+            metrics.inc('recipients_already_sent', len(recipients) - len(unsent))
+            print(f"Shard {shard_id}: {len(recipients) - len(unsent)} recipient(s) already sent to by an earlier attempt.")
+            logging.info(f"Shard {shard_id}: {len(recipients) - len(unsent)} recipient(s) already sent to by an "
+                         f"earlier attempt, {len(unsent)} left.")
+            recipients = unsent
+            if not recipients:
+                return
+        metrics.inc('recipients', len(recipients))
 
     except FileNotFoundError:
-        print(f"Error: Employee file '{EMPLOYEES_FILE}' not found. Cannot send emails.")
-        logging.error(f"Employee file '{EMPLOYEES_FILE}' not found.")
+        print(f"Error: Employee file '{employees_file}' not found. Cannot send emails.")
+        logging.error(f"Employee file '{employees_file}' not found.")
+        metrics.inc('run_aborted')
         return
     except KeyError as e:
-        print(f"Error: Missing expected column in '{EMPLOYEES_FILE}'. {e}")
-        logging.error(f"Missing expected column in '{EMPLOYEES_FILE}'. {e}")
+        print(f"Error: Missing expected column in '{employees_file}'. {e}")
+        logging.error(f"Missing expected column in '{employees_file}'. {e}")
+        metrics.inc('run_aborted')
         return
     except Exception as e:
-        print(f"An unexpected error occurred while reading '{EMPLOYEES_FILE}': {e}")
-        logging.error(f"Unexpected error reading '{EMPLOYEES_FILE}': {e}")
+        print(f"An unexpected error occurred while reading '{employees_file}': {e}")
+        logging.error(f"Unexpected error reading '{employees_file}': {e}")
+        metrics.inc('run_aborted')
         return
 
 
-    if not recipient_emails:
+    if not recipients:
         print("No valid recipient emails found in employees file. No emails to send.")
         logging.warning("No valid recipient emails found. No emails to send.")
         return
 
-    subject = f"Upcoming Holiday Reminder! - {COMPANY_NAME_SUBJECT_SUFFIX}"
-    for email in recipient_emails:
-        send_email(email, subject, email_html_content)
+    # Delta mode: only email recipients whose digest changed since their last delivery
+    delta_store, recipient_hashes, delivered = None, {}, []
+    if settings.get('DELTA_MODE'):
+        delta_store = delivery_state.DeliveryStateStore(settings['DELTA_STATE_FILE'])
+        unfiltered_count = len(recipients)
+        recipients, recipient_hashes = delivery_state.changed_recipients(delta_store, settings, holidays_df,
+                                                                         recipients, metrics)
+        print(f"Delta mode: {len(recipients)} of {unfiltered_count} recipient(s) have a changed holiday view.")
+        logging.info(f"Delta mode: {len(recipients)} of {unfiltered_count} recipient(s) have a changed holiday view.")
+        if not recipients:
+            return
+
+    shard_sent = []
+
+    def deliver(email, html_content):
+        if not send_email(email, subject, html_content, settings=settings, metrics=metrics, transport=transport):
+            return
+        if delta_store and transport.delivers:
+            delivered.append((delivery_state.recipient_key(email), recipient_hashes[email]))
+        if shard_progress is not None and transport.delivers:
+            if transport.queues:
+                shard_sent.append(email)
+            else:
+                shard_progress.record([email])
+
+    run_pool = None
+    if settings.get('TRANSPORT', 'smtp') == 'smtp':
+        run_pool = smtp_pool or SMTPConnectionPool.from_settings(settings)
+    transport = transports.create_transport(settings, smtp_pool=run_pool, metrics=metrics)
+    subject = f"Upcoming Holiday Reminder! - {settings['COMPANY_NAME_SUBJECT_SUFFIX']}"
+    try:
+        if settings.get('COMPACT_HTML'):
+            report_compact_savings(holidays_df, settings, metrics, len(recipients), transport.supports_8bit())
+
+        # 3. Generate email HTML content and send
+        if settings.get('PERSONALIZE_EMAILS'):
+            # One rendering per distinct (name, location); send each as soon as it is rendered
+            emails_by_variant = {}
+            for email, name, location in recipients:
+                emails_by_variant.setdefault((name, location), []).append(email)
+            metrics.inc('render_variants', len(emails_by_variant))
+            rendered = parallel_render.render_variants(
+                holidays_df, list(emails_by_variant),
+                company_name_footer=settings['COMPANY_NAME_FOOTER'],
+                signature_name=settings['SIGNATURE_NAME'],
+                max_workers=settings.get('RENDER_WORKERS'),
+                compact=settings.get('COMPACT_HTML', False),
+                working_days=settings.get('WORKING_DAYS_SECTION', False),
+                business_days_ahead=settings.get('BUSINESS_DAYS_AHEAD', 10))
+            while True:
+                # Time spent waiting for the next finished variant counts as render time
+                with metrics.timer('render'):
+                    item = next(rendered, None)
+                if item is None:
+                    break
+                variant, email_html_content = item
+                for email in emails_by_variant[variant]:
+                    deliver(email, email_html_content)
+        else:
+            with metrics.timer('render'):
+                digest = email_generator.build_holiday_digest(
+                    holidays_df,
+                    company_name_footer=settings['COMPANY_NAME_FOOTER'],
+                    signature_name=settings['SIGNATURE_NAME'],
+                    working_days=settings.get('WORKING_DAYS_SECTION', False),
+                    business_days_ahead=settings.get('BUSINESS_DAYS_AHEAD', 10))
+                email_html_content = digest_renderers.render_html(digest, compact=settings.get('COMPACT_HTML', False))
+            for email, _, _ in recipients:
+                deliver(email, email_html_content)
+    finally:
+        transport.close()
+        if delta_store is not None:
+            # After close, so file transports have written everything; if a write failed there is
+            # no telling which messages were lost, so nothing is recorded and all are sent again
+            if not transport.delivers:
+                logging.info(f"Delta mode: the {transport.name} transport delivers nothing, digests not recorded.")
+            elif metrics.counters.get('transport_write_failures'):
+                logging.warning("Delta mode: file transport write failures, delivered digests not recorded.")
+            else:
+                delta_store.record(settings['PROFILE_NAME'], delivered)
+        if shard_sent:
+            # Queued messages count as delivered once written, and only if no batch failed to write
+            if metrics.counters.get('transport_write_failures'):
+                logging.warning(f"Shard {shard_id}: file transport write failures, progress not recorded.")
+            else:
+                shard_progress.record(shard_sent)
+        if smtp_pool is None and run_pool is not None:
+            run_pool.close()
+
+
+class ReminderResources:
+    """
+    State kept warm across the runs of this process: the parsed holiday data and the SMTP
+    pool (its connections are closed after each run; the pool keeps the server's known
+    extensions). apply_config rebuilds only what a configuration change affects.
+    """
+
+    def __init__(self, settings):
+        self.holiday_cache = email_generator.HolidayDataCache()
+        self.smtp_pool = SMTPConnectionPool.from_settings(settings)
+
+    def apply_config(self, old, new, changed):
+        """ConfigManager listener: called between runs with the keys that changed."""
+        if changed & set(SMTP_KEYS):
+            self.smtp_pool.close()
+            self.smtp_pool = SMTPConnectionPool.from_settings(new)
+            logging.info(f"SMTP pool rebuilt for {new['SENDER_EMAIL']} at {new['SMTP_SERVER']}:{new['SMTP_PORT']}.")
+        if changed & set(FILE_KEYS):
+            self.holiday_cache.clear()
+            logging.info("Holiday data cache cleared (file paths changed).")
+
+    def run(self, settings, shard_id=None, shard_count=None, shard_progress=None):
+        try:
+            return run_reminders(settings, holiday_cache=self.holiday_cache, smtp_pool=self.smtp_pool,
+                                 shard_id=shard_id, shard_count=shard_count, shard_progress=shard_progress)
+        finally:
+            self.smtp_pool.close()  # no SMTP connection stays open between scheduled runs
+
+
+def _apply_config(old, new, changed):
+    """ConfigManager listener for the process-wide settings."""
+    _publish_settings(new)
+    if changed & set(LOGGING_KEYS):
+        _configure_logging(new)
+    if changed & set(PROFILING_KEYS):
+        _configure_profiling(new)
+
+
+def start(config_path=None):
+    """
+    Sets up logging and loads config_path (default config.ini) with hot reload listeners and
+    the shared run resources. Only the first call does anything; exits with a message when
+    the configuration cannot be loaded. Returns CONFIG.
+    """
+    global CONFIG, RESOURCES, config_file_path
+    with _start_lock:
+        if CONFIG is not None:
+            return CONFIG
+        config_file_path = config_path or config_file_path
+
+        # --- Basic Logging Configuration ---
+        # Records are written by a background thread (see log_setup.py); rotation and
+        # success-line sampling are applied from config.ini once it has been read.
+        log_setup.configure_logging('holiday_tool.log')
+        logging.info("Holiday Reminder Tool starting up.")
+
+        try:
+            config = tool_config.ConfigManager(config_file_path)
+            _publish_settings(config.current)
+            _configure_logging(SETTINGS)
+            if SETTINGS['PROFILING_ENABLED']:
+                profiling.enable(SETTINGS['PROFILES_DIR'], keep=SETTINGS['KEEP_PROFILES'])
+
+        except configparser.Error as e:
+            logging.critical(f"Error reading configuration file: {e}")
+            print(f"Error reading configuration file: {e}")
+            print("Please ensure config.ini is correctly formatted with [EMAIL_SETTINGS], [FILE_PATHS], and [EMAIL_CONTENT] sections.")
+            sys.exit(1)
+        except FileNotFoundError as e:
+            logging.critical(f"Configuration file not found: {e}")
+            print(e)
+            sys.exit(1)
+        except ValueError as e:
+            logging.critical(f"Configuration Error: {e}")
+            print(f"Configuration Error: {e}")
+            sys.exit(1)
+        except Exception as e:
+            logging.critical(f"An unexpected error occurred while loading configuration: {e}")
+            print(f"An unexpected error occurred while loading configuration: {e}")
+            sys.exit(1)
+
+        RESOURCES = ReminderResources(SETTINGS)
+        config.add_listener(_apply_config)
+        config.add_listener(RESOURCES.apply_config)
+        CONFIG = config
+        return CONFIG
+
+
+@profiling.profiled('send_holiday_reminders')
+def send_holiday_reminders(shard_id=None, shard_count=None, shard_progress=None):
+    """
+    Main function to orchestrate reading data, generating email, and sending.
+    Pass shard_id and shard_count to send only one shard of the roster, and shard_progress to
+    skip the recipients an earlier attempt at that shard already sent to (see sharding.py).
+    The run uses one configuration version throughout; a reload waits until it has finished.
+    Returns the run summary (see run_metrics.py).
+    """
+    start()
+    current_run_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"--- Running Holiday Reminder at {current_run_time} (configuration version {CONFIG.current.version}) ---")
+    logging.info(f"--- Running Holiday Reminder scheduled job at {current_run_time} "
+                 f"(configuration version {CONFIG.current.version}) ---")
+
+    summary = CONFIG.run(RESOURCES.run, shard_id=shard_id, shard_count=shard_count, shard_progress=shard_progress)
 
     print("--- Holiday Reminder run complete ---")
     logging.info("--- Holiday Reminder run complete ---")
+    return summary
 
 # --- Scheduling the task ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Holiday Reminder Tool scheduler.")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile each run with cProfile and tracemalloc (see [PROFILING] in config.ini)")
+    args = parser.parse_args()
+    start()
+    if args.profile:
+        profiling.enable(SETTINGS['PROFILES_DIR'], keep=SETTINGS['KEEP_PROFILES'])
+        _profile_requested = True
+
+    # Pick up config.ini changes without a restart (validated, swapped in between runs)
+    CONFIG.watch()
+    if CONFIG.install_sighup_handler():
+        print(f"Reloading {config_file_path} when it changes or on SIGHUP (kill -HUP {os.getpid()}).")
+    else:
+        print(f"Reloading {config_file_path} when it changes.")
+
     print("Starting Holiday Reminder Tool...")
     # Set timezone for India
     scheduler = BlockingScheduler(timezone='Asia/Kolkata')
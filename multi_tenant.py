@@ -0,0 +1,116 @@
+"""
+Multi-tenant mode for the Holiday Reminder Tool.
+
+Loads every *.ini profile in a directory and schedules each tenant's reminder
+job on one shared scheduler. Tenants that point at the same holidays file share
+one parsed copy, and tenants that send through the same account share one SMTP
+connection pool, so memory and SMTP logins grow with the number of distinct
+files and accounts rather than with the number of tenants. A pool's connections
+are closed once no tenant run is using them, and the shared holiday cache keeps
+only the most recently used files and date ranges.
+
+Usage:
+    python multi_tenant.py <profiles_dir> [--run-now] [--profile]
+"""
+
+import argparse
+import configparser
+import glob
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+import email_generator
+import log_setup
+import main_tool
+import profiling
+import tool_config
+from smtp_pool import SMTPPoolRegistry
+
+
+def load_profiles(profiles_dir):
+    """
+    Loads and validates (tool_config.validate_settings) all *.ini profiles in profiles_dir.
+    Invalid profiles are logged and skipped.
+    """
+    profiles = []
+    for config_path in sorted(glob.glob(os.path.join(profiles_dir, '*.ini'))):
+        try:
+            settings = tool_config.load_settings(config_path)
+            tool_config.validate_settings(settings)
+            profiles.append(settings)
+        except (configparser.Error, FileNotFoundError, ValueError) as e:
+            print(f"Skipping profile '{config_path}': {e}")
+            logging.error(f"Skipping profile '{config_path}': {e}")
+    return profiles
+
+
+def run_tenant(settings, holiday_cache, pool_registry):
+    """Scheduled job for one tenant."""
+    tenant = settings['PROFILE_NAME']
+    current_run_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"--- Running Holiday Reminder for tenant '{tenant}' at {current_run_time} ---")
+    logging.info(f"--- Running Holiday Reminder for tenant '{tenant}' at {current_run_time} ---")
+
+    with pool_registry.pool_for_run(settings) as smtp_pool:
+        main_tool.run_reminders(settings, holiday_cache=holiday_cache, smtp_pool=smtp_pool)
+
+    print(f"--- Holiday Reminder run complete for tenant '{tenant}' ---")
+    logging.info(f"--- Holiday Reminder run complete for tenant '{tenant}' ---")
+
+
+def schedule_tenants(scheduler, profiles, holiday_cache, pool_registry, run_now=False):
+    """Adds one job per tenant to the shared scheduler."""
+    for settings in profiles:
+        job_args = [settings, holiday_cache, pool_registry]
+        job_id = f"holiday-reminder-{settings['PROFILE_NAME']}"
+        if run_now:
+            # In the scheduler's timezone: a naive local time would be read as Asia/Kolkata time
+            scheduler.add_job(run_tenant, 'date', args=job_args, id=job_id,
+                              run_date=datetime.now(scheduler.timezone) + timedelta(seconds=2))
+        else:
+            scheduler.add_job(run_tenant, 'cron', args=job_args, id=job_id, **settings['SCHEDULE'])
+        logging.info(f"Scheduled tenant '{settings['PROFILE_NAME']}' ({settings['CONFIG_FILE']}).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Holiday Reminder jobs for a directory of config.ini profiles.")
+    parser.add_argument('profiles_dir', help="Directory containing one .ini profile per tenant")
+    parser.add_argument('--run-now', action='store_true',
+                        help="Run every tenant once, 2 seconds after start, instead of on its schedule")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile each tenant run with cProfile and tracemalloc")
+    args = parser.parse_args()
+    log_setup.configure_logging('holiday_tool.log')
+    logging.info("Holiday Reminder Tool starting up (multi-tenant).")
+
+    profiles = load_profiles(args.profiles_dir)
+    if not profiles:
+        print(f"No valid profiles found in '{args.profiles_dir}'.")
+        logging.critical(f"No valid profiles found in '{args.profiles_dir}'.")
+        sys.exit(1)
+    if args.profile:
+        # Profiling is process-wide: the first profile's [PROFILING] settings apply to every tenant
+        profiling.enable(profiles[0]['PROFILES_DIR'], keep=profiles[0]['KEEP_PROFILES'])
+
+    holiday_cache = email_generator.HolidayDataCache()
+    pool_registry = SMTPPoolRegistry()
+
+    scheduler = BlockingScheduler(timezone='Asia/Kolkata')
+    schedule_tenants(scheduler, profiles, holiday_cache, pool_registry, run_now=args.run_now)
+
+    print(f"Scheduler initialized with {len(profiles)} tenant(s).")
+    print("Press Ctrl+C to exit.")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        print("Scheduler stopped.")
+        logging.info("Multi-tenant scheduler stopped by user.")
+    except Exception as e:
+        print(f"Scheduler failed: {e}")
+        logging.critical(f"Multi-tenant scheduler failed: {e}", exc_info=True)
+    finally:
+        pool_registry.close_all()
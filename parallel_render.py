@@ -0,0 +1,72 @@
+"""
+Multi-process rendering for personalized holiday emails.
+
+Each distinct (recipient name, location) variant needs its own call to
+generate_modern_holiday_email_html, which is CPU-bound. render_variants fans
+the variants out across a ProcessPoolExecutor. The holiday DataFrame and the
+shared email settings are shipped to each worker once through the pool
+initializer, so a task only carries its small variant key. Results are yielded
+in completion order, so the caller can start sending the first finished
+variant while the rest are still rendering.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import email_generator
+
+# Below this many variants the process start-up cost outweighs the gain
+MIN_VARIANTS_FOR_POOL = 8
+
+def _render_variant(holidays_df, render_options, variant):
+    recipient_name, location = variant
+    return variant, email_generator.generate_modern_holiday_email_html(
+        holidays_df,
+        recipient_name=recipient_name,
+        location=location,
+        **render_options
+    )
+
+
+# --- Worker-side state (set once per worker process by _init_worker; never used in-process) ---
+_worker_holidays_df = None
+_worker_render_options = None
+
+
+def _init_worker(holidays_df, render_options):
+    global _worker_holidays_df, _worker_render_options
+    _worker_holidays_df = holidays_df
+    _worker_render_options = render_options
+
+
+def _render_in_worker(variant):
+    return _render_variant(_worker_holidays_df, _worker_render_options, variant)
+
+
+def render_variants(holidays_df, variants, company_name_footer="Your Company", signature_name="HR Team",
+                    max_workers=None, compact=False, working_days=False, business_days_ahead=10):
+    """
+    Renders each (recipient_name, location) variant and yields (variant, html) as each one finishes.
+    Duplicate variants are rendered once. max_workers defaults to the number of CPUs;
+    small batches (or max_workers == 1) are rendered in-process.
+    compact=True renders the compact HTML (see email_generator.minify_html);
+    working_days adds the working-days section (see business_days.py).
+    """
+    unique_variants = list(dict.fromkeys(variants))
+    render_options = {'company_name_footer': company_name_footer, 'signature_name': signature_name,
+                      'compact': compact, 'working_days': working_days,
+                      'business_days_ahead': business_days_ahead}
+    workers = max_workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(unique_variants) < MIN_VARIANTS_FOR_POOL:
+        # Rendered with this call's own data: concurrent runs in other threads (multi_tenant) share the module
+        for variant in unique_variants:
+            yield _render_variant(holidays_df, render_options, variant)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(unique_variants)),
+                             initializer=_init_worker,
+                             initargs=(holidays_df, render_options)) as executor:
+        futures = [executor.submit(_render_in_worker, variant) for variant in unique_variants]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,207 @@
+"""
+Local preview server for the holiday email.
+
+Serves the latest rendered email from memory at http://127.0.0.1:<port>/
+instead of writing it to a temp file for each preview. The page is served
+with an ETag (a hash of the HTML), so a reload of an unchanged email is a
+304 Not Modified. The page also listens on /events (Server-Sent Events):
+publish() with new HTML tells every open preview to reload itself, so the
+browser tab stays the same while the holiday file is edited.
+
+    server = PreviewServer().start()
+    server.publish(html)             # first version
+    webbrowser.open(server.url)
+    server.publish(new_html)         # open pages reload
+    server.watch('holidays.csv', render)   # or: re-render and publish whenever the file changes
+"""
+
+import hashlib
+import logging
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KEEPALIVE_SECONDS = 15   # SSE comment sent this often, so proxies and browsers keep the stream open
+WATCH_INTERVAL_SECONDS = 1.0
+
+# Added to the served page only (not to the email): reload when the server says the email changed
+RELOAD_SCRIPT = """<script>
+(function () {
+    var events = new EventSource('/events?version=%d');
+    events.addEventListener('reload', function () { window.location.reload(); });
+})();
+</script>
+"""
+
+
+class PreviewServer:
+    """Serves one HTML document from memory and pushes a reload to open pages when it changes."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = ThreadingHTTPServer((host, port), _PreviewHandler)
+        self._server.daemon_threads = True
+        self._server.preview = self
+        self._changed = threading.Condition()
+        self._page = b''
+        self._etag = None
+        self.version = 0
+        self.viewers = 0   # pages currently connected to /events
+        self.closed = False
+        self._thread = None
+        self._watch_thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def publish(self, html_content):
+        """Serves html_content from now on. Returns True if it differs from the previous version."""
+        etag = '"' + hashlib.sha256(html_content.encode('utf-8')).hexdigest()[:20] + '"'
+        with self._changed:
+            if etag == self._etag:
+                return False
+            self.version += 1
+            self._page = _with_reload_script(html_content, self.version).encode('utf-8')
+            self._etag = etag
+            self._changed.notify_all()
+        return True
+
+    def page(self):
+        with self._changed:
+            return self._page, self._etag, self.version
+
+    def add_viewer(self, count):
+        with self._changed:
+            self.viewers += count
+
+    def wait_for_change(self, version, timeout):
+        """Blocks until the version differs from version (or timeout). Returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version or self.closed, timeout=timeout)
+            return self.version
+
+    def watch(self, path, render, interval=WATCH_INTERVAL_SECONDS):
+        """
+        Calls render() and publishes its result whenever the file at path changes (polled every interval
+        seconds). render may return None to keep the current version, e.g. while the file is half-written.
+        """
+        import data_sources  # imports pandas, which the renderer has loaded anyway; publish() alone stays light
+
+        def run():
+            fingerprint = data_sources.file_fingerprint(path)
+            while not self.closed:
+                with self._changed:
+                    self._changed.wait_for(lambda: self.closed, timeout=interval)
+                current = data_sources.file_fingerprint(path)
+                if self.closed or current == fingerprint:
+                    continue
+                fingerprint = current
+                try:
+                    html_content = render()
+                except Exception as e:
+                    logging.warning(f"Preview not updated: could not render after '{path}' changed: {e}")
+                    continue
+                if html_content and self.publish(html_content):
+                    logging.info(f"Preview updated after '{path}' changed.")
+
+        self._watch_thread = threading.Thread(target=run, daemon=True)
+        self._watch_thread.start()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = 64 * 1024  # headers and body leave in one write (flushed after each request)
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        path = self.path.split('?', 1)[0]
+        if path == '/events':
+            return self._events()
+        if path not in ('/', '/index.html'):
+            return self._send(404, b'Not found', 'text/plain; charset=utf-8', head=head)
+        page, etag, _ = self.server.preview.page()
+        if etag and etag in self.headers.get('If-None-Match', ''):
+            return self._send(304, b'', etag=etag, head=True)
+        self._send(200, page, 'text/html; charset=utf-8', etag=etag, head=head)
+
+    def _send(self, status, body, content_type=None, etag=None, head=False):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _events(self):
+        preview = self.server.preview
+        try:
+            seen = int(self.path.partition('version=')[2] or 0)
+        except ValueError:
+            seen = 0
+        self.close_connection = True  # the stream has no length; it ends when either side closes
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        preview.add_viewer(1)
+        try:
+            self.wfile.write(b'retry: 1000\n\n')
+            self.wfile.flush()
+            last_write = time.monotonic()
+            while not preview.closed and not self._client_gone():
+                version = preview.wait_for_change(seen, 1.0)
+                if version != seen:
+                    self.wfile.write(f"event: reload\ndata: {version}\n\n".encode('utf-8'))
+                    seen = version
+                elif time.monotonic() - last_write >= KEEPALIVE_SECONDS:
+                    self.wfile.write(b': keep-alive\n\n')
+                else:
+                    continue
+                self.wfile.flush()
+                last_write = time.monotonic()
+        except OSError:
+            pass  # the page was closed or reloaded
+        finally:
+            preview.add_viewer(-1)
+
+    def _client_gone(self):
+        """True once the page has closed the stream (the browser sends nothing else on it)."""
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+
+
+def _with_reload_script(html_content, version):
+    script = RELOAD_SCRIPT % version
+    position = html_content.lower().rfind('</body>')
+    if position == -1:
+        return html_content + script
+    return html_content[:position] + script + html_content[position:]
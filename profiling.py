@@ -0,0 +1,127 @@
+"""
+Built-in profiling hooks for the Holiday Reminder Tool.
+
+Functions decorated with @profiled(name) run under cProfile and tracemalloc
+while profiling is enabled (--profile on the command line, or ENABLED = true
+in the [PROFILING] section of config.ini). Each call writes into the profiles
+directory:
+  - <name>-<timestamp>.prof       : cProfile stats (open with snakeviz or pstats)
+  - <name>-<timestamp>-alloc.txt  : top memory allocations by source line
+Only the newest KEEP_PROFILES runs per name are kept.
+
+When a profiled function calls another profiled function, only the outermost
+call is profiled (its profile already contains the inner one). Only one call
+is profiled at a time, since cProfile refuses a second active profiler and the
+tracemalloc peak is process-wide: a call made while another thread's call is
+being profiled (multi_tenant jobs on the same schedule, GUI worker threads)
+runs unprofiled, with a log line. When profiling is disabled the decorator
+costs a single flag check.
+"""
+
+import cProfile
+import functools
+import glob
+import logging
+import os
+import threading
+import tracemalloc
+from datetime import datetime
+
+TOP_ALLOCATIONS = 25
+
+_enabled = False
+_profiles_dir = 'profiles'
+_keep = 20
+_active = threading.local()
+_run_lock = threading.Lock()
+
+
+def enable(profiles_dir='profiles', keep=20):
+    """Turns profiling on for all @profiled functions."""
+    global _enabled, _profiles_dir, _keep
+    _profiles_dir = profiles_dir
+    _keep = max(1, int(keep))
+    _enabled = True
+    logging.info(f"Profiling enabled. Profiles are written to '{profiles_dir}' (keeping {_keep} per function).")
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def profiled(name):
+    """Decorator: profile each call of the function while profiling is enabled."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled or getattr(_active, 'running', False):
+                return func(*args, **kwargs)
+            if not _run_lock.acquire(blocking=False):
+                logging.info(f"Profiling skipped for {name}: another call is being profiled.")
+                return func(*args, **kwargs)
+            try:
+                return _run_profiled(name, func, args, kwargs)
+            finally:
+                _run_lock.release()
+        return wrapper
+    return decorator
+
+
+def _run_profiled(name, func, args, kwargs):
+    _active.running = True
+    started_tracing = not tracemalloc.is_tracing()  # e.g. python -X tracemalloc keeps tracing afterwards
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            _dump(name, profiler, snapshot, peak)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _active.running = False
+
+
+def _dump(name, profiler, snapshot, peak_bytes):
+    try:
+        os.makedirs(_profiles_dir, exist_ok=True)
+        base = os.path.join(_profiles_dir, f"{name}-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+        profiler.dump_stats(base + '.prof')
+
+        top_stats = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+        ]).statistics('lineno')
+        with open(base + '-alloc.txt', 'w', encoding='utf-8') as f:
+            f.write(f"Top {TOP_ALLOCATIONS} allocations for {name} (peak traced memory: {peak_bytes / 1024:.1f} KiB)\n\n")
+            for stat in top_stats[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+        logging.info(f"Profile written: {base}.prof")
+        _prune(name)
+    except OSError as e:
+        print(f"Warning: Could not write profile for {name}: {e}")
+        logging.warning(f"Could not write profile for {name}: {e}")
+
+
+def _prune(name):
+    """Deletes all but the newest _keep profiles (and their allocation reports) for name."""
+    profiles = sorted(glob.glob(os.path.join(glob.escape(_profiles_dir), f"{glob.escape(name)}-*.prof")))
+    for old_profile in profiles[:-_keep]:
+        for path in (old_profile, old_profile[:-len('.prof')] + '-alloc.txt'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
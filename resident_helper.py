@@ -0,0 +1,329 @@
+"""
+Resident helper process for the Holiday Reminder Tool.
+
+Starting the GUI (or a one-off render) means importing pandas and parsing the
+holiday file before anything appears, which takes seconds from the PyInstaller
+bundle. The resident helper does that once and stays running: it keeps the
+parsed holiday data (email_generator.HolidayDataCache) and the rendered email
+outputs in memory and answers render requests on a local socket
+(127.0.0.1:HELPER_PORT, [HELPER] section of config.ini).
+
+The client side of this module only uses the standard library, so email_app
+and the render command below can ask the helper without importing pandas
+themselves; when no helper is listening they do the work in-process as before.
+
+Protocol: one JSON object per line, one request per connection, e.g.
+    {"op": "render", "config": "C:\\tool\\config.ini", "format": "html", "etag": "..."}
+    -> {"ok": true, "etag": "...", "content": "<!DOCTYPE html>..."}   (or "not_modified": true)
+Formats: html, body, text, eml. The helper serves only the config file it was
+started with and re-reads it (and the holiday file) when they change.
+
+Usage:
+    python resident_helper.py serve [--config config.ini]       (or: HolidayReminderTool.exe --resident)
+    python resident_helper.py render [--format html] [--output preview.html]
+    python resident_helper.py status | stop
+"""
+
+import argparse
+import configparser
+import hashlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import date
+
+DEFAULT_HELPER_PORT = 8766
+CONNECT_TIMEOUT_SECONDS = 0.5    # localhost: a helper that is running answers the connect at once
+RESPONSE_TIMEOUT_SECONDS = 60    # the first render after a change parses the holiday file
+FORMATS = ('html', 'body', 'text', 'eml')
+
+
+# --- Client side (standard library only) ---
+def helper_port(config_file='config.ini'):
+    """HELPER_PORT from the [HELPER] section of config_file (read without the full settings parser)."""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    return config.getint('HELPER', 'PORT', fallback=DEFAULT_HELPER_PORT)
+
+
+def request(op, config_file='config.ini', port=None, **fields):
+    """
+    Sends one request to the resident helper and returns its reply (a dict), or None
+    when no helper is listening or the reply is unusable, so the caller works in-process.
+    """
+    message = dict(fields, op=op, config=_normalized_path(config_file))
+    port = port if port is not None else helper_port(config_file)
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=CONNECT_TIMEOUT_SECONDS) as connection:
+            connection.settimeout(RESPONSE_TIMEOUT_SECONDS)
+            connection.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            with connection.makefile('rb') as reader:
+                reply = json.loads(reader.readline() or b'null')
+    except (OSError, ValueError):
+        return None
+    return reply if isinstance(reply, dict) else None
+
+
+def render(output_format='html', config_file='config.ini', port=None, etag=None):
+    """
+    Asks the helper for one rendered output. Returns its reply (with 'content' and 'etag',
+    'not_modified' when etag still matches, or 'ok': false and 'error'), or None if no
+    helper serves config_file.
+    """
+    reply = request('render', config_file=config_file, port=port, format=output_format, etag=etag)
+    if reply is None or reply.get('wrong_config'):
+        return None
+    return reply
+
+
+def _normalized_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+# --- Helper side ---
+class ResidentRenderer:
+    """The warm state of the helper: settings, parsed holiday data and rendered outputs."""
+
+    def __init__(self, config_file='config.ini'):
+        # Imported here so that the client side of this module stays light
+        import data_sources
+        import digest_renderers
+        import email_generator
+        import tool_config
+
+        self._data_sources = data_sources
+        self._digest_renderers = digest_renderers
+        self._email_generator = email_generator
+        self._tool_config = tool_config
+        self.config_file = _normalized_path(config_file)
+        self._config_fingerprint = None
+        self.settings = None
+        self.holiday_cache = email_generator.HolidayDataCache()
+        self._outputs = {}     # format -> (etag, content) for the current digest
+        self._digest_df = None
+        self._digest_key = None
+        self._digest = None
+        self._lock = threading.RLock()
+        self.renders = 0
+        self.cache_hits = 0
+        self.started_at = time.time()
+        self._load_settings()
+
+    def _load_settings(self):
+        fingerprint = self._data_sources.file_fingerprint(self.config_file)
+        if fingerprint == self._config_fingerprint and self.settings is not None:
+            return
+        self.settings = self._tool_config.load_settings(self.config_file)
+        self._config_fingerprint = fingerprint
+        self._digest_df = None
+        logging.info(f"Resident helper loaded '{self.config_file}'.")
+
+    def render(self, output_format):
+        """(etag, content) of one output for the current data and settings."""
+        digest_renderers = self._digest_renderers
+        with self._lock:
+            self._load_settings()
+            settings = self.settings
+            start_date, end_date = self._email_generator.settings_horizon_range(settings)
+            holidays_df = self.holiday_cache.get(settings['HOLIDAYS_FILE'], start_date=start_date, end_date=end_date)
+            if holidays_df.empty:
+                raise ValueError("No holiday data found or file is empty.")
+            # The digest depends on the data (the cache returns the same DataFrame until the file
+            # changes), the settings and the day (months shown, working days)
+            digest_key = (self._config_fingerprint, date.today())
+            if holidays_df is not self._digest_df or digest_key != self._digest_key:
+                self._digest = self._email_generator.build_holiday_digest(
+                    holidays_df,
+                    company_name_footer=settings['COMPANY_NAME_FOOTER'],
+                    signature_name=settings['SIGNATURE_NAME'],
+                    working_days=settings.get('WORKING_DAYS_SECTION', False),
+                    business_days_ahead=settings.get('BUSINESS_DAYS_AHEAD', 10))
+                self._digest_df = holidays_df
+                self._digest_key = digest_key
+                self._outputs = {}
+            if output_format in self._outputs:
+                self.cache_hits += 1
+                return self._outputs[output_format]
+
+            if output_format == 'html':
+                content = digest_renderers.render_html(self._digest)
+            elif output_format == 'body':
+                content = digest_renderers.render_body_html(self._digest)
+            elif output_format == 'text':
+                content = digest_renderers.render_text(self._digest)
+            else:
+                content = digest_renderers.render_eml(
+                    self._digest, f"Upcoming Holiday Reminder! - {settings['COMPANY_NAME_SUBJECT_SUFFIX']}",
+                    body_html=self.render('body')[1])
+            etag = hashlib.sha256(content.encode('utf-8')).hexdigest()[:20]
+            self._outputs[output_format] = (etag, content)
+            self.renders += 1
+            return etag, content
+
+    def status(self):
+        return {'ok': True, 'pid': os.getpid(), 'config': self.config_file,
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'renders': self.renders, 'cache_hits': self.cache_hits}
+
+
+class ResidentHelper:
+    """Serves a ResidentRenderer on 127.0.0.1:port."""
+
+    def __init__(self, config_file='config.ini', port=None):
+        self.renderer = ResidentRenderer(config_file)
+        if port is None:
+            port = self.renderer.settings.get('HELPER_PORT', DEFAULT_HELPER_PORT)
+        self._server = _HelperServer(('127.0.0.1', port), _HelperHandler)
+        self._server.helper = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def handle(self, message):
+        """The reply to one request."""
+        op = message.get('op')
+        if message.get('config') != self.renderer.config_file:
+            return {'ok': False, 'wrong_config': True, 'error': f"This helper serves '{self.renderer.config_file}'."}
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'status':
+            return self.renderer.status()
+        if op == 'stop':
+            return {'ok': True, 'stopping': True}  # the handler stops the server once the reply is sent
+        if op == 'render':
+            output_format = message.get('format', 'html')
+            if output_format not in FORMATS:
+                return {'ok': False, 'error': f"Unknown format '{output_format}'. Must be one of: {', '.join(FORMATS)}."}
+            try:
+                etag, content = self.renderer.render(output_format)
+            except Exception as e:
+                logging.error(f"Resident helper could not render {output_format}: {e}")
+                return {'ok': False, 'error': str(e)}
+            if message.get('etag') == etag:
+                return {'ok': True, 'etag': etag, 'not_modified': True}
+            return {'ok': True, 'etag': etag, 'content': content}
+        return {'ok': False, 'error': f"Unknown op '{op}'."}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _HelperServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    request_queue_size = 64   # several app windows and scripts can connect at once
+    # Rebind right after a restart (connections in TIME_WAIT); on Windows this option would
+    # instead let a second process take over the port, and restarts do not need it there
+    allow_reuse_address = os.name != 'nt'
+
+
+class _HelperHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline() or b'null')
+        except ValueError:
+            message = None
+        if isinstance(message, dict):
+            reply = self.server.helper.handle(message)
+        else:
+            reply = {'ok': False, 'error': 'Expected one JSON object per line.'}
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+        if reply.get('stopping'):
+            threading.Thread(target=self.server.helper.stop, daemon=True).start()
+
+
+def serve(config_file='config.ini', port=None):
+    """Runs the resident helper in the foreground until Ctrl+C or a stop request. Returns an exit code."""
+    try:
+        helper = ResidentHelper(config_file, port=port)
+    except (configparser.Error, FileNotFoundError, ValueError, OSError) as e:
+        print(f"Error: Could not start the resident helper: {e}")
+        logging.error(f"Could not start the resident helper: {e}")
+        return 1
+    try:
+        helper.renderer.render('html')  # warm up: parse the holiday file and render once
+    except Exception as e:
+        print(f"Warning: first render failed ({e}); will retry on the first request.")
+    host, port = helper.address
+    print(f"Resident helper on {host}:{port} for '{helper.renderer.config_file}' (Ctrl+C to stop)", flush=True)
+    logging.info(f"Resident helper listening on {host}:{port}.")
+    try:
+        helper.serve_forever()
+    except KeyboardInterrupt:
+        helper.stop()
+    return 0
+
+
+def render_in_process(output_format, config_file='config.ini'):
+    """What the helper would return for one render, computed in this process (no helper running)."""
+    renderer = ResidentRenderer(config_file)
+    return renderer.render(output_format)[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the holiday data and email warm in a resident process.")
+    parser.add_argument('command', choices=('serve', 'render', 'status', 'stop'))
+    parser.add_argument('--config', default='config.ini', help="Config profile (default: config.ini)")
+    parser.add_argument('--port', type=int, help=f"Helper port (default: [HELPER] PORT in the config, {DEFAULT_HELPER_PORT})")
+    parser.add_argument('--format', choices=FORMATS, default='html', help="render: output to produce (default html)")
+    parser.add_argument('--output', help="render: file to write (default: standard output)")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        sys.exit(serve(args.config, port=args.port))
+
+    if args.command == 'render':
+        start = time.perf_counter()
+        reply = render(args.format, config_file=args.config, port=args.port)
+        if reply is not None and not reply.get('ok'):
+            print(f"Error: {reply.get('error')}", file=sys.stderr)
+            sys.exit(1)
+        source = 'resident helper'
+        if reply is not None:
+            content = reply['content']
+        else:
+            source = 'in-process (no resident helper running)'
+            try:
+                content = render_in_process(args.format, args.config)
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+        else:
+            sys.stdout.write(content)
+        print(f"Rendered {args.format} via {source} in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+        sys.exit(0)
+
+    reply = request(args.command, config_file=args.config, port=args.port)
+    if reply is None:
+        print("No resident helper is running.")
+        sys.exit(1)
+    if not reply.get('ok'):
+        print(f"Error: {reply.get('error')}")
+        sys.exit(1)
+    if args.command == 'status':
+        print(json.dumps(reply, indent=2))
+    else:
+        print("Resident helper stopped.")
@@ -0,0 +1,156 @@
+"""
+Per-run timing and counters for the Holiday Reminder Tool.
+
+A RunMetrics object collects how long each phase of a run took (config load,
+CSV parse, clean, validate, render, MIME build, SMTP connect/login/send) and
+counts events (emails sent, failures, retries...). At the end of the run it
+writes:
+  - <job>-<profile>.prom  : Prometheus text format (for the node_exporter textfile collector)
+  - last_run-<job>-<profile>.json and runs/<job>-<profile>-<timestamp>.json : a JSON run
+    summary with sorted keys, so two runs can be compared with a plain diff
+Only the newest KEEP_RUN_SUMMARIES files in runs/ are kept per job and profile.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+
+KEEP_RUN_SUMMARIES = 200
+
+
+class RunMetrics:
+    """Timers and counters for one run."""
+
+    def __init__(self, job='holiday_reminder', profile='config'):
+        self.job = job
+        self.profile = profile
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.phases = {}    # phase -> [calls, seconds]
+        self.counters = {}  # name -> value
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        """Times a block of code and adds it to the phase's total."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def observe(self, phase, seconds):
+        entry = self.phases.setdefault(phase, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def inc(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        return {
+            'job': self.job,
+            'profile': self.profile,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration_seconds': round(time.perf_counter() - self._start, 6),
+            'phases': {phase: {'calls': calls, 'seconds': round(seconds, 6)}
+                       for phase, (calls, seconds) in sorted(self.phases.items())},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def to_prometheus(self, summary=None):
+        summary = summary or self.summary()
+        prefix = _metric_name(self.job)
+        labels = f'profile="{_label_value(self.profile)}"'
+        lines = [
+            f"# HELP {prefix}_run_duration_seconds Wall-clock duration of the last run.",
+            f"# TYPE {prefix}_run_duration_seconds gauge",
+            f"{prefix}_run_duration_seconds{{{labels}}} {summary['duration_seconds']}",
+            f"# HELP {prefix}_last_run_timestamp_seconds Start time of the last run.",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds{{{labels}}} {self.started_at.timestamp():.3f}",
+            f"# HELP {prefix}_phase_seconds Time spent in each phase during the last run.",
+            f"# TYPE {prefix}_phase_seconds gauge",
+        ]
+        for phase, values in summary['phases'].items():
+            lines.append(f'{prefix}_phase_seconds{{{labels},phase="{_label_value(phase)}"}} {values["seconds"]}')
+        lines += [
+            f"# HELP {prefix}_phase_calls Number of times each phase ran during the last run.",
+            f"# TYPE {prefix}_phase_calls gauge",
+        ]
+        for phase, values in summary['phases'].items():
+            lines.append(f'{prefix}_phase_calls{{{labels},phase="{_label_value(phase)}"}} {values["calls"]}')
+        for name, value in summary['counters'].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines += [f"# TYPE {metric} gauge", f"{metric}{{{labels}}} {value}"]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, metrics_dir, keep_runs=KEEP_RUN_SUMMARIES):
+        """
+        Writes the Prometheus file and the JSON run summaries, keeping the newest keep_runs
+        summaries of this job and profile in runs/. Returns the summary.
+        """
+        import transports  # transports imports this module
+
+        summary = self.summary()
+        if not metrics_dir:
+            return summary
+        try:
+            run_key = f"{self.job}-{_file_safe(self.profile)}"
+            runs_dir = os.path.join(metrics_dir, 'runs')
+            os.makedirs(runs_dir, exist_ok=True)
+            transports.write_bytes_atomic(os.path.join(metrics_dir, f"{run_key}.prom"),
+                                          self.to_prometheus(summary).encode('utf-8'))
+            summary_json = (json.dumps(summary, indent=2, sort_keys=True) + '\n').encode('utf-8')
+            transports.write_bytes_atomic(os.path.join(metrics_dir, f"last_run-{run_key}.json"), summary_json)
+            # Microseconds and the pid keep runs started in the same second (or by other processes) apart
+            timestamp = self.started_at.strftime('%Y%m%d_%H%M%S_%f')
+            transports.write_bytes_atomic(os.path.join(runs_dir, f"{run_key}-{timestamp}-{os.getpid()}.json"),
+                                          summary_json)
+            _prune_runs(runs_dir, run_key, keep_runs)
+        except OSError as e:
+            print(f"Warning: Could not write run metrics to '{metrics_dir}': {e}")
+            logging.warning(f"Could not write run metrics to '{metrics_dir}': {e}")
+        return summary
+
+
+class NullMetrics:
+    """Drop-in stand-in for RunMetrics when nothing is being measured."""
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        yield
+
+    def observe(self, phase, seconds):
+        pass
+
+    def inc(self, name, value=1):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _file_safe(name):
+    return re.sub(r'[^a-zA-Z0-9_.-]', '_', name)
+
+
+def _prune_runs(runs_dir, run_key, keep):
+    """Deletes all but the newest keep run summaries of run_key (older names without _%f-pid included)."""
+    summary_name = re.compile(re.escape(run_key) + r'-\d{8}_\d{6}(_\d{6}-\d+)?\.json')
+    # Fixed-width timestamps: the name order is the run order
+    summaries = sorted(name for name in os.listdir(runs_dir) if summary_name.fullmatch(name))
+    for old_summary in summaries[:-max(1, keep)]:
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(runs_dir, old_summary))
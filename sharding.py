@@ -0,0 +1,311 @@
+"""
+Sharded delivery for large rosters.
+
+The roster is partitioned by a stable hash of each (lower-cased) email address,
+so every worker on every node computes the same partition without talking to
+the others. Workers claim shards of a run through a lease table in a shared
+SQLite file; a lease that is not renewed (because its worker died) expires and
+the shard can be claimed again by another worker. Every recipient a shard was
+sent to is recorded in the same file (shard_deliveries), so a retried or
+reclaimed shard only sends to the recipients that did not get the email yet.
+A shard whose run aborted or had failed sends is released for a retry (up to
+MAX_ATTEMPTS claims), after a backoff that grows with each attempt.
+
+Usage (run the same command on every node / in several processes):
+    python sharding.py --store shards.db --shard-count 8 [--run-id 2026-10-18] [--wait]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_LEASE_SECONDS = 300
+# A released shard waits this long times its attempt count before it can be claimed again
+DEFAULT_RETRY_BACKOFF_SECONDS = 60
+# A shard that failed this many times is left for an operator to inspect
+MAX_ATTEMPTS = 3
+
+
+def shard_for_email(email, shard_count):
+    """Returns the shard (0 .. shard_count-1) that owns an email address."""
+    digest = hashlib.sha1(email.strip().lower().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def in_shard(email, shard_id, shard_count):
+    return shard_for_email(email, shard_count) == shard_id
+
+
+def _recipient_key(email):
+    return email.strip().lower()
+
+
+class ShardLeaseStore:
+    """Shard leases for delivery runs, kept in a SQLite file shared by all workers."""
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 retry_backoff_seconds=DEFAULT_RETRY_BACKOFF_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shard_leases (
+                    run_id TEXT NOT NULL,
+                    shard_id INTEGER NOT NULL,
+                    owner TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (run_id, shard_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shard_deliveries (
+                    run_id TEXT NOT NULL,
+                    shard_id INTEGER NOT NULL,
+                    recipient TEXT NOT NULL,
+                    PRIMARY KEY (run_id, shard_id, recipient)
+                )
+            """)
+
+    def _connect(self):
+        # isolation_level=None: transactions are managed explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def claim(self, run_id, shard_count, owner):
+        """
+        Claims a pending shard, or one whose lease has expired, for owner.
+        Returns the shard id, or None when every shard is done or leased.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO shard_leases (run_id, shard_id) VALUES (?, ?)",
+                [(run_id, shard_id) for shard_id in range(shard_count)]
+            )
+            row = conn.execute(
+                "SELECT shard_id FROM shard_leases "
+                "WHERE run_id = ? AND shard_id < ? AND status != 'done' AND lease_expires < ? AND attempts < ? "
+                "ORDER BY attempts, shard_id LIMIT 1",
+                (run_id, shard_count, now, MAX_ATTEMPTS)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE shard_leases SET owner = ?, lease_expires = ?, status = 'leased', attempts = attempts + 1 "
+                "WHERE run_id = ? AND shard_id = ?",
+                (owner, now + self.lease_seconds, run_id, row[0])
+            )
+            conn.execute("COMMIT")
+            return row[0]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew(self, run_id, shard_id, owner):
+        """Extends owner's lease. Returns False if the lease was lost to another worker."""
+        with contextlib.closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE shard_leases SET lease_expires = ? "
+                "WHERE run_id = ? AND shard_id = ? AND owner = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, run_id, shard_id, owner)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, run_id, shard_id, owner):
+        """Marks owner's shard done. Returns False if the lease was lost to another worker."""
+        with contextlib.closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE shard_leases SET status = 'done' "
+                "WHERE run_id = ? AND shard_id = ? AND owner = ? AND status = 'leased'",
+                (run_id, shard_id, owner)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, run_id, shard_id, owner):
+        """
+        Gives a shard back after a failure so it can be retried, once retry_backoff_seconds
+        times its attempt count have passed (the lease_expires of a pending shard).
+        """
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE shard_leases SET lease_expires = ? + ? * attempts, owner = NULL, status = 'pending' "
+                "WHERE run_id = ? AND shard_id = ? AND owner = ? AND status = 'leased'",
+                (time.time(), self.retry_backoff_seconds, run_id, shard_id, owner)
+            )
+
+    def delivered_recipients(self, run_id, shard_id):
+        """The (lower-cased) addresses a shard of a run was already sent to."""
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT recipient FROM shard_deliveries WHERE run_id = ? AND shard_id = ?",
+                (run_id, shard_id)
+            ).fetchall()
+        return {recipient for (recipient,) in rows}
+
+    def record_delivered(self, run_id, shard_id, emails):
+        """Records that a shard of a run was sent to emails."""
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO shard_deliveries (run_id, shard_id, recipient) VALUES (?, ?, ?)",
+                [(run_id, shard_id, _recipient_key(email)) for email in emails]
+            )
+            conn.execute("COMMIT")
+
+    def unfinished_count(self, run_id, shard_count):
+        """Number of shards of a run that are not done and can still be (re)claimed."""
+        with contextlib.closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM shard_leases "
+                "WHERE run_id = ? AND shard_id < ? AND status != 'done' AND attempts < ?",
+                (run_id, shard_count, MAX_ATTEMPTS)
+            ).fetchone()[0]
+
+    def status(self, run_id):
+        """Returns {shard_id: (status, owner, attempts)} for a run."""
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT shard_id, status, owner, attempts FROM shard_leases WHERE run_id = ? ORDER BY shard_id",
+                (run_id,)
+            ).fetchall()
+        return {shard_id: (status, owner, attempts) for shard_id, status, owner, attempts in rows}
+
+
+class ShardProgress:
+    """
+    The recipients one shard of a run was already sent to. main_tool.run_reminders skips them
+    and records each new delivery, so a retried shard resends nothing that went out before.
+    """
+
+    def __init__(self, store, run_id, shard_id):
+        self.store = store
+        self.run_id = run_id
+        self.shard_id = shard_id
+        self.sent = store.delivered_recipients(run_id, shard_id)
+
+    def already_sent(self, email):
+        return _recipient_key(email) in self.sent
+
+    def record(self, emails):
+        emails = list(emails)
+        if emails:
+            self.store.record_delivered(self.run_id, self.shard_id, emails)
+            self.sent.update(_recipient_key(email) for email in emails)
+
+
+class _LeaseKeeper(threading.Thread):
+    """Renews a shard lease in the background while the shard is being delivered."""
+
+    def __init__(self, store, run_id, shard_id, owner):
+        super().__init__(daemon=True)
+        self.store = store
+        self.run_id = run_id
+        self.shard_id = shard_id
+        self.owner = owner
+        self._stopped = threading.Event()
+
+    def run(self):
+        interval = max(1.0, self.store.lease_seconds / 3)
+        while not self._stopped.wait(interval):
+            if not self.store.renew(self.run_id, self.shard_id, self.owner):
+                logging.warning(f"Lost lease on shard {self.shard_id} of run '{self.run_id}'.")
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def shard_problem(summary):
+    """Why a shard's run summary (see run_metrics.py) does not count as delivered, or None."""
+    counters = (summary or {}).get('counters', {})
+    if counters.get('run_aborted'):
+        return "the run was aborted"
+    failed = counters.get('emails_failed', 0) + counters.get('transport_write_failures', 0)
+    if failed:
+        return f"{failed} email(s) failed"
+    return None
+
+
+def run_worker(store, run_id, shard_count, deliver_shard, owner=None, wait=False, poll_seconds=10):
+    """
+    Claims and delivers shards until none are left.
+    deliver_shard(shard_id, shard_count, progress) does the actual sending for one shard and
+    returns the run summary; progress (ShardProgress) holds the recipients already sent to and
+    takes each new delivery. A shard is released for a retry (after the store's backoff) when
+    deliver_shard raises, or when the summary shows an aborted run or failed sends.
+    With wait=True the worker stays until every shard is done, so it can pick up
+    shards whose workers died. Returns the list of shard ids this worker completed.
+    """
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    completed = []
+    while True:
+        shard_id = store.claim(run_id, shard_count, owner)
+        if shard_id is None:
+            if wait and store.unfinished_count(run_id, shard_count):
+                time.sleep(poll_seconds)
+                continue
+            break
+        print(f"[{owner}] Claimed shard {shard_id}/{shard_count} of run '{run_id}'.")
+        logging.info(f"[{owner}] Claimed shard {shard_id}/{shard_count} of run '{run_id}'.")
+        keeper = _LeaseKeeper(store, run_id, shard_id, owner)
+        keeper.start()
+        try:
+            progress = ShardProgress(store, run_id, shard_id)
+            problem = shard_problem(deliver_shard(shard_id, shard_count, progress))
+        except Exception as e:
+            problem = e
+        keeper.stop()
+        if problem is not None:
+            store.release(run_id, shard_id, owner)
+            print(f"[{owner}] Shard {shard_id} failed and was released for a retry: {problem}")
+            logging.error(f"[{owner}] Shard {shard_id} of run '{run_id}' failed and was released for a retry "
+                          f"after {store.retry_backoff_seconds}s x attempts: {problem}")
+            continue
+        if not store.complete(run_id, shard_id, owner):
+            print(f"[{owner}] Lost the lease on shard {shard_id}; another worker delivers it.")
+            logging.warning(f"[{owner}] Lost the lease on shard {shard_id} of run '{run_id}' before it was "
+                            f"marked done; another worker delivers it.")
+            continue
+        completed.append(shard_id)
+    return completed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claim and deliver roster shards for a Holiday Reminder run.")
+    parser.add_argument('--store', required=True, help="Shared SQLite file used for shard leases")
+    parser.add_argument('--shard-count', type=int, required=True, help="Total number of shards in the run")
+    parser.add_argument('--run-id', default=datetime.now().strftime('%Y-%m-%d'),
+                        help="Identifier shared by all workers of one run (default: today's date)")
+    parser.add_argument('--lease-seconds', type=int, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument('--retry-backoff-seconds', type=int, default=DEFAULT_RETRY_BACKOFF_SECONDS,
+                        help="Wait before a failed shard is retried, multiplied by its attempt count")
+    parser.add_argument('--wait', action='store_true',
+                        help="Keep running until every shard is done, reclaiming shards of failed workers")
+    args = parser.parse_args()
+
+    import main_tool
+
+    lease_store = ShardLeaseStore(args.store, lease_seconds=args.lease_seconds,
+                                  retry_backoff_seconds=args.retry_backoff_seconds)
+    done = run_worker(
+        lease_store, args.run_id, args.shard_count,
+        lambda shard_id, shard_count, progress: main_tool.send_holiday_reminders(
+            shard_id=shard_id, shard_count=shard_count, shard_progress=progress),
+        wait=args.wait
+    )
+    print(f"Worker finished. Shards delivered by this worker: {done}")
@@ -0,0 +1,151 @@
+"""
+SMTP command pipelining (RFC 2920) for servers that advertise PIPELINING.
+
+smtplib waits for the reply to MAIL FROM, to every RCPT TO and to DATA before
+it sends the next command, so a message costs four round trips. With
+pipelining the envelope (MAIL, RCPT..., DATA) goes out in one write and the
+replies are read back in order afterwards: two round trips per message (the
+envelope, then the message text) however many recipients it has.
+Servers without PIPELINING get the same commands one at a time, as smtplib's
+sendmail sends them.
+
+Once the server has answered DATA with 354 the message text is handed over: if
+the connection drops from then on, the server may already have delivered it,
+so sendmail raises MessageMaybeDelivered rather than a plain
+SMTPServerDisconnected, and the message must not be sent again.
+"""
+
+import re
+import smtplib
+
+
+class MessageMaybeDelivered(smtplib.SMTPServerDisconnected):
+    """The connection dropped after the server accepted DATA, so the message may have been delivered."""
+
+
+def supports_pipelining(server):
+    """True if the (already greeted) server advertised PIPELINING."""
+    return server.has_extn('pipelining')
+
+
+def sendmail(server, from_addr, to_addrs, msg, mail_options=(), rcpt_options=(), pipelining=True):
+    """
+    smtplib.SMTP.sendmail with a pipelined envelope when the server supports it (and pipelining is True).
+    Same contract: returns {recipient: (code, reply)} for refused recipients and raises
+    SMTPSenderRefused, SMTPRecipientsRefused or SMTPDataError, after resetting the transaction.
+    A connection lost after the 354 reply to DATA raises MessageMaybeDelivered.
+    """
+    server.ehlo_or_helo_if_needed()
+    if isinstance(msg, str):
+        msg = _fix_eols(msg).encode('ascii')
+    if isinstance(to_addrs, str):
+        to_addrs = [to_addrs]
+    esmtp_options, rcpt_options = list(mail_options), list(rcpt_options)
+    if not server.does_esmtp:
+        esmtp_options, rcpt_options = [], []  # as smtplib: HELO servers get no ESMTP parameters
+    elif server.has_extn('size'):
+        esmtp_options.append(f"size={len(msg)}")
+
+    if pipelining and supports_pipelining(server):
+        refused = _pipelined_envelope(server, from_addr, to_addrs, esmtp_options, rcpt_options)
+    else:
+        refused = _envelope(server, from_addr, to_addrs, esmtp_options, rcpt_options)
+
+    try:
+        data = _quote_periods(msg)
+        if data[-2:] != smtplib.bCRLF:
+            data += smtplib.bCRLF
+        server.send(data + b'.' + smtplib.bCRLF)
+        code, reply = server.getreply()
+    except smtplib.SMTPServerDisconnected as e:
+        raise MessageMaybeDelivered(f"Connection lost after the message text was sent: {e}") from e
+    if code != 250:
+        _reset(server, code)
+        raise smtplib.SMTPDataError(code, reply)
+    return refused
+
+
+def _envelope(server, from_addr, to_addrs, esmtp_options, rcpt_options):
+    """MAIL, RCPT... and DATA, each after the reply to the one before. Returns the refused recipients."""
+    mail_code, mail_reply = server.mail(from_addr, esmtp_options)
+    if mail_code != 250:
+        _reset(server, mail_code)
+        raise smtplib.SMTPSenderRefused(mail_code, mail_reply, from_addr)
+    refused = {}
+    for address in to_addrs:
+        code, reply = server.rcpt(address, rcpt_options)
+        if code not in (250, 251):
+            refused[address] = (code, reply)
+            if code == 421:  # the server is closing the session
+                _reset(server, code)
+                raise smtplib.SMTPRecipientsRefused(refused)
+    if len(refused) == len(to_addrs):
+        _reset(server)
+        raise smtplib.SMTPRecipientsRefused(refused)
+    server.putcmd('data')
+    data_code, data_reply = server.getreply()
+    if data_code != 354:
+        _reset(server, data_code)
+        raise smtplib.SMTPDataError(data_code, data_reply)
+    return refused
+
+
+def _pipelined_envelope(server, from_addr, to_addrs, esmtp_options, rcpt_options):
+    """MAIL, RCPT... and DATA in one write, then their replies. Returns the refused recipients."""
+    # One write: MAIL FROM, a RCPT TO per recipient and DATA, which has to end the group
+    commands = [_command('mail', f"FROM:{smtplib.quoteaddr(from_addr)}", esmtp_options)]
+    commands += [_command('rcpt', f"TO:{smtplib.quoteaddr(address)}", rcpt_options) for address in to_addrs]
+    commands.append(_command('data'))
+    server.send(''.join(commands))
+
+    # The replies come back in the order the commands were sent
+    mail_code, mail_reply = server.getreply()
+    refused = {}
+    for address in to_addrs:
+        code, reply = server.getreply()
+        if code not in (250, 251):
+            refused[address] = (code, reply)
+    data_code, data_reply = server.getreply()
+
+    envelope_ok = mail_code == 250 and len(refused) < len(to_addrs)
+    if data_code == 354 and not envelope_ok:
+        # The server should have refused DATA: send an empty message (it has nobody to go to), then RSET
+        server.send(b'.' + smtplib.bCRLF)
+        empty_code, _ = server.getreply()
+        _reset(server, mail_code, empty_code)
+    elif not envelope_ok or data_code != 354:
+        _reset(server, mail_code, data_code)
+    if mail_code != 250:
+        raise smtplib.SMTPSenderRefused(mail_code, mail_reply, from_addr)
+    if not envelope_ok:
+        raise smtplib.SMTPRecipientsRefused(refused)
+    if data_code != 354:
+        raise smtplib.SMTPDataError(data_code, data_reply)
+    return refused
+
+
+def _command(verb, argument='', options=()):
+    line = f"{verb} {argument}" if argument else verb
+    if options:
+        line += ' ' + ' '.join(options)
+    return line + '\r\n'
+
+
+def _reset(server, *codes):
+    """Ends a failed transaction like smtplib does: RSET, or close after a 421 (service closing)."""
+    if 421 in codes:
+        server.close()
+        return
+    try:
+        server.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+# smtplib's own helpers for the message text (private there, so copied here)
+def _fix_eols(data):
+    return re.sub(r'(?:\r\n|\n|\r(?!\n))', smtplib.CRLF, data)
+
+
+def _quote_periods(bindata):
+    return re.sub(br'(?m)^\.', b'..', bindata)
@@ -0,0 +1,202 @@
+"""
+Pooled SMTP connections for the Holiday Reminder Tool.
+
+Logging in once per sender account and reusing the connection avoids a
+STARTTLS handshake and AUTH round trip for every recipient. Pools are
+shared per sender account, so several tenants that send through the same
+account hold a single set of connections.
+"""
+
+import contextlib
+import logging
+import smtplib
+import socket
+import threading
+import time
+
+import run_metrics
+
+
+class SMTPConnectionPool:
+    """A small pool of logged-in SMTP connections for one sender account."""
+
+    def __init__(self, smtp_server, smtp_port, sender_email, sender_password,
+                 max_idle_connections=2, max_idle_seconds=60, timeout=30, use_starttls=True,
+                 check_after_idle_seconds=1.0):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.max_idle_connections = max_idle_connections
+        self.max_idle_seconds = max_idle_seconds
+        self.timeout = timeout
+        self.use_starttls = use_starttls
+        # A connection idle for longer than this is checked with a NOOP (one round trip) before reuse
+        self.check_after_idle_seconds = check_after_idle_seconds
+        self._idle = []  # list of (server, last_used_timestamp)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.esmtp_features = None  # EHLO extensions of the server, known after the first connection
+
+    def _connect(self, metrics):
+        with metrics.timer('smtp_connect'):
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        # Without this, the tail of each message waits for the server's delayed ACK (~40 ms per send)
+        server.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            with metrics.timer('smtp_connect'):
+                if self.use_starttls:
+                    server.starttls()
+            with metrics.timer('smtp_login'):
+                if self.sender_password:
+                    server.login(self.sender_email, self.sender_password)
+            server.ehlo_or_helo_if_needed()
+        except Exception:
+            _close_quietly(server)
+            raise
+        self.connections_opened += 1
+        self.esmtp_features = dict(server.esmtp_features)
+        metrics.inc('smtp_connections_opened')
+        logging.info(f"Opened SMTP connection to {self.smtp_server}:{self.smtp_port} for {self.sender_email}")
+        return server
+
+    def _checkout(self, metrics):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            idle_seconds = time.monotonic() - last_used
+            if idle_seconds > self.max_idle_seconds:
+                _close_quietly(server)
+                continue
+            if idle_seconds <= self.check_after_idle_seconds:
+                return server  # just used; if it has dropped since, SMTPTransport retries on a fresh one
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            metrics.inc('smtp_stale_connections')
+            _close_quietly(server)
+        return self._connect(metrics)
+
+    def has_extension(self, name, metrics=None):
+        """True if the server advertises the ESMTP extension (e.g. '8bitmime'). Connects if not yet known."""
+        if self.esmtp_features is None:
+            with self.connection(metrics):
+                pass
+        return name.lower() in self.esmtp_features
+
+    @classmethod
+    def from_settings(cls, settings, **pool_options):
+        return cls(settings['SMTP_SERVER'], settings['SMTP_PORT'],
+                   settings['SENDER_EMAIL'], settings['SENDER_PASSWORD'],
+                   use_starttls=settings.get('SMTP_STARTTLS', True), **pool_options)
+
+    def _checkin(self, server):
+        with self._lock:
+            if len(self._idle) < self.max_idle_connections:
+                self._idle.append((server, time.monotonic()))
+                return
+        _close_quietly(server)
+
+    @contextlib.contextmanager
+    def connection(self, metrics=None):
+        """Yields a logged-in SMTP connection and returns it to the pool afterwards."""
+        server = self._checkout(metrics or run_metrics.NULL_METRICS)
+        try:
+            yield server
+        except smtplib.SMTPServerDisconnected:
+            _close_quietly(server)
+            raise
+        except smtplib.SMTPException as error:  # before OSError, which SMTPException derives from
+            # The session is still usable unless the error closed it; reset the transaction before reuse.
+            # Either way the caller gets the server's answer, not an error from the reset.
+            if server.sock is None:
+                raise
+            try:
+                server.rset()
+            except (smtplib.SMTPException, OSError):
+                _close_quietly(server)
+                raise error from None
+            self._checkin(server)
+            raise
+        except OSError:
+            _close_quietly(server)
+            raise
+        else:
+            self._checkin(server)
+
+    def close(self):
+        """Closes all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            _close_quietly(server)
+
+
+class SMTPPoolRegistry:
+    """Hands out one SMTPConnectionPool per (server, port, sender) account."""
+
+    def __init__(self, **pool_options):
+        self._pool_options = pool_options
+        self._pools = {}
+        self._runs = {}  # pool -> number of runs using it (see pool_for_run)
+        self._lock = threading.Lock()
+
+    def get_pool(self, smtp_server, smtp_port, sender_email, sender_password, use_starttls=True):
+        key = (smtp_server.lower(), int(smtp_port), sender_email.lower())
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None or pool.sender_password != sender_password or pool.use_starttls != use_starttls:
+                if pool is not None:
+                    pool.close()
+                pool = SMTPConnectionPool(smtp_server, smtp_port, sender_email, sender_password,
+                                          use_starttls=use_starttls, **self._pool_options)
+                self._pools[key] = pool
+            return pool
+
+    def get_pool_for_settings(self, settings):
+        return self.get_pool(settings['SMTP_SERVER'], settings['SMTP_PORT'],
+                             settings['SENDER_EMAIL'], settings['SENDER_PASSWORD'],
+                             use_starttls=settings.get('SMTP_STARTTLS', True))
+
+    @contextlib.contextmanager
+    def pool_for_run(self, settings):
+        """
+        Yields the pool for one run of settings' account. Its connections are closed when the
+        last run using it ends, so none stays open between scheduled runs.
+        """
+        pool = self.get_pool_for_settings(settings)
+        with self._lock:
+            self._runs[pool] = self._runs.get(pool, 0) + 1
+        try:
+            yield pool
+        finally:
+            with self._lock:
+                self._runs[pool] -= 1
+                last_run = self._runs[pool] == 0
+                if last_run:
+                    del self._runs[pool]
+            if last_run:
+                pool.close()
+
+    def __len__(self):
+        return len(self._pools)
+
+    def close_all(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+def _close_quietly(server):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
@@ -0,0 +1,464 @@
+"""
+Local SMTP stand-in server for load and fault-injection testing.
+
+Speaks enough ESMTP for smtplib: EHLO/HELO, STARTTLS (self-signed certificate),
+AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT. Messages are counted and
+discarded. Every command can be given an artificial latency, a probability of
+answering with a 4xx/5xx error, and a probability of dropping the connection.
+The pseudo-command EOM (end of message) drops the connection after a message
+was accepted, before the 250 reply, as a server that goes away mid-reply does.
+
+PIPELINING (RFC 2920) is advertised and enforced: replies to a group of
+pipelined commands go out in one write, and a client that sends ahead where
+it must wait for a reply (after EHLO, DATA, AUTH, STARTTLS, NOOP, QUIT, or at
+all when pipelining is off) gets "554 SMTP synchronization error" and is
+disconnected. round_trip adds a network-like delay each time the sink waits
+for the client, which is what pipelining saves. data_without_recipients makes
+the sink answer DATA with 354 even when no recipient was accepted (allowed by
+RFC 2920 for pipelining servers); the empty message is then refused with 554.
+
+Run in-process:
+    sink = SMTPSink(SinkOptions(latency={'DATA': 0.05}, failures={'RCPT': (0.01, 450)}))
+    sink.start(); ...; sink.stop(); print(sink.stats)
+or as a subprocess:
+    python smtp_sink.py --port 1025 --latency DATA=0.05 --fail RCPT=0.01:450 --disconnect DATA=0.001 --round-trip 0.1
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import socketserver
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+ERROR_MESSAGES = {
+    421: 'Service not available, closing transmission channel',
+    450: 'Requested mail action not taken: mailbox unavailable',
+    451: 'Requested action aborted: local error in processing',
+    452: 'Requested action not taken: insufficient system storage',
+    550: 'Requested action not taken: mailbox unavailable',
+    552: 'Requested mail action aborted: exceeded storage allocation',
+    554: 'Transaction failed',
+}
+
+# Commands after which a pipelining client must wait for the reply (RFC 2920, section 3.1)
+GROUP_END_COMMANDS = ('EHLO', 'HELO', 'DATA', 'AUTH', 'STARTTLS', 'NOOP', 'QUIT')
+
+
+class SinkOptions:
+    """Behaviour of the sink. Command names are upper-case SMTP verbs (EHLO, MAIL, RCPT, DATA...)."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=None, failures=None, disconnects=None,
+                 username=None, password=None, starttls=True, certfile=None, keyfile=None, seed=None,
+                 eight_bit_mime=True, pipelining=True, round_trip=0, data_without_recipients=False):
+        self.host = host
+        self.port = port
+        self.latency = latency or {}          # command -> seconds before replying
+        self.failures = failures or {}        # command -> (probability, reply code)
+        self.disconnects = disconnects or {}  # command -> probability of dropping the connection
+        self.username = username              # None = accept any credentials
+        self.password = password
+        self.starttls = starttls
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.seed = seed
+        self.eight_bit_mime = eight_bit_mime  # advertise 8BITMIME; without it, 8-bit message bodies are rejected
+        self.pipelining = pipelining          # advertise PIPELINING; without it, any command sent ahead is rejected
+        self.round_trip = round_trip          # seconds added each time replies are sent and the client must answer
+        self.data_without_recipients = data_without_recipients  # 354 to DATA with no accepted recipient
+
+
+class SinkStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.recipients = 0
+        self.bytes = 0
+        self.injected_errors = 0
+        self.injected_disconnects = 0
+        self.pipelined_commands = 0  # commands that arrived before the reply to the previous one was sent
+        self.sync_errors = 0
+        self.commands = {}
+
+    def add(self, name, value=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def count_command(self, command):
+        with self._lock:
+            self.commands[command] = self.commands.get(command, 0) + 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'connections': self.connections,
+                'messages': self.messages,
+                'recipients': self.recipients,
+                'bytes': self.bytes,
+                'injected_errors': self.injected_errors,
+                'injected_disconnects': self.injected_disconnects,
+                'pipelined_commands': self.pipelined_commands,
+                'sync_errors': self.sync_errors,
+                'commands': dict(self.commands),
+            }
+
+
+class _Disconnect(Exception):
+    pass
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sink = self.server.sink
+        self.tls_active = False
+        self.authenticated = False
+        self.replies_pending = False
+        self._reset_transaction()
+
+    def _reset_transaction(self):
+        self.mail_from = None
+        self.rcpt_to = []
+
+    def reply(self, line):
+        # Buffered until the sink next waits for input, so pipelined commands get their replies in one write
+        self.wfile.write(f"{line}\r\n".encode('utf-8'))
+        self.replies_pending = True
+
+    def flush_replies(self):
+        if not self.replies_pending:
+            return
+        if self.sink.options.round_trip:
+            time.sleep(self.sink.options.round_trip)
+        self.wfile.flush()
+        self.replies_pending = False
+
+    def input_pending(self):
+        """True if the client has already sent more than the sink has read."""
+        timeout = self.connection.gettimeout()
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            self.connection.settimeout(timeout)
+
+    def read_line(self):
+        if not self.input_pending():
+            self.flush_replies()
+        line = self.rfile.readline(65536)
+        if not line:
+            raise _Disconnect()
+        return line.decode('utf-8', errors='replace').rstrip('\r\n')
+
+    def handle(self):
+        self.sink.stats.add('connections')
+        try:
+            self.reply('220 localhost Holiday Tool SMTP sink ready')
+            while True:
+                line = self.read_line()
+                command, _, argument = line.partition(' ')
+                command = command.upper()
+                self.sink.stats.count_command(command)
+                if self.input_pending():
+                    self.sink.stats.add('pipelined_commands')
+                    if not self.sink.options.pipelining or command in GROUP_END_COMMANDS:
+                        self.sink.stats.add('sync_errors')
+                        self.reply('554 SMTP synchronization error')
+                        return
+                if self._inject_faults(command):
+                    continue
+                handler = getattr(self, f"smtp_{command}", None)
+                if handler is None:
+                    self.reply('502 Command not implemented')
+                    continue
+                if handler(argument) is False:
+                    return
+        except (_Disconnect, ConnectionError, ssl.SSLError, OSError):
+            return
+
+    def _inject_faults(self, command):
+        """Applies latency / disconnect / error injection. Returns True if the command was answered."""
+        options = self.sink.options
+        delay = options.latency.get(command, options.latency.get('*', 0))
+        if delay:
+            time.sleep(delay)
+        if self.sink.roll(options.disconnects.get(command, 0)):
+            self.sink.stats.add('injected_disconnects')
+            raise _Disconnect()
+        probability, code = options.failures.get(command, (0, None))
+        if self.sink.roll(probability):
+            self.sink.stats.add('injected_errors')
+            if command == 'DATA':
+                self._reset_transaction()
+            self.reply(f"{code} {ERROR_MESSAGES.get(code, 'Injected failure')}")
+            return True
+        return False
+
+    # --- SMTP commands ---
+    def smtp_EHLO(self, argument):
+        self._reset_transaction()
+        extensions = ['SIZE 52428800']
+        if self.sink.options.eight_bit_mime:
+            extensions.append('8BITMIME')
+        if self.sink.options.pipelining:
+            extensions.append('PIPELINING')
+        if self.sink.ssl_context is not None and not self.tls_active:
+            extensions.append('STARTTLS')
+        extensions.append('AUTH PLAIN LOGIN')
+        lines = ['localhost'] + extensions
+        self.reply('\r\n'.join([f"250-{line}" for line in lines[:-1]] + [f"250 {lines[-1]}"]))
+
+    def smtp_HELO(self, argument):
+        self._reset_transaction()
+        self.reply('250 localhost')
+
+    def smtp_STARTTLS(self, argument):
+        if self.sink.ssl_context is None or self.tls_active:
+            self.reply('454 TLS not available')
+            return
+        self.reply('220 Ready to start TLS')
+        self.flush_replies()
+        self.connection = self.sink.ssl_context.wrap_socket(self.connection, server_side=True)
+        self.rfile = self.connection.makefile('rb')
+        self.wfile = self.connection.makefile('wb')
+        self.tls_active = True
+        self.authenticated = False
+        self._reset_transaction()
+
+    def smtp_AUTH(self, argument):
+        mechanism, _, initial = argument.partition(' ')
+        mechanism = mechanism.upper()
+        if mechanism == 'PLAIN':
+            if not initial:
+                self.reply('334 ')
+                initial = self.read_line()
+            try:
+                _, username, password = base64.b64decode(initial).decode('utf-8').split('\0')
+            except ValueError:
+                self.reply('501 Malformed AUTH PLAIN response')
+                return
+        elif mechanism == 'LOGIN':
+            try:
+                if initial:
+                    username = base64.b64decode(initial).decode('utf-8')
+                else:
+                    self.reply('334 VXNlcm5hbWU6')
+                    username = base64.b64decode(self.read_line()).decode('utf-8')
+                self.reply('334 UGFzc3dvcmQ6')
+                password = base64.b64decode(self.read_line()).decode('utf-8')
+            except ValueError:
+                self.reply('501 Malformed AUTH LOGIN response')
+                return
+        else:
+            self.reply('504 Unrecognized authentication type')
+            return
+        if self.sink.check_credentials(username, password):
+            self.authenticated = True
+            self.reply('235 Authentication successful')
+        else:
+            self.reply('535 Authentication credentials invalid')
+
+    def smtp_MAIL(self, argument):
+        if self.sink.options.username is not None and not self.authenticated:
+            self.reply('530 Authentication required')
+            return
+        self._reset_transaction()
+        self.mail_from = argument
+        self.reply('250 OK')
+
+    def smtp_RCPT(self, argument):
+        if self.mail_from is None:
+            self.reply('503 Need MAIL command')
+            return
+        self.rcpt_to.append(argument)
+        self.reply('250 OK')
+
+    def smtp_DATA(self, argument):
+        if not self.rcpt_to and not (self.sink.options.data_without_recipients and self.mail_from is not None):
+            self.reply('503 Need RCPT command')
+            return
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+        self.flush_replies()
+        size = 0
+        eight_bit = False
+        while True:
+            line = self.rfile.readline(1024 * 1024)
+            if not line:
+                raise _Disconnect()
+            if line in (b'.\r\n', b'.\n'):
+                break
+            size += len(line)
+            eight_bit = eight_bit or not line.isascii()
+        if not self.rcpt_to:
+            self._reset_transaction()
+            self.reply('554 No valid recipients')
+            return
+        if eight_bit and not self.sink.options.eight_bit_mime:
+            self._reset_transaction()
+            self.reply('554 8-bit message content not accepted')
+            return
+        self.sink.stats.add('messages')
+        self.sink.stats.add('recipients', len(self.rcpt_to))
+        self.sink.stats.add('bytes', size)
+        self._reset_transaction()
+        if self.sink.roll(self.sink.options.disconnects.get('EOM', 0)):
+            self.sink.stats.add('injected_disconnects')
+            raise _Disconnect()
+        self.reply('250 OK: message accepted')
+
+    def smtp_RSET(self, argument):
+        self._reset_transaction()
+        self.reply('250 OK')
+
+    def smtp_NOOP(self, argument):
+        self.reply('250 OK')
+
+    def smtp_QUIT(self, argument):
+        self.reply('221 Bye')
+        return False
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """A local SMTP server running in a background thread."""
+
+    def __init__(self, options=None):
+        self.options = options or SinkOptions()
+        self.stats = SinkStats()
+        self._random = random.Random(self.options.seed)
+        self._random_lock = threading.Lock()
+        self._tempdir = None
+        self.ssl_context = self._make_ssl_context() if self.options.starttls else None
+        self._server = _ThreadingServer((self.options.host, self.options.port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def roll(self, probability):
+        if not probability:
+            return False
+        with self._random_lock:
+            return self._random.random() < probability
+
+    def check_credentials(self, username, password):
+        if self.options.username is None:
+            return True
+        return username == self.options.username and password == self.options.password
+
+    def _make_ssl_context(self):
+        certfile, keyfile = self.options.certfile, self.options.keyfile
+        if not certfile:
+            certfile, keyfile = self._generate_self_signed_certificate()
+            if not certfile:
+                return None
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        return context
+
+    def _generate_self_signed_certificate(self):
+        openssl = shutil.which('openssl')
+        if openssl is None:
+            print("Warning: openssl not found; the SMTP sink will not offer STARTTLS.")
+            logging.warning("openssl not found; the SMTP sink will not offer STARTTLS.")
+            return None, None
+        self._tempdir = tempfile.mkdtemp(prefix='smtp_sink_')
+        certfile = os.path.join(self._tempdir, 'cert.pem')
+        keyfile = os.path.join(self._tempdir, 'key.pem')
+        subprocess.run([openssl, 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=localhost', '-keyout', keyfile, '-out', certfile],
+                       check=True, capture_output=True)
+        return certfile, keyfile
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._tempdir:
+            shutil.rmtree(self._tempdir, ignore_errors=True)
+
+
+def parse_assignments(values, parse_value):
+    """{COMMAND: parse_value(setting)} from 'CMD=setting' options (--latency, --fail, --disconnect)."""
+    parsed = {}
+    for value in values or []:
+        command, _, setting = value.partition('=')
+        parsed[command.upper()] = parse_value(setting)
+    return parsed
+
+
+def parse_failure(setting):
+    """(probability, reply code) from 'PROB[:CODE]'; the code defaults to 451."""
+    probability, _, code = setting.partition(':')
+    return float(probability), int(code or 451)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink with latency and fault injection.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--latency', action='append', metavar='CMD=SECONDS',
+                        help="Delay before replying to a command, e.g. DATA=0.05 (use *=... for all commands)")
+    parser.add_argument('--fail', action='append', metavar='CMD=PROB[:CODE]',
+                        help="Answer a command with an error code with the given probability, e.g. RCPT=0.01:450")
+    parser.add_argument('--disconnect', action='append', metavar='CMD=PROB',
+                        help="Drop the connection on a command with the given probability, e.g. DATA=0.001 "
+                             "(EOM: after a message was accepted, before the reply)")
+    parser.add_argument('--username', help="Required AUTH username (default: accept any credentials)")
+    parser.add_argument('--password')
+    parser.add_argument('--no-starttls', action='store_true')
+    parser.add_argument('--no-8bitmime', action='store_true', help="Do not advertise 8BITMIME (and reject 8-bit bodies)")
+    parser.add_argument('--no-pipelining', action='store_true',
+                        help="Do not advertise PIPELINING (and reject clients that send commands ahead)")
+    parser.add_argument('--round-trip', type=float, default=0, metavar='SECONDS',
+                        help="Network round-trip delay added each time the sink waits for the client")
+    parser.add_argument('--data-without-recipients', action='store_true',
+                        help="Answer DATA with 354 even when every recipient was refused")
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    sink = SMTPSink(SinkOptions(
+        host=args.host, port=args.port,
+        latency=parse_assignments(args.latency, float),
+        failures=parse_assignments(args.fail, parse_failure),
+        disconnects=parse_assignments(args.disconnect, float),
+        username=args.username, password=args.password,
+        starttls=not args.no_starttls, certfile=args.certfile, keyfile=args.keyfile, seed=args.seed,
+        eight_bit_mime=not args.no_8bitmime, pipelining=not args.no_pipelining, round_trip=args.round_trip,
+        data_without_recipients=args.data_without_recipients,
+    ))
+    host, port = sink.address
+    print(f"SMTP sink listening on {host}:{port} (Ctrl+C to stop)", flush=True)
+    sink.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.stop()
+        print(f"Sink stats: {json.dumps(sink.stats.as_dict(), sort_keys=True)}", flush=True)
@@ -0,0 +1,52 @@
+"""
+Shared fixtures: the repo's modules are imported from the repo root, and the
+end-to-end tests run main_tool against the in-process SMTP sink (smtp_sink.py)
+with a throwaway config written by load_test.write_config.
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+import load_test  # noqa: E402
+import smtp_sink  # noqa: E402
+import tool_config  # noqa: E402
+from synthetic_data import generate_employees_csv  # noqa: E402
+
+
+@pytest.fixture
+def sink():
+    """Starts an SMTPSink; call it with SinkOptions keyword arguments. Stopped after the test."""
+    sinks = []
+
+    def start(**options):
+        options.setdefault('username', load_test.SINK_USERNAME)
+        options.setdefault('password', load_test.SINK_PASSWORD)
+        sinks.append(smtp_sink.SMTPSink(smtp_sink.SinkOptions(**options)).start())
+        return sinks[-1]
+
+    yield start
+    for started in sinks:
+        started.stop()
+
+
+@pytest.fixture
+def run_settings(tmp_path):
+    """Settings for a run against a sink: run_settings(sink, recipients=20, transport='smtp', **overrides)."""
+
+    def make(sink=None, recipients=20, transport='smtp', **overrides):
+        employees_file = generate_employees_csv(str(tmp_path / 'employees.csv'), recipients,
+                                                duplicate_rate=0.0, invalid_rate=0.0)
+        port = sink.address[1] if sink is not None else 0
+        config_path = load_test.write_config(str(tmp_path), port, os.path.join(REPO_DIR, 'holidays.csv'),
+                                             employees_file, personalize=False, transport=transport)
+        settings = tool_config.load_settings(config_path)
+        settings.update(overrides)
+        return settings
+
+    return make
@@ -0,0 +1,20 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import load_test
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_bulk_export_reads_only_the_given_profile(tmp_path):
+    (tmp_path / 'alt').mkdir()
+    shutil.copy(os.path.join(REPO_DIR, 'Employees.csv'), tmp_path / 'alt' / 'Employees.csv')
+    config_path = load_test.write_config(str(tmp_path / 'alt'), 0, os.path.join(REPO_DIR, 'holidays.csv'),
+                                         str(tmp_path / 'alt' / 'Employees.csv'), personalize=False)
+    # No config.ini in the working directory: only --config is read
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, 'bulk_export.py'), '--config', config_path,
+                             '--output', 'drafts'], cwd=tmp_path, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert any(name.endswith('.eml') for name in os.listdir(tmp_path / 'drafts'))
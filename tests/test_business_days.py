@@ -0,0 +1,37 @@
+import os
+from datetime import datetime
+
+import business_days
+import email_generator
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'holidays.csv')
+REFERENCE_DATE = datetime(2026, 10, 20)
+
+
+def _calculator(**range_args):
+    start_date = end_date = None
+    if range_args:
+        start_date, end_date = email_generator.horizon_range(reference_date=REFERENCE_DATE, **range_args)
+    return business_days.BusinessDayCalculator(
+        email_generator.get_holiday_data(HOLIDAYS_FILE, start_date=start_date, end_date=end_date))
+
+
+def test_lookahead_past_the_email_months_sees_the_holidays_there():
+    expected = _calculator().date_after(['Onshore', 'Pune'], 50, reference_date=REFERENCE_DATE)
+
+    loaded = _calculator(business_days_ahead=50).date_after(['Onshore', 'Pune'], 50, reference_date=REFERENCE_DATE)
+    assert loaded.equals(expected)
+    # Christmas is after the two months the email shows
+    email_months_only = _calculator(months=2).date_after(['Onshore', 'Pune'], 50, reference_date=REFERENCE_DATE)
+    assert not email_months_only.equals(expected)
+
+
+def test_shore_totals_leave_out_city_holidays():
+    calculator = _calculator()
+    october = datetime(2026, 10, 1), datetime(2026, 11, 1)
+    # Diwali and Mahanavami are holidays of some offshore cities only
+    offshore, pune, kochi = calculator.count(['Offshore', 'Pune', 'Kochi'], *october)
+    assert offshore == kochi == 21
+    assert pune == 18
+    # Thanksgiving is onshore only
+    assert calculator.count(['Onshore', 'Pune'], datetime(2026, 11, 1), datetime(2026, 12, 1)).tolist() == [20, 21]
@@ -0,0 +1,31 @@
+import json
+import os
+
+import calendar_feeds
+import email_generator
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_only_stale_feed_files_inside_the_folder_are_removed(tmp_path):
+    holidays_df = email_generator.get_holiday_data(os.path.join(REPO_DIR, 'holidays.csv'))
+    output_dir = tmp_path / 'feeds'
+    calendar_feeds.export_feeds(holidays_df, str(output_dir))
+
+    outside = tmp_path / 'outside.ics'
+    absolute = tmp_path / 'absolute.txt'
+    stale = output_dir / 'location-gone.ics'
+    for path in (outside, absolute, stale):
+        path.write_text('keep?')
+    manifest_path = output_dir / calendar_feeds.MANIFEST_FILE
+    manifest = json.loads(manifest_path.read_text())
+    for name in ('../outside.ics', str(absolute), 'location-gone.ics'):
+        manifest['feeds'][name] = {'hash': 'x'}
+    manifest_path.write_text(json.dumps(manifest))
+
+    summary = calendar_feeds.export_feeds(holidays_df, str(output_dir))
+
+    assert summary['removed'] == ['location-gone.ics']
+    assert not stale.exists()
+    assert outside.exists() and absolute.exists()
+    assert '../outside.ics' not in calendar_feeds.read_manifest(str(output_dir))
@@ -0,0 +1,27 @@
+import delivery_state
+import main_tool
+
+
+def _delta_settings(run_settings, tmp_path, server=None, transport='smtp'):
+    return run_settings(server, recipients=6, transport=transport, DELTA_MODE=True,
+                        DELTA_STATE_FILE=str(tmp_path / 'delivery_state.db'))
+
+
+def test_null_transport_records_no_delivery_state(tmp_path, sink, run_settings):
+    main_tool.run_reminders(_delta_settings(run_settings, tmp_path, transport='null'))
+    assert delivery_state.DeliveryStateStore(str(tmp_path / 'delivery_state.db')).summary() == {}
+
+    # So a real run afterwards still sends to everyone
+    server = sink()
+    summary = main_tool.run_reminders(_delta_settings(run_settings, tmp_path, server))
+    assert summary['counters']['emails_sent'] == server.stats.as_dict()['messages'] == 6
+
+
+def test_unchanged_digests_are_not_sent_twice(tmp_path, sink, run_settings):
+    server = sink()
+    settings = _delta_settings(run_settings, tmp_path, server)
+    main_tool.run_reminders(settings)
+    summary = main_tool.run_reminders(settings)
+
+    assert summary['counters']['emails_sent'] == 0
+    assert server.stats.as_dict()['messages'] == 6
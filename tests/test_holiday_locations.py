@@ -0,0 +1,67 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+import calendar_feeds
+import email_generator
+import holiday_service
+import parallel_render
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'holidays.csv')
+US_HOLIDAYS = {'Juneteenth', 'Thanksgiving', 'Memorial Day'}
+
+
+def _names(df):
+    return set(df['HolidayName'])
+
+
+def test_city_gets_the_all_rows_of_its_shore_only():
+    holidays_df = email_generator.get_holiday_data(HOLIDAYS_FILE)
+    pune = _names(email_generator.filter_holidays_for_location(holidays_df, 'Pune'))
+    assert {'Diwali (Bali Pratipada)', 'Ramzan (Id-ul-Fitr)', 'New Year', 'Christmas'} <= pune
+    assert not pune & US_HOLIDAYS
+    # Onshore keeps its own holidays; a city no row names keeps every 'All ...' row
+    assert US_HOLIDAYS <= _names(email_generator.filter_holidays_for_location(holidays_df, 'Onshore'))
+    assert US_HOLIDAYS <= _names(email_generator.filter_holidays_for_location(holidays_df, 'Boston'))
+
+
+def test_shore_of_a_city_comes_from_the_whole_file_when_a_date_range_is_read():
+    november_december = email_generator.get_holiday_data(HOLIDAYS_FILE, start_date=datetime(2026, 11, 1),
+                                                         end_date=datetime(2027, 1, 1))
+    assert _names(email_generator.filter_holidays_for_location(november_december, 'Pune')) == {'Christmas'}
+
+
+def test_query_service_and_feeds_use_the_same_rule(tmp_path):
+    holidays_df = email_generator.get_holiday_data(HOLIDAYS_FILE)
+    index = holiday_service.HolidayIndex(holidays_df)
+    assert not {index.entries[position]['name'] for position in index.between('Pune')} & US_HOLIDAYS
+
+    calendar_feeds.export_feeds(holidays_df, str(tmp_path))
+    pune_feed = (tmp_path / 'location-pune.ics').read_text(encoding='utf-8')
+    assert 'Diwali' in pune_feed and 'Juneteenth' not in pune_feed
+
+
+def test_in_process_renders_of_interleaved_runs_keep_their_own_settings():
+    holidays_df = email_generator.get_holiday_data(HOLIDAYS_FILE)
+    variants = [('Asha', 'Pune'), ('Ben', 'Chennai')]
+    first = parallel_render.render_variants(holidays_df, variants, company_name_footer='First Tenant', max_workers=1)
+    second = parallel_render.render_variants(holidays_df, variants, company_name_footer='Second Tenant',
+                                             max_workers=1)
+    next(first)
+    next(second)
+    _, html = next(first)
+    assert 'First Tenant' in html and 'Second Tenant' not in html
+
+
+def test_cities_are_matched_by_whole_name():
+    holidays_df = pd.DataFrame({
+        'Date': pd.to_datetime(['2026-01-26', '2026-05-01', '2026-07-04', '2026-12-25']),
+        'HolidayName': ['Navi Mumbai Day', 'Mumbai Day', 'Independence Day', 'Christmas'],
+        'Shore': ['Offshore', 'Onshore', 'Onshore', 'Offshore'],
+        'Locations': ['Pune, Navi Mumbai', 'Mumbai', 'All Near & Onshore locations', 'All Offshore locations'],
+    })
+    assert _names(email_generator.filter_holidays_for_location(holidays_df, 'Mumbai')) == {
+        'Mumbai Day', 'Independence Day'}
+    assert _names(email_generator.filter_holidays_for_location(holidays_df, 'Navi Mumbai')) == {
+        'Navi Mumbai Day', 'Christmas'}
@@ -0,0 +1,33 @@
+import os
+import shutil
+
+import email_generator
+import holiday_service
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_a_broken_file_is_read_once_until_it_changes_again(tmp_path, monkeypatch):
+    holidays_file = str(tmp_path / 'holidays.csv')
+    shutil.copy(os.path.join(REPO_DIR, 'holidays.csv'), holidays_file)
+    service = holiday_service.HolidayQueryService(holidays_file, port=0).start()
+    good_index = service.index
+    monkeypatch.setattr(holiday_service, 'RELOAD_CHECK_SECONDS', 0)
+    reads = []
+    get_holiday_data = email_generator.get_holiday_data
+    monkeypatch.setattr(email_generator, 'get_holiday_data', lambda *args, **kwargs: reads.append(args) or
+                        get_holiday_data(*args, **kwargs))
+    try:
+        with open(holidays_file, 'w', encoding='utf-8') as f:
+            f.write("not,a,holiday,file\n")
+        for _ in range(3):
+            assert service.current_index() is good_index
+        assert len(reads) == 1
+
+        shutil.copy(os.path.join(REPO_DIR, 'holidays.csv'), holidays_file)
+        with open(holidays_file, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        assert service.current_index() is not good_index
+        assert len(reads) == 2
+    finally:
+        service.stop()
@@ -0,0 +1,51 @@
+import os
+
+import email_generator
+import load_test
+import multi_tenant
+from smtp_pool import SMTPPoolRegistry
+from synthetic_data import generate_employees_csv
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOLIDAYS_FILE = os.path.join(REPO_DIR, 'holidays.csv')
+
+
+def _write_profile(profiles_dir, name, port, employees_file):
+    work_dir = profiles_dir / name
+    work_dir.mkdir()
+    config_path = load_test.write_config(str(work_dir), port, HOLIDAYS_FILE, employees_file, personalize=False)
+    profile_path = profiles_dir / f"{name}.ini"
+    os.replace(config_path, profile_path)
+    return profile_path
+
+
+def test_invalid_profiles_are_skipped_at_load_time(tmp_path):
+    employees_file = generate_employees_csv(str(tmp_path / 'employees.csv'), 5, duplicate_rate=0.0, invalid_rate=0.0)
+    profiles_dir = tmp_path / 'profiles'
+    profiles_dir.mkdir()
+    _write_profile(profiles_dir, 'good', 2525, employees_file)
+    _write_profile(profiles_dir, 'bad_port', 0, employees_file)
+    _write_profile(profiles_dir, 'no_roster', 2525, str(tmp_path / 'missing.csv'))
+
+    profiles = multi_tenant.load_profiles(str(profiles_dir))
+
+    assert [os.path.basename(settings['CONFIG_FILE']) for settings in profiles] == ['good.ini']
+
+
+def test_tenant_run_closes_its_pooled_connections(tmp_path, sink, run_settings):
+    settings = run_settings(sink(), recipients=5)
+    registry = SMTPPoolRegistry()
+
+    multi_tenant.run_tenant(settings, email_generator.HolidayDataCache(), registry)
+
+    pool = registry.get_pool_for_settings(settings)
+    assert pool.connections_opened == 1
+    assert pool._idle == []
+
+
+def test_holiday_cache_keeps_only_the_newest_date_ranges():
+    cache = email_generator.HolidayDataCache(max_entries=2)
+    for month in (1, 2, 3):
+        cache.get(HOLIDAYS_FILE, start_date=f"2026-{month:02d}-01", end_date=f"2026-{month + 1:02d}-28")
+
+    assert len(cache) == 2
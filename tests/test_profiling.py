@@ -0,0 +1,36 @@
+import glob
+import threading
+
+import profiling
+
+
+def test_a_call_overlapping_a_profiled_call_runs_unprofiled(tmp_path):
+    inside = threading.Event()
+    release = threading.Event()
+    results = []
+
+    @profiling.profiled('slow')
+    def slow():
+        inside.set()
+        release.wait(5)
+        return 'slow'
+
+    @profiling.profiled('fast')
+    def fast():
+        return 'fast'
+
+    profiling.enable(str(tmp_path), keep=5)
+    try:
+        worker = threading.Thread(target=lambda: results.append(slow()))
+        worker.start()
+        assert inside.wait(5)
+        assert fast() == 'fast'
+        release.set()
+        worker.join(5)
+        assert fast() == 'fast'
+    finally:
+        profiling.disable()
+
+    assert results == ['slow']
+    assert len(glob.glob(str(tmp_path / 'slow-*.prof'))) == 1
+    assert len(glob.glob(str(tmp_path / 'fast-*.prof'))) == 1
@@ -0,0 +1,19 @@
+import os
+
+import run_metrics
+
+
+def test_run_summaries_of_the_same_second_are_kept_apart_and_pruned(tmp_path):
+    metrics_dir = str(tmp_path)
+    second = run_metrics.RunMetrics(profile='p').started_at.replace(microsecond=0)
+    for microsecond in range(4):
+        metrics = run_metrics.RunMetrics(profile='p')
+        metrics.started_at = second.replace(microsecond=microsecond)
+        metrics.write(metrics_dir, keep_runs=3)
+    other = run_metrics.RunMetrics(profile='p-2')
+    other.write(metrics_dir, keep_runs=3)
+
+    runs = sorted(os.listdir(os.path.join(metrics_dir, 'runs')))
+    assert len([name for name in runs if name.startswith('holiday_reminder-p-2-')]) == 1
+    assert len([name for name in runs if not name.startswith('holiday_reminder-p-2-')]) == 3
+    assert not [name for name in os.listdir(metrics_dir) if name.startswith('.tmp-')]
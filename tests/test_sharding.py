@@ -0,0 +1,111 @@
+import sqlite3
+
+import main_tool
+import sharding
+
+
+def _store(tmp_path, retry_backoff_seconds=0):
+    return sharding.ShardLeaseStore(str(tmp_path / 'shards.db'), retry_backoff_seconds=retry_backoff_seconds)
+
+
+def _deliver_with(settings):
+    return lambda shard_id, shard_count, progress: main_tool.run_reminders(
+        settings, shard_id=shard_id, shard_count=shard_count, shard_progress=progress)
+
+
+def _summary(**counters):
+    return {'counters': counters}
+
+
+def test_shard_with_failed_sends_is_released_and_retried(tmp_path):
+    store = _store(tmp_path)
+    calls = []
+
+    def deliver(shard_id, shard_count, progress):
+        calls.append(shard_id)
+        return _summary(emails_sent=2, emails_failed=1 if len(calls) == 1 else 0)
+
+    assert sharding.run_worker(store, 'run', 1, deliver, owner='w1') == [0]
+    assert calls == [0, 0]
+    assert store.status('run')[0][0] == 'done'
+
+
+def test_aborted_shard_is_not_completed(tmp_path):
+    store = _store(tmp_path)
+    completed = sharding.run_worker(store, 'run', 1, lambda *args: _summary(emails_failed=0, run_aborted=1),
+                                    owner='w1')
+    assert completed == []
+    status, owner, attempts = store.status('run')[0]
+    assert (status, owner, attempts) == ('pending', None, sharding.MAX_ATTEMPTS)
+
+
+def test_lost_lease_is_not_reported_as_completed(tmp_path):
+    store = _store(tmp_path)
+
+    def deliver(shard_id, shard_count, progress):
+        # Another worker took the shard over while this one was sending
+        with sqlite3.connect(store.db_path) as conn:
+            conn.execute("UPDATE shard_leases SET owner = 'w2' WHERE shard_id = ?", (shard_id,))
+        return _summary(emails_sent=1, emails_failed=0)
+
+    assert sharding.run_worker(store, 'run', 1, deliver, owner='w1') == []
+    assert store.status('run')[0][:2] == ('leased', 'w2')
+
+
+def test_shard_is_retried_when_the_smtp_server_refuses_every_recipient(tmp_path, sink, run_settings):
+    refusing = sink(failures={'RCPT': (1.0, 550)})
+    settings = run_settings(refusing, recipients=12)
+    store = _store(tmp_path)
+
+    completed = sharding.run_worker(store, 'run', 2, _deliver_with(settings), owner='w1')
+
+    assert completed == []
+    assert refusing.stats.as_dict()['messages'] == 0
+    assert all(status == 'pending' and attempts == sharding.MAX_ATTEMPTS
+               for status, owner, attempts in store.status('run').values())
+
+
+def test_shards_against_a_working_server_deliver_every_recipient_once(tmp_path, sink, run_settings):
+    accepting = sink()
+    settings = run_settings(accepting, recipients=12)
+    store = _store(tmp_path)
+
+    completed = sharding.run_worker(store, 'run', 3, _deliver_with(settings), owner='w1')
+
+    assert sorted(completed) == [0, 1, 2]
+    assert accepting.stats.as_dict()['messages'] == 12
+
+
+def test_released_shard_waits_for_its_backoff(tmp_path):
+    store = _store(tmp_path, retry_backoff_seconds=60)
+    calls = []
+
+    def deliver(shard_id, shard_count, progress):
+        calls.append(shard_id)
+        return _summary(emails_failed=1)
+
+    assert sharding.run_worker(store, 'run', 1, deliver, owner='w1') == []
+    assert calls == [0]
+    assert store.status('run')[0] == ('pending', None, 1)
+    assert store.claim('run', 1, 'w2') is None
+
+
+def test_retried_shard_only_sends_to_the_recipients_that_failed(tmp_path, sink, run_settings):
+    flaky = sink(failures={'RCPT': (0.5, 450)}, seed=7)
+    settings = run_settings(flaky, recipients=12)
+    store = _store(tmp_path)
+    deliver = _deliver_with(settings)
+    summaries = []
+
+    def deliver_then_recover(shard_id, shard_count, progress):
+        summaries.append(deliver(shard_id, shard_count, progress))
+        flaky.options.failures = {}
+        return summaries[-1]
+
+    assert sharding.run_worker(store, 'run', 1, deliver_then_recover, owner='w1') == [0]
+    first, retry = summaries
+    assert first['counters']['emails_failed'] > 0
+    assert retry['counters']['recipients_already_sent'] == first['counters']['emails_sent']
+    assert retry['counters']['emails_sent'] == first['counters']['emails_failed']
+    assert flaky.stats.as_dict()['messages'] == 12
+    assert len(store.delivered_recipients('run', 0)) == 12
@@ -0,0 +1,85 @@
+import smtplib
+
+import pytest
+
+import load_test
+import main_tool
+import run_metrics
+import smtp_pipelining
+import smtp_pool
+import transports
+
+MESSAGE = "Subject: Holidays\r\n\r\n.A line starting with a period\r\nBye\r\n"
+
+
+def _transport(sink, metrics):
+    host, port = sink.address
+    pool = smtp_pool.SMTPConnectionPool(host, port, load_test.SINK_USERNAME, load_test.SINK_PASSWORD)
+    return transports.SMTPTransport(pool, metrics=metrics)
+
+
+def test_refused_recipient_after_354_resets_and_keeps_the_connection(sink):
+    server = sink(pipelining=True, data_without_recipients=True, failures={'RCPT': (1.0, 550)})
+    metrics = run_metrics.RunMetrics()
+    transport = _transport(server, metrics)
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        transport.send(load_test.SINK_USERNAME, 'refused@example.com', MESSAGE)
+    # Not a dropped connection: no retry, and the next message goes out on the same session
+    assert metrics.counters.get('smtp_retries', 0) == 0
+    server.options.failures = {}
+    transport.send(load_test.SINK_USERNAME, 'accepted@example.com', MESSAGE)
+
+    stats = server.stats.as_dict()
+    assert stats['connections'] == 1
+    assert stats['messages'] == 1
+    assert stats['commands']['RSET'] >= 1
+    assert stats['sync_errors'] == 0
+
+
+def test_run_against_a_pipelining_sink(sink, run_settings):
+    server = sink(pipelining=True, round_trip=0.001)
+    summary = main_tool.run_reminders(run_settings(server, recipients=15))
+
+    counters = summary['counters']
+    stats = server.stats.as_dict()
+    assert counters['emails_sent'] == counters['smtp_pipelined_sends'] == stats['messages'] == 15
+    assert stats['pipelined_commands'] >= 15 * 2  # RCPT and DATA sent ahead of their replies
+    assert stats['sync_errors'] == 0
+
+
+def test_run_against_a_sink_without_pipelining(sink, run_settings):
+    server = sink(pipelining=False)
+    summary = main_tool.run_reminders(run_settings(server, recipients=5))
+
+    assert summary['counters']['emails_sent'] == server.stats.as_dict()['messages'] == 5
+    assert server.stats.as_dict()['sync_errors'] == 0
+
+
+def test_message_text_helpers_match_smtplib():
+    assert smtp_pipelining._fix_eols("a\nb\r\nc\rd") == "a\r\nb\r\nc\r\nd"
+    assert smtp_pipelining._quote_periods(b".a\r\nb.\r\n..c") == b"..a\r\nb.\r\n...c"
+
+
+@pytest.mark.parametrize('pipelining', [True, False])
+def test_drop_before_data_is_accepted_is_retried(sink, pipelining):
+    # seed 1: the first DATA is dropped, the second is answered
+    server = sink(pipelining=pipelining, disconnects={'DATA': 0.5}, seed=1)
+    metrics = run_metrics.RunMetrics()
+
+    _transport(server, metrics).send(load_test.SINK_USERNAME, 'retried@example.com', MESSAGE)
+
+    assert metrics.counters['smtp_retries'] == 1
+    assert server.stats.as_dict()['messages'] == 1
+
+
+@pytest.mark.parametrize('pipelining', [True, False])
+def test_drop_after_the_message_was_handed_over_is_not_retried(sink, pipelining):
+    server = sink(pipelining=pipelining, disconnects={'EOM': 1.0})
+    metrics = run_metrics.RunMetrics()
+
+    with pytest.raises(smtp_pipelining.MessageMaybeDelivered):
+        _transport(server, metrics).send(load_test.SINK_USERNAME, 'once@example.com', MESSAGE)
+
+    assert metrics.counters.get('smtp_retries', 0) == 0
+    assert server.stats.as_dict()['messages'] == 1
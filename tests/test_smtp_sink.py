@@ -0,0 +1,75 @@
+import json
+import os
+import smtplib
+import socket
+import subprocess
+import sys
+
+import pytest
+
+import smtp_sink
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGE = "Subject: Test\r\n\r\nHello\r\n"
+
+
+def test_parse_options():
+    assert smtp_sink.parse_assignments(['data=0.05', 'RCPT=0'], float) == {'DATA': 0.05, 'RCPT': 0.0}
+    assert smtp_sink.parse_assignments(['RCPT=0.01:450', 'DATA=0.5'], smtp_sink.parse_failure) == {
+        'RCPT': (0.01, 450), 'DATA': (0.5, 451)}
+    assert smtp_sink.parse_assignments(None, float) == {}
+
+
+def test_accepts_and_counts_a_message(sink):
+    server = sink(starttls=False)
+    with smtplib.SMTP(*server.address) as client:
+        client.login(server.options.username, server.options.password)
+        client.sendmail('from@example.com', ['a@example.com', 'b@example.com'], MESSAGE)
+    stats = server.stats.as_dict()
+    assert (stats['messages'], stats['recipients']) == (1, 2)
+
+
+def test_injected_errors_and_disconnects(sink):
+    server = sink(starttls=False, username=None, failures={'RCPT': (1.0, 450)}, disconnects={'DATA': 1.0})
+    with smtplib.SMTP(*server.address) as client:
+        with pytest.raises(smtplib.SMTPRecipientsRefused) as refused:
+            client.sendmail('from@example.com', ['a@example.com'], MESSAGE)
+        assert refused.value.recipients['a@example.com'][0] == 450
+    server.options.failures = {}
+    client = smtplib.SMTP(*server.address)
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        client.sendmail('from@example.com', ['a@example.com'], MESSAGE)
+    stats = server.stats.as_dict()
+    assert (stats['injected_errors'], stats['injected_disconnects'], stats['messages']) == (1, 1, 0)
+
+
+@pytest.mark.parametrize('pipelining, commands', [
+    (False, b"MAIL FROM:<a@example.com>\r\nRCPT TO:<b@example.com>\r\n"),  # sending ahead at all
+    (True, b"NOOP\r\nMAIL FROM:<a@example.com>\r\n"),                       # past a command that ends a group
+])
+def test_sending_ahead_out_of_turn_is_a_synchronization_error(sink, pipelining, commands):
+    server = sink(starttls=False, username=None, pipelining=pipelining)
+    with socket.create_connection(server.address, timeout=5) as connection:
+        reader = connection.makefile('rb')
+        reader.readline()  # greeting
+        connection.sendall(b"HELO client\r\n")
+        reader.readline()
+        connection.sendall(commands)
+        assert reader.readline().startswith(b"554 SMTP synchronization error")
+    assert server.stats.as_dict()['sync_errors'] == 1
+
+
+def test_load_test_against_the_sink_with_pipelining_enforced(tmp_path):
+    report_path = tmp_path / 'report.json'
+    subprocess.run([sys.executable, 'load_test.py', '--recipients', '40', '--fail', 'RCPT=0.1:550',
+                    '--seed', '7', '--output', str(report_path)],
+                   cwd=REPO_DIR, check=True, capture_output=True, timeout=300)
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+
+    outcome = report['outcome']
+    assert outcome['consistent']
+    assert outcome['sent'] + outcome['failed'] == 40
+    assert outcome['failed'] == report['sink_stats']['injected_errors'] > 0
+    assert outcome['retries'] == 0 and outcome['smtp_connections_opened'] == 1
+    assert report['sink_stats']['sync_errors'] == 0
+    assert report['sink_stats']['pipelined_commands'] > 0
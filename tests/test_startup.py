@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_modules_import_without_a_config_ini(tmp_path):
+    # Importing reads no ./config.ini, sets up no log and does not exit
+    result = subprocess.run([sys.executable, '-c', 'import main_tool, multi_tenant, bulk_export, sharding'],
+                            cwd=tmp_path, env=dict(os.environ, PYTHONPATH=REPO_DIR), capture_output=True,
+                            text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert not (tmp_path / 'holiday_tool.log').exists()
@@ -0,0 +1,30 @@
+import os
+import shutil
+
+import pytest
+
+import tool_config
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_shipped_config_passes_validation(monkeypatch):
+    # File names are case-sensitive on Linux: config.ini must name the files as shipped
+    monkeypatch.chdir(REPO_DIR)
+    tool_config.validate_settings(tool_config.load_settings('config.ini'))
+
+
+def test_first_load_is_validated_like_a_reload(tmp_path, monkeypatch):
+    shutil.copy(f"{REPO_DIR}/config.ini", tmp_path / 'config.ini')
+    shutil.copy(f"{REPO_DIR}/holidays.csv", tmp_path / 'holidays.csv')
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(ValueError, match='EMPLOYEES_FILE'):
+        tool_config.ConfigManager('config.ini')
+
+    shutil.copy(f"{REPO_DIR}/Employees.csv", tmp_path / 'Employees.csv')
+    manager = tool_config.ConfigManager('config.ini')
+    assert manager.current.version == 1
+    (tmp_path / 'Employees.csv').unlink()
+    assert manager.reload() is None  # rejected, version 1 stays in use
+    assert manager.current.version == 1
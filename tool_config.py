@@ -0,0 +1,279 @@
+"""
+Configuration loading for the Holiday Reminder Tool.
+
+Parses a config.ini profile into a plain settings dictionary, so that the
+same parsing rules are shared by main_tool (one profile) and the
+multi-tenant scheduler (a directory of profiles).
+
+Long-running processes hold their configuration in a ConfigManager instead:
+an immutable, versioned ConfigSnapshot that is reloaded when the file changes
+(or on SIGHUP), validated first, and swapped in between runs.
+"""
+
+import configparser
+import logging
+import os
+import signal
+import threading
+import time
+import types
+from collections.abc import Mapping
+
+import data_sources
+import transports
+
+# Default SMTP endpoints per supported service provider
+SMTP_PROVIDERS = {
+    'gmail': ('smtp.gmail.com', 587),
+    'outlook': ('smtp.office365.com', 587),
+}
+
+# Default OUTPUT_PATH per file transport ([DELIVERY] section)
+DEFAULT_OUTPUT_PATHS = {
+    'spool': 'outbox',
+    'maildir': 'Maildir',
+    'mbox': 'outbox.mbox',
+}
+
+# Default schedule (every other Monday at 9:00 AM), overridable per profile in [SCHEDULE]
+DEFAULT_SCHEDULE = {
+    'day_of_week': 'mon',
+    'hour': '9',
+    'minute': '0',
+    'week': '*/2',
+}
+
+
+def load_settings(config_file_path='config.ini'):
+    """
+    Reads a config.ini profile and returns its settings as a dictionary.
+    Raises FileNotFoundError, ValueError or configparser.Error on invalid configuration.
+    """
+    start = time.perf_counter()
+    if not os.path.exists(config_file_path):
+        logging.error(f"Configuration file '{config_file_path}' not found. Please create it.")
+        raise FileNotFoundError(f"Configuration file '{config_file_path}' not found. Please create it as described in Step 1.")
+
+    config = configparser.ConfigParser()
+    config.read(config_file_path)
+
+    # Read common settings
+    service_provider = config.get('EMAIL_SETTINGS', 'SERVICE_PROVIDER')
+    provider_key = service_provider.lower()
+    if provider_key == 'custom':
+        # Any other SMTP server (e.g. a local test server): SMTP_SERVER is required
+        if not config.has_option('EMAIL_SETTINGS', 'SMTP_SERVER'):
+            logging.error("SERVICE_PROVIDER 'Custom' requires SMTP_SERVER to be set.")
+            raise ValueError("SERVICE_PROVIDER 'Custom' requires SMTP_SERVER to be set.")
+        smtp_server = config.get('EMAIL_SETTINGS', 'SMTP_SERVER')
+        smtp_port = config.getint('EMAIL_SETTINGS', 'SMTP_PORT', fallback=587)
+    elif provider_key in SMTP_PROVIDERS:
+        smtp_server, smtp_port = SMTP_PROVIDERS[provider_key]
+    else:
+        logging.error(f"Unsupported SERVICE_PROVIDER: {service_provider}. Must be 'Gmail', 'Outlook' or 'Custom'.")
+        raise ValueError(f"Unsupported SERVICE_PROVIDER: {service_provider}. Must be 'Gmail', 'Outlook' or 'Custom'.")
+
+    schedule = dict(DEFAULT_SCHEDULE)
+    if config.has_section('SCHEDULE'):
+        for key in schedule:
+            schedule[key] = config.get('SCHEDULE', key.upper(), fallback=schedule[key])
+
+    transport = config.get('DELIVERY', 'TRANSPORT', fallback='smtp').strip().lower()
+    if transport not in transports.TRANSPORT_NAMES:
+        logging.error(f"Unsupported TRANSPORT: {transport}. Must be one of: {', '.join(transports.TRANSPORT_NAMES)}.")
+        raise ValueError(f"Unsupported TRANSPORT: {transport}. Must be one of: {', '.join(transports.TRANSPORT_NAMES)}.")
+
+    settings = {
+        'PROFILE_NAME': os.path.splitext(os.path.basename(config_file_path))[0],
+        'CONFIG_FILE': os.path.abspath(config_file_path),
+        'SERVICE_PROVIDER': service_provider,
+        'SENDER_EMAIL': config.get('EMAIL_SETTINGS', 'SENDER_EMAIL'),
+        'SENDER_PASSWORD': config.get('EMAIL_SETTINGS', 'SENDER_PASSWORD'),
+        'SMTP_SERVER': smtp_server,
+        'SMTP_PORT': smtp_port,
+        'SMTP_STARTTLS': config.getboolean('EMAIL_SETTINGS', 'SMTP_STARTTLS', fallback=True),
+        'SMTP_PIPELINING': config.getboolean('EMAIL_SETTINGS', 'SMTP_PIPELINING', fallback=True),
+        'HOLIDAYS_FILE': config.get('FILE_PATHS', 'HOLIDAYS_FILE'),
+        'EMPLOYEES_FILE': config.get('FILE_PATHS', 'EMPLOYEES_FILE'),
+        'COMPANY_NAME_SUBJECT_SUFFIX': config.get('EMAIL_CONTENT', 'COMPANY_NAME_SUBJECT_SUFFIX', fallback="Upcoming Holiday Reminder!"),
+        'COMPANY_NAME_FOOTER': config.get('EMAIL_CONTENT', 'COMPANY_NAME_FOOTER', fallback="Your Company Name"),
+        'SIGNATURE_NAME': config.get('EMAIL_CONTENT', 'SIGNATURE_NAME', fallback="HR Department"),
+        'TRANSPORT': transport,
+        'OUTPUT_PATH': config.get('DELIVERY', 'OUTPUT_PATH', fallback=DEFAULT_OUTPUT_PATHS.get(transport, '')),
+        'BATCH_SIZE': config.getint('DELIVERY', 'BATCH_SIZE', fallback=100),
+        'DELTA_MODE': config.getboolean('DELIVERY', 'DELTA_MODE', fallback=False),
+        'DELTA_STATE_FILE': config.get('DELIVERY', 'DELTA_STATE_FILE', fallback='delivery_state.db'),
+        'SERVICE_HOST': config.get('SERVICE', 'HOST', fallback='127.0.0.1'),
+        'SERVICE_PORT': config.getint('SERVICE', 'PORT', fallback=8765),
+        'HELPER_PORT': config.getint('HELPER', 'PORT', fallback=8766),
+        'COMPACT_HTML': config.getboolean('EMAIL_CONTENT', 'COMPACT_HTML', fallback=False),
+        'PERSONALIZE_EMAILS': config.getboolean('EMAIL_CONTENT', 'PERSONALIZE_EMAILS', fallback=False),
+        'WORKING_DAYS_SECTION': config.getboolean('EMAIL_CONTENT', 'WORKING_DAYS_SECTION', fallback=False),
+        'BUSINESS_DAYS_AHEAD': config.getint('EMAIL_CONTENT', 'BUSINESS_DAYS_AHEAD', fallback=10),
+        'RENDER_WORKERS': config.getint('PERFORMANCE', 'RENDER_WORKERS', fallback=0),
+        'SCHEDULE': schedule,
+        'METRICS_DIR': config.get('METRICS', 'METRICS_DIR', fallback='metrics'),
+        'KEEP_RUN_SUMMARIES': config.getint('METRICS', 'KEEP_RUN_SUMMARIES', fallback=200),
+        'LOG_MAX_BYTES': config.getint('LOGGING', 'LOG_MAX_BYTES', fallback=5 * 1024 * 1024),
+        'LOG_BACKUP_COUNT': config.getint('LOGGING', 'LOG_BACKUP_COUNT', fallback=5),
+        'LOG_SUCCESS_SAMPLE_EVERY': config.getint('LOGGING', 'LOG_SUCCESS_SAMPLE_EVERY', fallback=1),
+        'PROFILING_ENABLED': config.getboolean('PROFILING', 'ENABLED', fallback=False),
+        'PROFILES_DIR': config.get('PROFILING', 'PROFILES_DIR', fallback='profiles'),
+        'KEEP_PROFILES': config.getint('PROFILING', 'KEEP_PROFILES', fallback=20),
+    }
+    settings['CONFIG_LOAD_SECONDS'] = time.perf_counter() - start
+    return settings
+
+
+# --- Hot reload for long-running processes ---
+RELOAD_CHECK_SECONDS = 2.0
+
+# Settings that describe the process rather than the configuration; they never count as a change
+_VOLATILE_KEYS = ('CONFIG_LOAD_SECONDS',)
+
+
+class ConfigSnapshot(Mapping):
+    """
+    One version of a profile's settings. Read-only: it can be passed anywhere a settings
+    dictionary is expected (settings['SMTP_SERVER'], settings.get(...)), and a run that
+    holds a snapshot keeps seeing the same values while a newer version is loaded.
+    """
+
+    __slots__ = ('version', 'loaded_at', '_settings')
+
+    def __init__(self, settings, version=1):
+        frozen = {key: types.MappingProxyType(dict(value)) if isinstance(value, dict) else value
+                  for key, value in settings.items()}
+        object.__setattr__(self, '_settings', types.MappingProxyType(frozen))
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'loaded_at', time.time())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only")
+
+    def __getitem__(self, key):
+        return self._settings[key]
+
+    def __iter__(self):
+        return iter(self._settings)
+
+    def __len__(self):
+        return len(self._settings)
+
+    def changed_keys(self, other):
+        """The setting names whose values differ between this snapshot and other."""
+        keys = (set(self) | set(other)) - set(_VOLATILE_KEYS)
+        return {key for key in keys if self.get(key) != other.get(key)}
+
+
+def validate_settings(settings):
+    """
+    Checks a freshly loaded profile before a process starts with it or switches to it.
+    Raises ValueError naming the first problem.
+    """
+    if not 0 < settings['SMTP_PORT'] < 65536:
+        raise ValueError(f"SMTP_PORT must be between 1 and 65535, not {settings['SMTP_PORT']}.")
+    for key in ('BATCH_SIZE', 'LOG_SUCCESS_SAMPLE_EVERY', 'KEEP_PROFILES', 'KEEP_RUN_SUMMARIES'):
+        if settings[key] < 1:
+            raise ValueError(f"{key} must be at least 1, not {settings[key]}.")
+    for key in ('RENDER_WORKERS', 'BUSINESS_DAYS_AHEAD', 'LOG_MAX_BYTES', 'LOG_BACKUP_COUNT'):
+        if settings[key] < 0:
+            raise ValueError(f"{key} must not be negative, not {settings[key]}.")
+    for key in ('HOLIDAYS_FILE', 'EMPLOYEES_FILE'):
+        if not os.path.exists(data_sources.source_path(settings[key])):
+            raise ValueError(f"{key} '{settings[key]}' not found.")
+
+
+class ConfigManager:
+    """
+    Holds the current ConfigSnapshot of one profile and replaces it when the file changes.
+
+    watch() polls the file every RELOAD_CHECK_SECONDS (and reloads at once on SIGHUP,
+    see install_sighup_handler). A new version is loaded and validated first; if that
+    fails, the current one stays in use. Otherwise it is swapped in while no run is in
+    progress (runs hold run_lock, see run()) and every listener is called with
+    (old, new, changed_keys), so it can rebuild only what those settings affect.
+    """
+
+    def __init__(self, config_file_path='config.ini'):
+        self.config_file_path = config_file_path
+        self._fingerprint = data_sources.file_fingerprint(config_file_path)
+        settings = load_settings(config_file_path)
+        validate_settings(settings)  # as on every reload, so a file that starts up also reloads
+        self.current = ConfigSnapshot(settings)
+        self.run_lock = threading.RLock()
+        self._listeners = []
+        self._reload_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def run(self, job, *args, **kwargs):
+        """Calls job(snapshot, ...) with the current snapshot; no reload is swapped in meanwhile."""
+        with self.run_lock:
+            return job(self.current, *args, **kwargs)
+
+    def reload(self, reason='file changed'):
+        """
+        Loads and validates the file; swaps it in if it differs from the current version.
+        Returns the new snapshot, or None when nothing changed or the new file was rejected.
+        """
+        self._fingerprint = data_sources.file_fingerprint(self.config_file_path)
+        try:
+            settings = load_settings(self.config_file_path)
+            validate_settings(settings)
+        except (configparser.Error, FileNotFoundError, ValueError, KeyError) as e:
+            print(f"Configuration reload ({reason}) rejected, keeping version {self.current.version}: {e}")
+            logging.error(f"Configuration reload ({reason}) rejected, keeping version {self.current.version}: {e}")
+            return None
+        with self.run_lock:
+            old = self.current
+            changed = old.changed_keys(settings)
+            if not changed:
+                logging.info(f"Configuration reload ({reason}): no changes in '{self.config_file_path}'.")
+                return None
+            new = ConfigSnapshot(settings, version=old.version + 1)
+            self.current = new
+            print(f"Configuration version {new.version} loaded ({reason}): {', '.join(sorted(changed))} changed.")
+            logging.info(f"Configuration version {new.version} loaded ({reason}): {', '.join(sorted(changed))} changed.")
+            for listener in self._listeners:
+                try:
+                    listener(old, new, changed)
+                except Exception as e:
+                    logging.error(f"Applying configuration version {new.version} failed in {listener.__name__}: {e}",
+                                  exc_info=True)
+        return new
+
+    def request_reload(self):
+        """Asks the watcher thread to reload now (safe to call from a signal handler)."""
+        self._reload_requested.set()
+
+    def install_sighup_handler(self):
+        """Reloads on SIGHUP (POSIX only; call from the main thread). Returns False where there is no SIGHUP."""
+        if not hasattr(signal, 'SIGHUP'):
+            return False
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.request_reload())
+        return True
+
+    def watch(self, interval=RELOAD_CHECK_SECONDS):
+        """Starts the background thread that reloads on file changes and reload requests."""
+        def run():
+            while not self._stopped.is_set():
+                requested = self._reload_requested.wait(interval)
+                self._reload_requested.clear()
+                if self._stopped.is_set():
+                    break
+                if requested:
+                    self.reload('SIGHUP')
+                elif data_sources.file_fingerprint(self.config_file_path) != self._fingerprint:
+                    self.reload()
+
+        self._thread = threading.Thread(target=run, name='config-reload', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._reload_requested.set()
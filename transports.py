@@ -0,0 +1,239 @@
+"""
+Delivery transports for the Holiday Reminder Tool.
+
+A transport takes a finished message (sender, recipient, RFC 822 text) and
+delivers it somewhere. The transport is chosen with TRANSPORT in the
+[DELIVERY] section of config.ini:
+  - smtp    : send through the SMTP server (the default)
+  - spool   : write one .eml file per message into OUTPUT_PATH (a directory)
+  - maildir : add messages to the Maildir at OUTPUT_PATH
+  - mbox    : append messages to the mbox file at OUTPUT_PATH
+  - null    : discard messages (dry-run a full roster at full speed)
+
+File transports queue messages and write them BATCH_SIZE at a time. .eml and
+Maildir files are written to a temporary name and renamed into place, so a
+reader never sees a partial message; an mbox batch is appended under the
+mailbox lock and flushed to disk in one go.
+"""
+
+import contextlib
+import logging
+import mailbox
+import os
+import re
+import smtplib
+import tempfile
+from datetime import datetime
+
+import run_metrics
+import smtp_pipelining
+
+TRANSPORT_NAMES = ('smtp', 'spool', 'maildir', 'mbox', 'null')
+WRITE_BUFFER_BYTES = 256 * 1024
+
+
+class Transport:
+    """Base class: send() delivers one message, close() flushes anything still queued."""
+
+    name = 'transport'
+    # False for transports that discard messages: nothing they "send" counts as delivered (e.g. for delta mode)
+    delivers = True
+    # True for transports that queue messages: a send() is only delivered once flush()/close() wrote it
+    queues = False
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics or run_metrics.NULL_METRICS
+
+    def send(self, sender, recipient, message, mail_options=()):
+        """message is the RFC 822 text (str) or, for 8bit content, bytes."""
+        raise NotImplementedError
+
+    def supports_8bit(self):
+        """True if 8bit (unencoded UTF-8) message bodies can be delivered."""
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SMTPTransport(Transport):
+    """
+    Sends through a pooled SMTP connection, retrying once if the connection drops before the
+    server accepted DATA. A drop after that (the message text was handed over) is not retried,
+    since the server may already have delivered the message.
+    The envelope is pipelined when the server advertises PIPELINING (see smtp_pipelining.py).
+    """
+
+    name = 'smtp'
+
+    def __init__(self, smtp_pool, metrics=None, pipelining=True):
+        super().__init__(metrics)
+        self.smtp_pool = smtp_pool
+        self.pipelining = pipelining
+
+    def send(self, sender, recipient, message, mail_options=()):
+        for attempt in range(2):
+            try:
+                with self.smtp_pool.connection(self.metrics) as server:
+                    pipelined = self.pipelining and smtp_pipelining.supports_pipelining(server)
+                    with self.metrics.timer('smtp_send'):
+                        smtp_pipelining.sendmail(server, sender, recipient, message, mail_options,
+                                                 pipelining=pipelined)
+                    if pipelined:
+                        self.metrics.inc('smtp_pipelined_sends')
+                return
+            except smtp_pipelining.MessageMaybeDelivered:
+                logging.warning(f"SMTP connection dropped after the message to {recipient} was handed over. "
+                                f"Not retrying: it may have been delivered.")
+                raise
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+                self.metrics.inc('smtp_retries')
+                logging.warning(f"SMTP connection dropped while sending to {recipient}. Retrying once.")
+
+    def supports_8bit(self):
+        return self.smtp_pool.has_extension('8bitmime', self.metrics)
+
+
+class NullTransport(Transport):
+    """Discards every message."""
+
+    name = 'null'
+    delivers = False
+
+    def send(self, sender, recipient, message, mail_options=()):
+        self.metrics.inc('transport_discarded')
+
+
+class _BatchingTransport(Transport):
+    """Queues messages and writes them batch_size at a time."""
+
+    queues = True
+
+    def __init__(self, output_path, batch_size=100, metrics=None):
+        super().__init__(metrics)
+        self.output_path = output_path
+        self.batch_size = max(1, int(batch_size))
+        self._batch = []
+
+    def send(self, sender, recipient, message, mail_options=()):
+        self._batch.append((recipient, message if isinstance(message, bytes) else message.encode('utf-8')))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        try:
+            with self.metrics.timer('file_write'):
+                self._write_batch(batch)
+            self.metrics.inc('transport_batches')
+        except OSError as e:
+            # Messages were already counted as sent when they were queued
+            self.metrics.inc('transport_write_failures', len(batch))
+            print(f"Error: Could not write {len(batch)} message(s) to '{self.output_path}': {e}")
+            logging.error(f"Could not write {len(batch)} message(s) to '{self.output_path}': {e}")
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+
+class SpoolTransport(_BatchingTransport):
+    """Writes one .eml file per message into a directory."""
+
+    name = 'spool'
+
+    def __init__(self, output_path, batch_size=100, metrics=None):
+        super().__init__(output_path, batch_size, metrics)
+        self._run_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._sequence = 0
+
+    def _write_batch(self, batch):
+        os.makedirs(self.output_path, exist_ok=True)
+        for recipient, message_bytes in batch:
+            self._sequence += 1
+            file_name = f"{self._run_stamp}-{self._sequence:06d}-{file_safe(recipient)}.eml"
+            write_bytes_atomic(os.path.join(self.output_path, file_name), message_bytes)
+
+
+class MaildirTransport(_BatchingTransport):
+    """Adds messages to a Maildir (written to tmp/ and moved into new/ by the mailbox module)."""
+
+    name = 'maildir'
+
+    def _write_batch(self, batch):
+        maildir = mailbox.Maildir(self.output_path, create=True)
+        for _, message_bytes in batch:
+            maildir.add(message_bytes)
+
+
+class MboxTransport(_BatchingTransport):
+    """Appends messages to an mbox file, one locked append per batch."""
+
+    name = 'mbox'
+
+    def __init__(self, output_path, batch_size=100, metrics=None):
+        super().__init__(output_path, batch_size, metrics)
+        self._mbox = None  # opened on the first batch and kept open, so the file is scanned only once
+
+    def _write_batch(self, batch):
+        if self._mbox is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+            self._mbox = mailbox.mbox(self.output_path, create=True)
+        self._mbox.lock()
+        try:
+            for _, message_bytes in batch:
+                self._mbox.add(message_bytes)
+            self._mbox.flush()
+        finally:
+            self._mbox.unlock()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._mbox is not None:
+                self._mbox.close()
+                self._mbox = None
+
+
+def create_transport(settings, smtp_pool=None, metrics=None):
+    """Builds the transport selected in settings['TRANSPORT']. smtp_pool is required for 'smtp'."""
+    name = settings.get('TRANSPORT', 'smtp')
+    if name == 'smtp':
+        return SMTPTransport(smtp_pool, metrics, pipelining=settings.get('SMTP_PIPELINING', True))
+    if name == 'null':
+        return NullTransport(metrics)
+    transport_classes = {'spool': SpoolTransport, 'maildir': MaildirTransport, 'mbox': MboxTransport}
+    if name not in transport_classes:
+        raise ValueError(f"Unsupported TRANSPORT: {name}. Must be one of: {', '.join(TRANSPORT_NAMES)}.")
+    return transport_classes[name](settings['OUTPUT_PATH'], settings.get('BATCH_SIZE', 100), metrics)
+
+
+def file_safe(name):
+    return re.sub(r'[^a-zA-Z0-9_.@-]', '_', name)
+
+
+def write_bytes_atomic(path, data):
+    """Writes data to path via a buffered temp file + rename, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.eml')
+    try:
+        with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_BYTES) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise